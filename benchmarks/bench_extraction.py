@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark de los motores de extracción HTML sobre el corpus de benchmarks/corpus.py.
+
+Para cada motor disponible informa de páginas/s y MB/s, y de la paridad de su salida
+frente a BeautifulSoup (títulos iguales, textos idénticos y similitud media por
+palabras).
+
+Uso:
+    python benchmarks/bench_extraction.py --rounds 3
+    python benchmarks/bench_extraction.py --corpus /ruta/a/paginas --engines lxml bs4
+"""
+
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import load_corpus  # noqa: E402
+from extraction import available_extractors, get_extractor  # noqa: E402
+
+
+def word_similarity(a: str, b: str) -> float:
+    """Similitud entre dos textos como proporción de palabras compartidas."""
+    words_a, words_b = Counter(a.split()), Counter(b.split())
+    total = max(sum(words_a.values()), sum(words_b.values()))
+    if not total:
+        return 1.0
+    return sum((words_a & words_b).values()) / total
+
+
+def run_engine(name: str, pages: Dict[str, str], rounds: int) -> Dict[str, Dict[str, str]]:
+    """Extrae todo el corpus varias veces con un motor e imprime su rendimiento."""
+    extractor = get_extractor(name)
+    total_bytes = sum(len(html.encode("utf-8")) for html in pages.values())
+    outputs = {}
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for page_name, html in pages.items():
+            outputs[page_name] = extractor.extract(html)
+    elapsed = time.perf_counter() - start
+    count = len(pages) * rounds
+    print(
+        f"{name:<12} {count / elapsed:9.1f} páginas/s  "
+        f"{total_bytes * rounds / elapsed / 1e6:7.1f} MB/s  "
+        f"({elapsed * 1000 / count:.2f} ms/página)"
+    )
+    return outputs
+
+
+def report_parity(name: str, outputs: Dict[str, Dict[str, str]], reference: Dict[str, Dict[str, str]]) -> None:
+    """Compara la salida de un motor con la de referencia."""
+    titles = sum(outputs[p]["title"] == reference[p]["title"] for p in reference)
+    identical = sum(outputs[p]["content"] == reference[p]["content"] for p in reference)
+    similarity = sum(
+        word_similarity(outputs[p]["content"], reference[p]["content"]) for p in reference
+    ) / len(reference)
+    print(
+        f"{name:<12} títulos iguales {titles}/{len(reference)}  "
+        f"textos idénticos {identical}/{len(reference)}  similitud media {similarity:.4f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directorio con páginas *.html")
+    parser.add_argument("--rounds", type=int, default=3, help="Pasadas sobre el corpus")
+    parser.add_argument("--engines", nargs="*", help="Motores a medir (por defecto, todos los instalados)")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    engines: List[str] = args.engines or available_extractors()
+    size_kb = sum(len(html.encode("utf-8")) for html in pages.values()) // 1024
+    print(f"Corpus: {len(pages)} páginas, {size_kb} KB; motores: {', '.join(engines)}\n")
+
+    results = {name: run_engine(name, pages, args.rounds) for name in engines}
+
+    if "bs4" in results:
+        print("\nParidad frente a bs4:")
+        for name, outputs in results.items():
+            if name != "bs4":
+                report_parity(name, outputs, results["bs4"])
+
+
+if __name__ == "__main__":
+    main()
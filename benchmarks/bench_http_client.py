@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: latencia de llamadas repetidas con un cliente nuevo por llamada frente
+al cliente compartido de http_clients.
+
+Por defecto levanta un servidor HTTP local con keep-alive. Con --url se puede
+apuntar a un host real (HTTPS), donde el ahorro del handshake TLS es mayor.
+
+Uso:
+    python benchmarks/bench_http_client.py --requests 200
+    python benchmarks/bench_http_client.py --url https://docs.python.org/3/ --requests 20
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Awaitable, Callable, List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_clients import DOCS_PROFILE, HTTPClientManager  # noqa: E402
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Responde a cualquier GET con una página pequeña manteniendo la conexión."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    body = b"<html><head><title>bench</title></head><body><main>ok</main></body></html>"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_local_server() -> ThreadingHTTPServer:
+    """Inicia el servidor local en un hilo y devuelve la instancia."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def measure(call: Callable[[], Awaitable[None]], n: int) -> List[float]:
+    """Ejecuta la llamada n veces de forma secuencial y devuelve latencias en ms."""
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        await call()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def summarize(name: str, latencies: List[float]) -> None:
+    """Imprime media y percentiles de una serie de latencias."""
+    ordered = sorted(latencies)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"{name:<22} media={statistics.mean(ordered):8.2f} ms  "
+        f"p50={statistics.median(ordered):8.2f} ms  p95={p95:8.2f} ms"
+    )
+
+
+async def run(url: str, n: int) -> None:
+    async def fresh_client():
+        async with httpx.AsyncClient(headers=DOCS_PROFILE.headers) as client:
+            response = await client.get(url, follow_redirects=True)
+            await response.aread()
+
+    manager = HTTPClientManager({DOCS_PROFILE.name: DOCS_PROFILE})
+    await manager.start()
+
+    async def shared_client():
+        response = await manager.get(DOCS_PROFILE.name).get(url, follow_redirects=True)
+        await response.aread()
+
+    try:
+        # Calentamiento para excluir la primera conexión del cliente compartido
+        await shared_client()
+        summarize("cliente por llamada", await measure(fresh_client, n))
+        summarize("cliente compartido", await measure(shared_client, n))
+    finally:
+        await manager.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="URL a consultar (por defecto, un servidor local)")
+    parser.add_argument("--requests", type=int, default=200, help="Número de llamadas repetidas")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        server = start_local_server()
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    print(f"{args.requests} llamadas secuenciales a {url}")
+    try:
+        asyncio.run(run(url, args.requests))
+    finally:
+        if server:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: retraso del bucle de eventos mientras se extraen páginas en paralelo.
+
+Simula varias búsquedas with_content simultáneas lanzando extracciones concurrentes
+del corpus de benchmarks/corpus.py con cada tipo de pool (inline, thread, process) y
+mide el lag del bucle con LoopLagMonitor.
+
+Uso:
+    python benchmarks/bench_loop_lag.py --jobs 8 --pages 5
+    python benchmarks/bench_loop_lag.py --kinds thread process --workers 4
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import load_corpus  # noqa: E402
+from extraction import ExtractionPool  # noqa: E402
+from loop_monitor import LoopLagMonitor  # noqa: E402
+
+
+async def run_kind(kind: str, bodies: List[bytes], jobs: int, pages: int, workers: int, engine: str) -> None:
+    """Ejecuta `jobs` búsquedas simuladas de `pages` páginas cada una con un tipo de pool."""
+    pool = ExtractionPool(kind=kind, workers=workers, max_pending=jobs * pages, engine=engine)
+    monitor = LoopLagMonitor(interval=0.01, window=100000)
+
+    async def job(offset: int) -> None:
+        selected = [bodies[(offset + i) % len(bodies)] for i in range(pages)]
+        await asyncio.gather(*(pool.extract(body) for body in selected))
+
+    # Calentamiento: arranque de hilos o procesos
+    await pool.extract(bodies[0])
+    monitor.start()
+    await asyncio.sleep(0.05)
+    start = time.perf_counter()
+    await asyncio.gather(*(job(i * pages) for i in range(jobs)))
+    elapsed = time.perf_counter() - start
+    await monitor.stop()
+    pool.shutdown()
+
+    stats = monitor.stats()
+    print(
+        f"{kind:<8} {jobs * pages / elapsed:8.1f} páginas/s  "
+        f"lag p99={stats['p99_ms']:8.2f} ms  max={stats['max_ms']:8.2f} ms  "
+        f"media={stats['avg_ms']:7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directorio con páginas *.html")
+    parser.add_argument("--jobs", type=int, default=8, help="Búsquedas simultáneas")
+    parser.add_argument("--pages", type=int, default=5, help="Páginas por búsqueda")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--engine", default="bs4", help="Motor de extracción")
+    parser.add_argument("--kinds", nargs="*", default=["inline", "thread", "process"])
+    args = parser.parse_args()
+
+    # Las páginas más grandes del corpus, como bytes tal y como llegan de la red
+    pages = sorted(load_corpus(args.corpus).values(), key=len, reverse=True)
+    bodies = [html.encode("utf-8") for html in pages[: max(8, args.pages)]]
+    print(
+        f"{args.jobs} búsquedas x {args.pages} páginas, motor {args.engine}, "
+        f"{args.workers} workers\n"
+    )
+    for kind in args.kinds:
+        asyncio.run(run_kind(kind, bodies, args.jobs, args.pages, args.workers, args.engine))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Microbenchmark: coste de la instrumentación de métricas en el camino crítico.
+
+Mide en nanosegundos por operación:
+
+    base                bucle vacío (referencia)
+    perf_counter        par de lecturas de time.perf_counter() que rodea cada medida
+    counter.inc         contador con hijo ya obtenido
+    histogram.observe   histograma con hijo ya obtenido
+    labels().observe    búsqueda del hijo por etiquetas + observación (uso en mcp_serper)
+    con lock            la misma observación protegida por threading.Lock, para comparar
+    con formato         la misma observación construyendo la clave con un f-string
+
+y el tiempo de generar la exposición de /metrics con --series combinaciones de etiquetas.
+
+Uso:
+    python benchmarks/bench_metrics.py
+    python benchmarks/bench_metrics.py --ops 2000000 --series 200
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import Counter, Histogram, Registry  # noqa: E402
+
+
+def measure(fn: Callable[[int], None], ops: int, repeat: int = 5) -> float:
+    """Mejor tiempo por operación (ns) de varias repeticiones."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(ops)
+        best = min(best, time.perf_counter() - start)
+    return best / ops * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=1_000_000, help="Operaciones por medida")
+    parser.add_argument("--series", type=int, default=100, help="Combinaciones de etiquetas al generar /metrics")
+    args = parser.parse_args()
+
+    counter = Counter("bench_counter", "Contador de prueba")
+    histogram = Histogram("bench_seconds", "Histograma de prueba", ("endpoint", "status"))
+    child = histogram.labels("search", 200)
+    counter_child = counter.labels()
+    lock = threading.Lock()
+    perf_counter = time.perf_counter
+
+    def base(n):
+        for _ in range(n):
+            pass
+
+    def timer(n):
+        for _ in range(n):
+            start = perf_counter()
+            perf_counter() - start
+
+    def inc(n):
+        for _ in range(n):
+            counter_child.inc()
+
+    def observe(n):
+        for _ in range(n):
+            child.observe(0.042)
+
+    def labels_observe(n):
+        for _ in range(n):
+            histogram.labels("search", 200).observe(0.042)
+
+    def locked(n):
+        for _ in range(n):
+            with lock:
+                child.observe(0.042)
+
+    def formatted(n):
+        for _ in range(n):
+            histogram.labels(f"search/{200}", 200).observe(0.042)
+
+    cases = [
+        ("base", base),
+        ("perf_counter", timer),
+        ("counter.inc", inc),
+        ("histogram.observe", observe),
+        ("labels().observe", labels_observe),
+        ("con lock", locked),
+        ("con formato", formatted),
+    ]
+    baseline = measure(base, args.ops)
+    print(f"{args.ops} operaciones por medida (mejor de 5)")
+    for name, fn in cases:
+        ns = measure(fn, args.ops)
+        print(f"{name:<20} {ns:8.1f} ns/op  (+{max(0.0, ns - baseline):6.1f} sobre el bucle)")
+
+    registry = Registry()
+    metric = registry.register(Histogram("bench_render_seconds", "Histograma de prueba", ("status",)))
+    for i in range(args.series):
+        metric.labels(i).observe(i / 1000)
+    start = time.perf_counter()
+    text = registry.render()
+    elapsed = time.perf_counter() - start
+    print(f"/metrics con {args.series} series: {elapsed * 1000:.2f} ms, {len(text) / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark de extremo a extremo: get_docs, search_web y fetch_url sin red externa.
+
+Levanta un servidor local que hace de API de Serper (POST /search) y de sitio de
+documentación (GET /<página>), con el corpus de benchmarks/corpus.py. La latencia
+de ambos y el tamaño de las páginas y de las respuestas de búsqueda son
+configurables. Para cada herramienta y nivel de concurrencia se lanzan --requests
+llamadas con --concurrency llamadas simultáneas como máximo y se mide el
+rendimiento (llamadas/s) y la latencia p50/p95/p99.
+
+Escenarios de caché:
+
+    cold  cada llamada usa una consulta y URLs de página nuevas (sin aciertos de caché)
+    warm  un conjunto fijo de consultas y páginas, precargado antes de medir
+
+Los resultados se guardan en JSON (por defecto benchmarks/results/pipeline-<commit>.json)
+para comparar dos commits con --compare.
+
+Uso:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --tools get_docs --concurrency 1,8,32 --requests 200
+    python benchmarks/bench_pipeline.py --serper-latency 150 --page-latency 80 --page-kb 100
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/pipeline-abc1234.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import logging
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Sin almacén persistente ni Redis: solo se mide el pipeline en memoria
+os.environ["PAGE_STORE_PATH"] = ""
+os.environ["REDIS_URL"] = ""
+os.environ.setdefault("SERPER_API_KEY", "bench")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import load_corpus  # noqa: E402
+from upstream import resize_page, start_server  # noqa: E402
+import mcp_serper  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+TOOLS = ("get_docs", "search_web", "fetch_url")
+# Consultas del escenario warm
+WARM_QUERIES = 8
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Percentil por rango más cercano de una lista ordenada."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+
+async def measure(call: Callable[[int], Awaitable[Any]], requests: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Ejecuta requests llamadas con concurrency trabajadores y resume las latencias.
+
+    Returns:
+        Dict: Rendimiento, percentiles de latencia (ms) y errores.
+    """
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                await call(i)
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput": round(requests / elapsed, 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2),
+    }
+
+
+def make_call(tool: str, base_url: str, names: List[str], cache: str, num_results: int) -> Callable[[int], Awaitable[Any]]:
+    """Llamada i-ésima de una herramienta en el escenario de caché indicado."""
+    run_id = f"{time.time_ns():x}"
+
+    def query(i: int) -> str:
+        # "#<id>" hace la consulta única y el servidor lo convierte en ?v=<id> en las URLs
+        return f"asyncio task {i % WARM_QUERIES}" if cache == "warm" else f"asyncio task #{run_id}-{i}"
+
+    if tool == "search_web":
+        return lambda i: mcp_serper.search_web(query(i), num_results=num_results)
+    if tool == "fetch_url":
+        def fetch(i: int) -> Awaitable[Any]:
+            suffix = "" if cache == "warm" else f"?v={run_id}-{i}"
+            return mcp_serper.fetch_url(f"{base_url}/{names[i % len(names)]}{suffix}")
+        return fetch
+    return lambda i: mcp_serper.get_docs(query(i), "python", num_results, with_content=True)
+
+
+async def reset_caches() -> None:
+    await mcp_serper.results_cache.clear()
+    await mcp_serper.page_cache.clear()
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except Exception:
+        return None
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> None:
+    """Imprime la variación respecto a un archivo de resultados anterior."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["tool"], r["cache"], r["concurrency"]): r for r in baseline["results"]}
+    print(f"\nComparación con {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    for result in results:
+        old = previous.get((result["tool"], result["cache"], result["concurrency"]))
+        if old is None:
+            continue
+        deltas = "  ".join(
+            f"{key}={(result[key] - old[key]) / old[key] * 100:+6.1f}%" if old[key] else f"{key}=n/a"
+            for key in ("throughput", "p50_ms", "p95_ms", "p99_ms")
+        )
+        print(f"{result['tool']:<11} {result['cache']:<5} c={result['concurrency']:<4} {deltas}")
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    corpus = load_corpus(args.corpus)
+    pages = {name: resize_page(html, args.page_kb * 1024).encode("utf-8") for name, html in corpus.items()}
+    server = start_server(
+        pages,
+        args.serper_latency / 1000,
+        args.page_latency / 1000,
+        args.jitter / 1000,
+        args.snippet_words,
+    )
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    mcp_serper.SERPER_API_URL = f"{base_url}/search"
+    names = sorted(pages)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    tools = [tool.strip() for tool in args.tools.split(",")]
+    results = []
+
+    print(
+        f"{len(pages)} páginas ({sum(map(len, pages.values())) / len(pages) / 1024:.0f} KB de media), "
+        f"latencia Serper {args.serper_latency:.0f} ms, páginas {args.page_latency:.0f} ms"
+    )
+    print(f"{'herramienta':<11} {'caché':<5} {'conc':>4} {'llam/s':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'errores':>7}")
+    try:
+        for tool in tools:
+            for cache in args.cache.split(","):
+                call = make_call(tool, base_url, names, cache, args.num_results)
+                for concurrency in levels:
+                    await reset_caches()
+                    if cache == "warm":
+                        await measure(call, max(WARM_QUERIES, len(names)), concurrency)
+                    result = await measure(call, args.requests, concurrency)
+                    result.update(tool=tool, cache=cache, concurrency=concurrency)
+                    results.append(result)
+                    print(
+                        f"{tool:<11} {cache:<5} {concurrency:>4} {result['throughput']:>9.1f} "
+                        f"{result['p50_ms']:>7.1f}ms {result['p95_ms']:>7.1f}ms {result['p99_ms']:>7.1f}ms "
+                        f"{result['errors']:>7}"
+                    )
+    finally:
+        server.shutdown()
+        await mcp_serper.close_http_clients()
+        await mcp_serper.close_extraction_pool()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pages": len(pages),
+            "params": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tools", default=",".join(TOOLS), help="Herramientas a medir, separadas por comas")
+    parser.add_argument("--concurrency", default="1,8,32", help="Niveles de concurrencia, separados por comas")
+    parser.add_argument("--requests", type=int, default=100, help="Llamadas por herramienta y nivel")
+    parser.add_argument("--cache", default="cold,warm", help="Escenarios de caché: cold, warm o ambos")
+    parser.add_argument("--num-results", type=int, default=5, help="Resultados por búsqueda")
+    parser.add_argument("--serper-latency", type=float, default=50, help="Latencia de Serper en ms")
+    parser.add_argument("--page-latency", type=float, default=20, help="Latencia de cada página en ms")
+    parser.add_argument("--jitter", type=float, default=0, help="Latencia aleatoria adicional en ms")
+    parser.add_argument("--page-kb", type=int, default=0, help="Tamaño de las páginas en KB (0 = el del corpus)")
+    parser.add_argument("--snippet-words", type=int, default=30, help="Palabras por snippet en las respuestas de Serper")
+    parser.add_argument("--corpus", help="Directorio con páginas *.html")
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto benchmarks/results/pipeline-<commit>.json)")
+    parser.add_argument("--compare", help="Archivo JSON de una ejecución anterior para comparar")
+    args = parser.parse_args()
+
+    # Los logs por llamada falsean la medida
+    logging.getLogger("mcp-serper").setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    report = asyncio.run(run(args))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{report['meta']['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {output}")
+
+    if args.compare:
+        compare(report["results"], args.compare)
+
+
+if __name__ == "__main__":
+    main()
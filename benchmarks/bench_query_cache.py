@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: tasa de aciertos de la caché de búsquedas con y sin normalización.
+
+Reproduce un registro de consultas (JSONL con "query", "site" y "num_results", como el
+que escribe search_web con SEARCH_QUERY_LOG) con dos esquemas de clave de caché:
+
+    anterior    f"{site:... consulta}_{num_results}", sin normalizar
+    actual      consulta normalizada (_build_search) y reutilización de respuestas
+                con más resultados
+
+La caché se simula con un LRU de --capacity entradas, sin llamadas a la red. Sin
+--log se usa un registro sintético con las variaciones típicas (mayúsculas, espacios,
+posición de site:, num_results distintos).
+
+Uso:
+    SEARCH_QUERY_LOG=queries.jsonl python server.py   # grabar consultas reales
+    python benchmarks/bench_query_cache.py --log queries.jsonl
+    python benchmarks/bench_query_cache.py --queries 5000 --capacity 1000
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_serper import _build_search  # noqa: E402
+
+_TOPICS = [
+    "async python", "asyncio gather", "list comprehension", "context manager",
+    "useEffect cleanup", "fetch api", "promise all", "django orm filter",
+    "fastapi dependency injection", "pandas merge", "numpy broadcasting",
+    "docker compose volumes", "kubernetes ingress", "git rebase", "rust lifetimes",
+    "typescript generics", "css grid", "flexbox align", "sql join", "redis pipeline",
+]
+_SITES = [None, "docs.python.org", "developer.mozilla.org", "fastapi.tiangolo.com", "kubernetes.io"]
+
+
+def synthetic_log(n: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Genera un registro de consultas con distribución de popularidad sesgada."""
+    rng = random.Random(seed)
+    entries = []
+    for _ in range(n):
+        topic = _TOPICS[min(int(rng.paretovariate(1.2)) - 1, len(_TOPICS) - 1)]
+        site = rng.choice(_SITES)
+        words = topic.split()
+        if rng.random() < 0.3:
+            words = [w.capitalize() for w in words]
+        query = ("  " if rng.random() < 0.2 else " ").join(words)
+        if site and rng.random() < 0.3:
+            # site: dentro de la consulta en lugar del parámetro
+            query = f"{query} site:{site}" if rng.random() < 0.5 else f"site:{site.upper()} {query}"
+            site = None
+        elif site and rng.random() < 0.2:
+            site = f"https://{site}/"
+        entries.append({"query": query, "site": site, "num_results": rng.choice([3, 5, 5, 10])})
+    return entries
+
+
+def load_log(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def legacy_key(query: str, site: Optional[str], num_results: int) -> Tuple[str, int]:
+    """Clave anterior: consulta literal con el número de resultados."""
+    search_query = f"site:{site} {query}" if site else query
+    return f"{search_query}_{num_results}", num_results
+
+
+def current_key(query: str, site: Optional[str], num_results: int) -> Tuple[str, int]:
+    """Clave actual: consulta normalizada; se guarda el número de resultados pedido a Serper."""
+    _, payload, cache_key = _build_search(query, site, num_results)
+    return cache_key, payload["num"]
+
+
+def replay(
+    entries: List[Dict[str, Any]],
+    key_fn: Callable[[str, Optional[str], int], Tuple[str, int]],
+    capacity: int,
+) -> Dict[str, Any]:
+    """Reproduce el registro sobre un LRU y cuenta aciertos y llamadas a Serper."""
+    cache: "OrderedDict[str, int]" = OrderedDict()
+    hits = 0
+    for entry in entries:
+        num_results = entry.get("num_results", 10)
+        key, fetched = key_fn(entry["query"], entry.get("site"), num_results)
+        cached = cache.get(key)
+        if cached is not None and cached >= num_results:
+            hits += 1
+            cache.move_to_end(key)
+            continue
+        cache[key] = max(fetched, cached or 0)
+        cache.move_to_end(key)
+        if capacity and len(cache) > capacity:
+            cache.popitem(last=False)
+    return {
+        "hits": hits,
+        "upstream_calls": len(entries) - hits,
+        "hit_rate": hits / len(entries) if entries else 0.0,
+        "keys": len(cache),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", help="Registro JSONL de consultas")
+    parser.add_argument("--queries", type=int, default=5000, help="Consultas del registro sintético")
+    parser.add_argument("--capacity", type=int, default=1000, help="Entradas del LRU simulado (0 = sin límite)")
+    args = parser.parse_args()
+
+    entries = load_log(args.log) if args.log else synthetic_log(args.queries)
+    print(f"{len(entries)} consultas, LRU de {args.capacity or 'infinitas'} entradas")
+    for name, key_fn in (("anterior", legacy_key), ("actual", current_key)):
+        result = replay(entries, key_fn, args.capacity)
+        print(
+            f"{name:<9} hit_rate={result['hit_rate']:6.1%}  "
+            f"llamadas a Serper={result['upstream_calls']:<6} claves={result['keys']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: revalidación condicional de páginas frente a descarga completa.
+
+Sirve el corpus de benchmarks/corpus.py desde un servidor local que responde con
+ETag y 304 Not Modified. Cada ronda vuelve a pedir todas las páginas con fetch_url:
+en modo "completa" se vacía la caché de páginas antes de cada ronda y en modo
+"revalidación" las copias caducan en cuanto se guardan (PAGE_REVALIDATE_AFTER=0).
+Se comparan bytes transferidos, tiempo total y tasas de fetch_url.
+
+Uso:
+    python benchmarks/bench_revalidation.py --rounds 10
+"""
+
+import os
+import sys
+import time
+import asyncio
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+# Toda copia con ETag se revalida en la siguiente consulta
+os.environ["PAGE_REVALIDATE_AFTER"] = "0"
+os.environ["PAGE_STORE_PATH"] = ""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import load_corpus  # noqa: E402
+import mcp_serper  # noqa: E402
+
+
+def start_server(pages: Dict[str, bytes], counters: Dict[str, int]) -> ThreadingHTTPServer:
+    """Inicia un servidor local que sirve las páginas con ETag y admite If-None-Match."""
+    etags = {name: '"' + hashlib.sha1(body).hexdigest() + '"' for name, body in pages.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            name = self.path.lstrip("/")
+            body = pages.get(name)
+            if body is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if self.headers.get("If-None-Match") == etags[name]:
+                counters["not_modified"] += 1
+                self.send_response(304)
+                self.send_header("ETag", etags[name])
+                self.end_headers()
+                return
+            counters["full"] += 1
+            counters["bytes"] += len(body)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etags[name])
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        # Con la cola de escucha por defecto (5) las conexiones simultáneas sufren
+        # retransmisiones SYN de 1 s que falsean la comparación
+        request_queue_size = 128
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run_mode(mode: str, base_url: str, names, rounds: int, counters: Dict[str, int]) -> None:
+    await mcp_serper.page_cache.clear()
+    for key in mcp_serper.page_revalidation:
+        mcp_serper.page_revalidation[key] = 0
+    counters.update(full=0, not_modified=0, bytes=0)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        if mode == "completa":
+            await mcp_serper.page_cache.clear()
+        await asyncio.gather(*(mcp_serper.fetch_url(f"{base_url}/{name}") for name in names))
+    elapsed = time.perf_counter() - start
+
+    stats = mcp_serper.page_revalidation_stats()
+    print(
+        f"{mode:<13} {elapsed * 1000:9.1f} ms  {counters['bytes'] / 1024:9.1f} KB  "
+        f"200={counters['full']:<5} 304={counters['not_modified']:<5} "
+        f"miss={stats['miss_rate']:.2f} revalidated={stats['revalidated_rate']:.2f}"
+    )
+
+
+async def run(rounds: int, corpus_dir: str) -> None:
+    corpus = load_corpus(corpus_dir)
+    pages = {name: html.encode("utf-8") for name, html in corpus.items()}
+    counters = {"full": 0, "not_modified": 0, "bytes": 0}
+    server = start_server(pages, counters)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"{len(pages)} páginas x {rounds} rondas")
+    try:
+        for mode in ("completa", "revalidación"):
+            await run_mode(mode, base_url, list(pages), rounds, counters)
+    finally:
+        server.shutdown()
+        await mcp_serper.close_http_clients()
+        await mcp_serper.close_extraction_pool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directorio con páginas *.html")
+    parser.add_argument("--rounds", type=int, default=10, help="Veces que se piden todas las páginas")
+    args = parser.parse_args()
+    asyncio.run(run(args.rounds, args.corpus))
+
+
+if __name__ == "__main__":
+    main()
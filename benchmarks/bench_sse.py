@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Prueba de carga SSE: memoria por conexión, latencia de entrega y CPU por evento.
+
+Para cada nivel de --clients arranca un servidor nuevo (uvicorn server:app en otro
+proceso) con Serper y las páginas sustituidos por benchmarks/upstream.py, y:
+
+    1. abre N conexiones /sse y mide el tiempo hasta el primer evento y el RSS del
+       servidor antes y después (memoria por conexión)
+    2. lanza trabajos get_docs_stream: grupos de --subscribers clientes piden la
+       misma búsqueda, de modo que cada evento del trabajo se reparte a todo el
+       grupo (fan-out). Se mide la latencia de cada evento como el retraso respecto
+       al primer cliente del grupo que lo recibe, el tiempo desde la solicitud
+       hasta job_end, los eventos entregados por segundo y el tiempo de CPU del
+       servidor por evento entregado
+    3. con --heartbeat, deja las conexiones inactivas y mide el retraso de los
+       latidos respecto a SSE_HEARTBEAT_INTERVAL
+
+La memoria y la CPU del servidor se leen de /proc (solo Linux). Los resultados se
+guardan en JSON (por defecto benchmarks/results/sse-<commit>.json).
+
+Uso:
+    python benchmarks/bench_sse.py --clients 100,1000
+    python benchmarks/bench_sse.py --clients 2000,5000 --subscribers 100 --heartbeat
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import resource
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+# Eventos con los que se mide la latencia de entrega (los de progreso se pueden descartar)
+TRACKED_EVENTS = ("content", "job_end")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Percentil por rango más cercano de una lista ordenada."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    return {
+        "p50_ms": round(percentile(values, 50), 2),
+        "p95_ms": round(percentile(values, 95), 2),
+        "p99_ms": round(percentile(values, 99), 2),
+        "max_ms": round(values[-1], 2) if values else 0.0,
+    }
+
+
+def process_rss(pid: int) -> Optional[int]:
+    """Memoria residente de un proceso en bytes."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def process_cpu(pid: int) -> Optional[float]:
+    """Tiempo de CPU (usuario + sistema) consumido por un proceso en segundos."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rpartition(")")[2].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except OSError:
+        return None
+
+
+class SSEClient:
+    """Cliente SSE mínimo sobre asyncio (miles de conexiones sin hilos ni httpx)."""
+
+    def __init__(self):
+        self.client_id: Optional[str] = None
+        self.connected_after: Optional[float] = None
+        self.last_event_at = 0.0
+        # (instante, job_id, tipo) de los eventos de trabajo medidos
+        self.events: List[Tuple[float, str, str]] = []
+        self.heartbeat_lags: List[float] = []
+        self.received = 0
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._ready = asyncio.Event()
+
+    async def connect(self, host: str, port: int) -> None:
+        start = time.perf_counter()
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        self._writer.write(
+            f"GET /sse HTTP/1.1\r\nHost: {host}:{port}\r\nAccept: text/event-stream\r\n\r\n".encode()
+        )
+        await self._writer.drain()
+        while (await self._reader.readline()) not in (b"\r\n", b""):
+            pass
+        self._task = asyncio.ensure_future(self._read())
+        await self._ready.wait()
+        self.connected_after = (time.perf_counter() - start) * 1000
+
+    async def _chunks(self):
+        # StreamingResponse usa Transfer-Encoding: chunked
+        while True:
+            size = int((await self._reader.readline()).strip() or b"0", 16)
+            if size == 0:
+                return
+            data = await self._reader.readexactly(size + 2)
+            yield data[:-2]
+
+    async def _read(self) -> None:
+        buffer = b""
+        try:
+            async for chunk in self._chunks():
+                buffer += chunk
+                while b"\n\n" in buffer:
+                    raw, buffer = buffer.split(b"\n\n", 1)
+                    self._handle(raw, time.perf_counter())
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._ready.set()
+
+    def _handle(self, raw: bytes, now: float) -> None:
+        data = None
+        for line in raw.split(b"\n"):
+            if line.startswith(b"data: "):
+                data = json.loads(line[6:])
+        if data is None:
+            return
+        self.received += 1
+        kind = data.get("type")
+        if kind == "info" and self.client_id is None:
+            self.client_id = data["client_id"]
+            self._ready.set()
+        elif kind == "heartbeat":
+            self.heartbeat_lags.append(now - self.last_event_at)
+        elif kind in TRACKED_EVENTS and "job_id" in data:
+            self.events.append((now, data["job_id"], kind))
+        self.last_event_at = now
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+async def wait_http(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise Exception(f"El servidor no responde en {url}")
+            await asyncio.sleep(0.2)
+
+
+def start_process(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(args, cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def open_clients(count: int, host: str, port: int, ramp: int) -> Tuple[List[SSEClient], float]:
+    """Abre count conexiones SSE, como máximo ramp a la vez."""
+    semaphore = asyncio.Semaphore(ramp)
+    clients = [SSEClient() for _ in range(count)]
+
+    async def connect(client: SSEClient) -> None:
+        async with semaphore:
+            await client.connect(host, port)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(connect(client) for client in clients))
+    return clients, time.perf_counter() - start
+
+
+async def run_fanout(
+    clients: List[SSEClient],
+    base_url: str,
+    subscribers: int,
+    timeout: float,
+) -> Dict[str, Any]:
+    """
+    Lanza un trabajo por grupo de clientes y mide la entrega de sus eventos.
+
+    Solo se miden los eventos de contenido y job_end, que llegan después de la
+    latencia de Serper: los clientes que se unen tarde a un trabajo reciben al
+    suscribirse los eventos anteriores, que no reflejan el retraso de entrega.
+    """
+    groups = [clients[i:i + subscribers] for i in range(0, len(clients), subscribers)]
+    received_before = sum(client.received for client in clients)
+    submitted: Dict[str, float] = {}
+    limits = httpx.Limits(max_connections=100)
+    start = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as http:
+        async def submit(group_index: int, client: SSEClient) -> None:
+            response = await http.post("/messages/get_docs_stream", json={
+                "query": f"asyncio task #load-{group_index}-{start}",
+                "library": "python",
+                "client_id": client.client_id,
+            })
+            response.raise_for_status()
+            submitted.setdefault(response.json()["job_id"], time.perf_counter())
+
+        await asyncio.gather(*(
+            submit(index, client) for index, group in enumerate(groups) for client in group
+        ))
+
+    # Esperar a que todos los clientes reciban job_end
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if all(any(kind == "job_end" for _, _, kind in client.events) for client in clients):
+            break
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+
+    # Latencia de entrega: retraso de cada cliente respecto al primero que recibe el
+    # mismo evento (n-ésimo evento medido del mismo trabajo)
+    arrivals: Dict[Tuple[str, int], List[float]] = {}
+    completion: List[float] = []
+    for client in clients:
+        counts: Dict[str, int] = {}
+        for at, job_id, kind in client.events:
+            index = counts.get(job_id, 0)
+            counts[job_id] = index + 1
+            arrivals.setdefault((job_id, index), []).append(at)
+            if kind == "job_end" and job_id in submitted:
+                completion.append((at - submitted[job_id]) * 1000)
+    spread = [(at - min(times)) * 1000 for times in arrivals.values() for at in times]
+    delivered = sum(client.received for client in clients) - received_before
+    return {
+        "jobs": len(groups),
+        "events_delivered": delivered,
+        "events_per_second": round(delivered / elapsed, 1),
+        "completed_clients": len(completion),
+        "elapsed_s": round(elapsed, 3),
+        "delivery_spread": summarize(spread),
+        "job_completion": summarize(completion),
+    }
+
+
+async def run_level(count: int, args: argparse.Namespace, upstream_url: str) -> Dict[str, Any]:
+    port = free_port()
+    env = dict(
+        os.environ,
+        SERPER_API_KEY="bench",
+        SERPER_API_URL=upstream_url,
+        PAGE_STORE_PATH="",
+        REDIS_URL="",
+        EVENT_BUS="memory",
+        SSE_HEARTBEAT_INTERVAL=str(args.heartbeat_interval),
+    )
+    server = start_process(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--backlog", "8192"],
+        env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    clients: List[SSEClient] = []
+    try:
+        await wait_http(f"{base_url}/health")
+        await asyncio.sleep(0.5)
+        rss_idle = process_rss(server.pid)
+
+        clients, connect_elapsed = await open_clients(count, "127.0.0.1", port, args.ramp)
+        await asyncio.sleep(0.5)
+        rss_connected = process_rss(server.pid)
+        connected = [client for client in clients if client.client_id]
+
+        result: Dict[str, Any] = {
+            "clients": count,
+            "connected": len(connected),
+            "connect_s": round(connect_elapsed, 3),
+            "connect_latency": summarize([client.connected_after for client in connected]),
+            "rss_idle_mb": round(rss_idle / 2**20, 1) if rss_idle else None,
+            "rss_connected_mb": round(rss_connected / 2**20, 1) if rss_connected else None,
+            "rss_per_connection_kb": (
+                round((rss_connected - rss_idle) / len(connected) / 1024, 1)
+                if rss_idle and rss_connected and connected else None
+            ),
+        }
+
+        cpu_before = process_cpu(server.pid)
+        result["fanout"] = await run_fanout(connected, base_url, args.subscribers, args.timeout)
+        cpu_after = process_cpu(server.pid)
+        delivered = result["fanout"]["events_delivered"]
+        if cpu_before is not None and cpu_after is not None and delivered:
+            result["fanout"]["server_cpu_s"] = round(cpu_after - cpu_before, 3)
+            result["fanout"]["cpu_us_per_event"] = round((cpu_after - cpu_before) / delivered * 1e6, 1)
+        rss_after = process_rss(server.pid)
+        result["rss_after_fanout_mb"] = round(rss_after / 2**20, 1) if rss_after else None
+
+        if args.heartbeat:
+            for client in connected:
+                client.heartbeat_lags.clear()
+            await asyncio.sleep(args.heartbeat_interval * 1.5 + 1)
+            lags = [
+                (lag - args.heartbeat_interval) * 1000
+                for client in connected for lag in client.heartbeat_lags
+            ]
+            result["heartbeat"] = dict(summarize(lags), received=len(lags))
+
+        async with httpx.AsyncClient() as http:
+            stats = (await http.get(f"{base_url}/stats")).json()
+        result["server"] = {
+            "sse": stats.get("sse"),
+            "event_loop_lag": stats.get("event_loop_lag"),
+        }
+        return result
+    finally:
+        await asyncio.gather(*(client.close() for client in clients))
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def print_level(result: Dict[str, Any]) -> None:
+    fanout = result["fanout"]
+    print(
+        f"{result['clients']:>6} clientes: {result['connected']} conectados en {result['connect_s']:.2f}s "
+        f"(p99 {result['connect_latency']['p99_ms']:.0f} ms), "
+        f"RSS {result['rss_idle_mb']} -> {result['rss_connected_mb']} MB "
+        f"({result['rss_per_connection_kb']} KB/conexión)"
+    )
+    print(
+        f"        fan-out: {fanout['jobs']} trabajos, {fanout['events_delivered']} eventos, "
+        f"{fanout['events_per_second']:.0f} eventos/s, CPU {fanout.get('cpu_us_per_event')} µs/evento, "
+        f"retraso entre clientes p50/p99 {fanout['delivery_spread']['p50_ms']:.1f}/"
+        f"{fanout['delivery_spread']['p99_ms']:.1f} ms, job_end p99 {fanout['job_completion']['p99_ms']:.0f} ms"
+    )
+    if "heartbeat" in result:
+        heartbeat = result["heartbeat"]
+        print(
+            f"        latidos: {heartbeat['received']}, retraso p50/p99/máx "
+            f"{heartbeat['p50_ms']:.1f}/{heartbeat['p99_ms']:.1f}/{heartbeat['max_ms']:.1f} ms"
+        )
+    lag = (result["server"].get("event_loop_lag") or {})
+    print(f"        lag del bucle del servidor: p99 {lag.get('p99_ms')} ms, máx {lag.get('max_ms')} ms")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    upstream_port = free_port()
+    upstream = start_process(
+        [sys.executable, os.path.join(BENCH_DIR, "upstream.py"), "--port", str(upstream_port),
+         "--serper-latency", str(args.serper_latency), "--page-latency", str(args.page_latency)],
+        dict(os.environ),
+    )
+    results = []
+    try:
+        await wait_http(f"http://127.0.0.1:{upstream_port}/")
+        for count in (int(level) for level in args.clients.split(",")):
+            result = await run_level(count, args, f"http://127.0.0.1:{upstream_port}/search")
+            print_level(result)
+            results.append(result)
+    finally:
+        upstream.terminate()
+        upstream.wait(timeout=10)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {key: value for key, value in vars(args).items() if key != "output"},
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", default="100,1000", help="Conexiones SSE por nivel, separadas por comas")
+    parser.add_argument("--subscribers", type=int, default=50, help="Clientes que comparten cada trabajo")
+    parser.add_argument("--ramp", type=int, default=200, help="Conexiones abiertas en paralelo")
+    parser.add_argument("--serper-latency", type=float, default=500, help="Latencia de Serper en ms")
+    parser.add_argument("--page-latency", type=float, default=20, help="Latencia de cada página en ms")
+    parser.add_argument("--timeout", type=float, default=120, help="Tiempo máximo de la fase de fan-out en segundos")
+    parser.add_argument("--heartbeat", action="store_true", help="Medir también el retraso de los latidos")
+    parser.add_argument("--heartbeat-interval", type=float, default=5, help="SSE_HEARTBEAT_INTERVAL del servidor")
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto benchmarks/results/sse-<commit>.json)")
+    args = parser.parse_args()
+
+    # Un descriptor por conexión en este proceso y en el servidor (que hereda el límite)
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    report = asyncio.run(run(args))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"sse-{report['meta']['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Corpus HTML para los benchmarks de MCP-Serper.
+
+Carga las páginas grabadas en benchmarks/corpus/ (*.html). Si el directorio está
+vacío, genera un corpus sintético y determinista con la estructura típica de un
+sitio de documentación (cabecera, navegación, barra lateral, scripts, código).
+
+Uso:
+    python benchmarks/corpus.py record https://docs.python.org/3/library/asyncio-task.html ...
+    python benchmarks/corpus.py list
+"""
+
+import os
+import re
+import sys
+import random
+import argparse
+from typing import Dict, List, Optional
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+_WORDS = (
+    "async await coroutine task event loop future callback handler request response "
+    "client server session stream buffer socket timeout retry cache index query result "
+    "module function class method argument parameter return value exception error type "
+    "list dict string bytes integer iterator generator context manager decorator thread"
+).split()
+
+# Contenedor principal de cada variante, para cubrir todas las ramas de la heurística
+_CONTAINERS = [
+    ("<main>", "</main>"),
+    ("<article>", "</article>"),
+    ('<div class="document content">', "</div>"),
+    ("<div>", "</div>"),
+]
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    return text.capitalize() + "."
+
+
+def _section(rng: random.Random, index: int) -> str:
+    paragraphs = "".join(
+        f"<p>{_sentence(rng, rng.randint(12, 40))} <code>{rng.choice(_WORDS)}()</code> "
+        f"{_sentence(rng, rng.randint(8, 25))}</p>\n"
+        for _ in range(rng.randint(2, 5))
+    )
+    code = "\n".join(
+        f"    {rng.choice(_WORDS)} = await {rng.choice(_WORDS)}({rng.choice(_WORDS)})"
+        for _ in range(rng.randint(3, 10))
+    )
+    rows = "".join(
+        f"<tr><td>{rng.choice(_WORDS)}</td><td>{_sentence(rng, 6)}</td></tr>"
+        for _ in range(rng.randint(2, 6))
+    )
+    return (
+        f'<section id="s{index}"><h2>{_sentence(rng, 4)}</h2>\n{paragraphs}'
+        f"<pre><span>async def</span> example_{index}():\n{code}</pre>\n"
+        f"<table><tbody>{rows}</tbody></table></section>\n"
+    )
+
+
+def synthetic_page(seed: int, sections: int) -> str:
+    """
+    Genera una página de documentación sintética.
+
+    Args:
+        seed: Semilla del generador (mismo seed, misma página).
+        sections: Número de secciones de contenido.
+
+    Returns:
+        str: Documento HTML.
+    """
+    rng = random.Random(seed)
+    open_tag, close_tag = _CONTAINERS[seed % len(_CONTAINERS)]
+    nav = "".join(f'<li><a href="/docs/{w}">{w}</a></li>' for w in rng.sample(_WORDS, 30))
+    body = "".join(_section(rng, i) for i in range(sections))
+    return (
+        "<!DOCTYPE html>\n<html lang=\"en\"><head><meta charset=\"utf-8\">"
+        f"<title>{_sentence(rng, 5)} — Documentation</title>"
+        "<style>body { font-family: sans-serif } .nav { display: flex }</style>"
+        "<script>window.dataLayer = window.dataLayer || []; function gtag(){}</script>"
+        "</head><body>"
+        f'<header><div class="logo">Docs</div><nav class="nav"><ul>{nav}</ul></nav></header>'
+        f"<aside><ul>{nav}</ul></aside>"
+        f"{open_tag}<h1>{_sentence(rng, 6)}</h1>\n{body}"
+        "<script>document.querySelectorAll('pre').forEach(function(e){});</script>"
+        f"{close_tag}"
+        "<footer><p>© Docs project. Licensed under MIT.</p></footer>"
+        "</body></html>"
+    )
+
+
+def synthetic_corpus(pages: int = 24) -> Dict[str, str]:
+    """
+    Genera un corpus sintético con páginas de entre ~10 KB y ~400 KB.
+
+    Args:
+        pages: Número de páginas.
+
+    Returns:
+        Dict: Nombre de la página -> documento HTML.
+    """
+    sizes = [5, 20, 60, 200]
+    return {
+        f"synthetic-{i:02d}.html": synthetic_page(i, sizes[(i // len(_CONTAINERS)) % len(sizes)])
+        for i in range(pages)
+    }
+
+
+def load_corpus(directory: Optional[str] = None) -> Dict[str, str]:
+    """
+    Carga el corpus grabado o, si no hay páginas, el sintético.
+
+    Args:
+        directory: Directorio con archivos *.html. Por defecto benchmarks/corpus/.
+
+    Returns:
+        Dict: Nombre de la página -> documento HTML.
+    """
+    directory = directory or CORPUS_DIR
+    pages = {}
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".html"):
+                with open(os.path.join(directory, name), encoding="utf-8", errors="replace") as f:
+                    pages[name] = f.read()
+    return pages or synthetic_corpus()
+
+
+def record(urls: List[str], directory: Optional[str] = None) -> None:
+    """
+    Descarga páginas reales y las guarda en el corpus.
+
+    Args:
+        urls: URLs a grabar.
+        directory: Directorio de destino. Por defecto benchmarks/corpus/.
+    """
+    import httpx
+
+    directory = directory or CORPUS_DIR
+    os.makedirs(directory, exist_ok=True)
+    with httpx.Client(follow_redirects=True, timeout=30) as client:
+        for url in urls:
+            response = client.get(url)
+            response.raise_for_status()
+            name = re.sub(r"[^A-Za-z0-9]+", "-", url.split("://", 1)[-1]).strip("-")[:120] + ".html"
+            with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+                f.write(response.text)
+            print(f"{name}: {len(response.content) // 1024} KB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    record_parser = subparsers.add_parser("record", help="Grabar páginas reales en el corpus")
+    record_parser.add_argument("urls", nargs="+")
+    subparsers.add_parser("list", help="Listar las páginas del corpus")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record(args.urls)
+    else:
+        for name, html in load_corpus().items():
+            print(f"{name}: {len(html.encode('utf-8')) // 1024} KB")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
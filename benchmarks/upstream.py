@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Servidor local que sustituye a las dependencias externas en los benchmarks.
+
+Hace de API de Serper (POST con una consulta o una lista de consultas) y de sitio
+de documentación (GET /<página> con las páginas del corpus), con latencia y
+tamaños configurables. Cada consulta devuelve siempre las mismas páginas; una
+palabra "#<marca>" en la consulta añade ?v=<marca> a sus URLs para que no haya
+aciertos de caché entre consultas distintas.
+
+Uso:
+    python benchmarks/upstream.py --port 9000 --serper-latency 100 --page-latency 30
+"""
+
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+from urllib.parse import urlparse
+
+from corpus import load_corpus
+
+
+def resize_page(html: str, size: int) -> str:
+    """Ajusta una página a unos size bytes (rellenando con párrafos o recortando)."""
+    if size <= 0:
+        return html
+    if len(html) > size:
+        return html[:size] + "</body></html>"
+    filler = "<p>" + "lorem ipsum dolor sit amet consectetur " * 20 + "</p>\n"
+    count = (size - len(html)) // len(filler) + 1
+    head, _, tail = html.rpartition("</body>")
+    return head + filler * count + "</body>" + tail if head else html + filler * count
+
+
+def start_server(
+    pages: Dict[str, bytes],
+    serper_latency: float,
+    page_latency: float,
+    jitter: float,
+    snippet_words: int,
+    port: int = 0,
+) -> ThreadingHTTPServer:
+    """
+    Inicia el servidor local de Serper y de páginas.
+
+    Args:
+        pages: Nombre de la página -> cuerpo.
+        serper_latency: Latencia de cada búsqueda en segundos.
+        page_latency: Latencia de cada página en segundos.
+        jitter: Latencia adicional aleatoria (uniforme) en segundos.
+        snippet_words: Palabras de cada snippet (tamaño de la respuesta de búsqueda).
+        port: Puerto de escucha (0 = uno libre).
+
+    Returns:
+        ThreadingHTTPServer: Servidor en marcha en un hilo.
+    """
+    names = sorted(pages)
+    snippet = " ".join(["documentation"] * snippet_words)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(serper_latency + random.uniform(0, jitter))
+            queries = payload if isinstance(payload, list) else [payload]
+            host = f"http://{self.headers['Host']}"
+            responses = []
+            for query in queries:
+                q = query.get("q", "")
+                # Páginas deterministas por consulta; el parámetro v hace única cada URL
+                first = sum(q.encode()) % len(names)
+                marker = next((token[1:] for token in q.split() if token.startswith("#")), None)
+                unique = f"?v={marker}" if marker else ""
+                responses.append({
+                    "searchParameters": {"q": q},
+                    "organic": [
+                        {
+                            "title": f"{names[(first + i) % len(names)]} — {q}",
+                            "link": f"{host}/{names[(first + i) % len(names)]}{unique}",
+                            "snippet": snippet,
+                            "position": i + 1,
+                        }
+                        for i in range(int(query.get("num", 10)))
+                    ],
+                })
+            body = responses if isinstance(payload, list) else responses[0]
+            self._send(200, json.dumps(body).encode(), "application/json")
+
+        def do_GET(self):
+            time.sleep(page_latency + random.uniform(0, jitter))
+            body = pages.get(urlparse(self.path).path.lstrip("/"))
+            if body is None:
+                self._send(404, b"", "text/plain")
+            else:
+                self._send(200, body, "text/html; charset=utf-8")
+
+        def log_message(self, format, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        # Con la cola de escucha por defecto (5) las conexiones simultáneas sufren
+        # retransmisiones SYN de 1 s que falsean la medida
+        request_queue_size = 1024
+        daemon_threads = True
+
+    server = Server(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9000, help="Puerto de escucha")
+    parser.add_argument("--serper-latency", type=float, default=50, help="Latencia de Serper en ms")
+    parser.add_argument("--page-latency", type=float, default=20, help="Latencia de cada página en ms")
+    parser.add_argument("--jitter", type=float, default=0, help="Latencia aleatoria adicional en ms")
+    parser.add_argument("--page-kb", type=int, default=0, help="Tamaño de las páginas en KB (0 = el del corpus)")
+    parser.add_argument("--snippet-words", type=int, default=30, help="Palabras por snippet en las respuestas de Serper")
+    parser.add_argument("--corpus", help="Directorio con páginas *.html")
+    args = parser.parse_args()
+
+    pages = {name: resize_page(html, args.page_kb * 1024).encode("utf-8") for name, html in load_corpus(args.corpus).items()}
+    server = start_server(
+        pages,
+        args.serper_latency / 1000,
+        args.page_latency / 1000,
+        args.jitter / 1000,
+        args.snippet_words,
+        port=args.port,
+    )
+    print(f"Serper: http://127.0.0.1:{server.server_address[1]}/search ({len(pages)} páginas)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
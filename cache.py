@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cachés de resultados para MCP-Serper.
+
+Define una interfaz mínima de caché asíncrona (CacheBackend) y sus implementaciones:
+una caché en memoria acotada por número de entradas y por bytes, con expulsión LRU,
+TTL por entrada y contadores de aciertos, fallos y expulsiones; una caché compartida
+sobre Redis; y una caché de dos niveles que combina ambas. Incluye además
+SingleFlight, que agrupa las llamadas idénticas en curso para evitar que varios
+fallos de caché simultáneos generen varias peticiones al mismo recurso.
+"""
+
+import json
+import time
+import zlib
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger("mcp-serper")
+
+
+def _text_size(text: str) -> int:
+    """Bytes de un texto en UTF-8, sin copiarlo si es ASCII."""
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estima el tamaño en bytes de un valor serializable a JSON.
+
+    Recorre el valor sin serializarlo: los textos cuentan sus bytes en UTF-8 y cada
+    contenedor, clave o escalar añade una pequeña cantidad fija. El resultado se
+    aproxima al tamaño de json.dumps sin el coste de generar la cadena en cada
+    escritura de la caché.
+
+    Args:
+        value: Valor a medir.
+
+    Returns:
+        int: Tamaño aproximado en bytes.
+    """
+    size = 0
+    pending = [value]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, str):
+            size += _text_size(item) + 2
+        elif isinstance(item, (bytes, bytearray)):
+            size += len(item)
+        elif isinstance(item, dict):
+            size += 2
+            for key, child in item.items():
+                size += _text_size(str(key)) + 4
+                pending.append(child)
+        elif isinstance(item, (list, tuple)):
+            size += 2 + len(item)
+            pending.extend(item)
+        else:
+            # Números, booleanos y None
+            size += 8
+    return size
+
+
+class CacheBackend:
+    """
+    Interfaz de caché usada por las herramientas de búsqueda.
+
+    Los métodos son asíncronos para que puedan implementarse tanto en memoria
+    como sobre servicios externos.
+    """
+
+    name = "cache"
+
+    async def get(self, key: str) -> Optional[Any]:
+        """
+        Recupera un valor de la caché.
+
+        Args:
+            key: Clave del valor.
+
+        Returns:
+            Optional[Any]: Valor almacenado, o None si no existe o ha expirado.
+        """
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Almacena un valor en la caché.
+
+        Args:
+            key: Clave del valor.
+            value: Valor a almacenar.
+            ttl: Tiempo de vida en segundos. Si es None se usa el de la caché.
+        """
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        """Elimina una clave de la caché."""
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        """Vacía la caché."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        """Devuelve los contadores de la caché."""
+        return {}
+
+
+class LRUTTLCache(CacheBackend):
+    """
+    Caché en memoria con expulsión LRU y expiración por entrada.
+
+    La caché se limita por número de entradas y, opcionalmente, por un presupuesto
+    de bytes estimado a partir del tamaño serializado de cada valor.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        max_bytes: int = 0,
+        default_ttl: Optional[float] = 3600.0,
+        name: str = "memory",
+    ):
+        """
+        Args:
+            max_entries: Número máximo de entradas (0 = sin límite).
+            max_bytes: Presupuesto máximo en bytes (0 = sin límite).
+            default_ttl: Tiempo de vida por defecto en segundos (None = sin expiración).
+            name: Nombre de la caché para logs y estadísticas.
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # clave -> (valor, instante de expiración, tamaño)
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and not self._is_expired(entry)
+
+    @staticmethod
+    def _is_expired(entry: Tuple[Any, Optional[float], int]) -> bool:
+        expires_at = entry[1]
+        return expires_at is not None and expires_at <= time.monotonic()
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _evict(self) -> None:
+        """Expulsa las entradas menos usadas hasta respetar los límites."""
+        while self._entries and (
+            (self.max_entries and len(self._entries) > self.max_entries)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if self._is_expired(entry):
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        size = estimate_size(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            logger.warning(f"Valor demasiado grande para la caché {self.name}: {size} bytes")
+            return
+        if key in self._entries:
+            self._remove(key)
+        expires_at = time.monotonic() + ttl if ttl else None
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+        self._evict()
+
+    async def delete(self, key: str) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class RedisCache(CacheBackend):
+    """
+    Caché compartida sobre Redis.
+
+    Los valores se serializan como JSON compacto y se comprimen con zlib cuando
+    superan un umbral. Si Redis no responde, la caché falla en abierto: las
+    operaciones se comportan como fallos de caché y Redis no se vuelve a consultar
+    hasta que pasa un tiempo de espera.
+    """
+
+    # Prefijos de formato de los valores serializados
+    _RAW = b"j"
+    _COMPRESSED = b"z"
+
+    def __init__(
+        self,
+        client: Any,
+        prefix: str = "mcp-serper:",
+        default_ttl: Optional[float] = 3600.0,
+        compress_threshold: int = 1024,
+        retry_after: float = 30.0,
+        name: str = "redis",
+    ):
+        """
+        Args:
+            client: Cliente asíncrono compatible con redis.asyncio.Redis (get/set/delete).
+            prefix: Prefijo de las claves en Redis.
+            default_ttl: Tiempo de vida por defecto en segundos (None = sin expiración).
+            compress_threshold: Tamaño en bytes a partir del cual se comprime el valor.
+            retry_after: Segundos sin consultar Redis tras un error.
+            name: Nombre de la caché para logs y estadísticas.
+        """
+        self.name = name
+        self._client = client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.compress_threshold = compress_threshold
+        self.retry_after = retry_after
+        self._down_until = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _serialize(self, value: Any) -> bytes:
+        data = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        if len(data) >= self.compress_threshold:
+            return self._COMPRESSED + zlib.compress(data, 6)
+        return self._RAW + data
+
+    def _deserialize(self, data: bytes) -> Any:
+        marker, payload = data[:1], data[1:]
+        if marker == self._COMPRESSED:
+            payload = zlib.decompress(payload)
+        return json.loads(payload)
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _mark_down(self, operation: str, error: Exception) -> None:
+        self.errors += 1
+        self._down_until = time.monotonic() + self.retry_after
+        logger.warning(
+            f"Redis no disponible en {operation} ({error}). "
+            f"Se omitirá la caché {self.name} durante {self.retry_after:.0f}s."
+        )
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not self._available():
+            self.misses += 1
+            return None
+        try:
+            data = await self._client.get(self.prefix + key)
+        except Exception as e:
+            self._mark_down("get", e)
+            self.misses += 1
+            return None
+        if data is None:
+            self.misses += 1
+            return None
+        try:
+            value = self._deserialize(data)
+        except Exception as e:
+            logger.warning(f"Valor corrupto en la caché {self.name} para {key}: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if not self._available():
+            return
+        ttl = self.default_ttl if ttl is None else ttl
+        try:
+            await self._client.set(
+                self.prefix + key,
+                self._serialize(value),
+                ex=max(1, int(ttl)) if ttl else None,
+            )
+        except Exception as e:
+            self._mark_down("set", e)
+
+    async def delete(self, key: str) -> None:
+        if not self._available():
+            return
+        try:
+            await self._client.delete(self.prefix + key)
+        except Exception as e:
+            self._mark_down("delete", e)
+
+    async def clear(self) -> None:
+        """Elimina todas las claves con el prefijo de esta caché."""
+        if not self._available():
+            return
+        try:
+            keys = [key async for key in self._client.scan_iter(match=self.prefix + "*")]
+            if keys:
+                await self._client.delete(*keys)
+        except Exception as e:
+            self._mark_down("clear", e)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "available": self._available(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class TieredCache(CacheBackend):
+    """
+    Caché de dos niveles: L1 en memoria del proceso delante de una L2 compartida.
+
+    Las lecturas consultan L1 y, si fallan, L2; los aciertos de L2 se copian a L1.
+    Las escrituras van a ambos niveles.
+    """
+
+    def __init__(self, l1: CacheBackend, l2: CacheBackend, name: str = "tiered"):
+        """
+        Args:
+            l1: Caché local del proceso.
+            l2: Caché compartida entre procesos.
+            name: Nombre de la caché para logs y estadísticas.
+        """
+        self.name = name
+        self.l1 = l1
+        self.l2 = l2
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = await self.l1.get(key)
+        if value is not None:
+            return value
+        value = await self.l2.get(key)
+        if value is not None:
+            await self.l1.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        await self.l1.set(key, value, ttl)
+        await self.l2.set(key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        await self.l1.delete(key)
+        await self.l2.delete(key)
+
+    async def clear(self) -> None:
+        await self.l1.clear()
+        await self.l2.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "l1": self.l1.stats(),
+            "l2": self.l2.stats(),
+        }
+
+
+class _Flight:
+    """Llamada en curso compartida por varios solicitantes."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes con la misma clave en una única ejecución.
+
+    El primer solicitante lanza la operación en una tarea; los siguientes esperan
+    el mismo resultado (o la misma excepción). La tarea solo se cancela si todos
+    los solicitantes que la esperan se cancelan.
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        """
+        Args:
+            name: Nombre del grupo para logs y estadísticas.
+        """
+        self.name = name
+        self._flights: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._flights
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Evitar avisos de "exception was never retrieved" si nadie espera ya
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Ejecuta fn una sola vez para todas las llamadas concurrentes con la misma clave.
+
+        Args:
+            key: Clave normalizada de la operación.
+            fn: Función sin argumentos que devuelve la corrutina a ejecutar.
+
+        Returns:
+            Any: Resultado de la operación compartida.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+            logger.info(f"Uniendo solicitud en curso ({self.name}): {key}")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "in_flight": len(self._flights),
+            "upstream_calls": self.leaders,
+            "coalesced": self.coalesced,
+        }
+
+
+# Cliente Redis compartido por todas las cachés del proceso
+_redis_client: Optional[Any] = None
+
+
+def get_redis_client(url: str) -> Optional[Any]:
+    """
+    Obtiene el cliente Redis compartido, creándolo si no existe.
+
+    La conexión se establece de forma perezosa en la primera operación.
+
+    Args:
+        url: URL de conexión (REDIS_URL).
+
+    Returns:
+        Optional[Any]: Cliente redis.asyncio, o None si el paquete no está instalado.
+    """
+    global _redis_client
+    if _redis_client is None:
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            logger.warning("El paquete 'redis' no está instalado. Se usará solo la caché en memoria.")
+            return None
+        _redis_client = redis_asyncio.from_url(
+            url,
+            socket_timeout=1.0,
+            socket_connect_timeout=1.0,
+        )
+    return _redis_client
+
+
+async def close_redis_client() -> None:
+    """Cierra el cliente Redis compartido si se creó."""
+    global _redis_client
+    client, _redis_client = _redis_client, None
+    if client is not None:
+        close = getattr(client, "aclose", None) or client.close
+        await close()
+
+
+def build_cache(
+    name: str,
+    max_entries: int,
+    max_bytes: int,
+    ttl: Optional[float],
+    redis_url: Optional[str] = None,
+) -> CacheBackend:
+    """
+    Construye la caché de un tipo de resultado.
+
+    Args:
+        name: Nombre de la caché (también se usa como prefijo en Redis).
+        max_entries: Entradas máximas de la L1 en memoria.
+        max_bytes: Presupuesto en bytes de la L1 en memoria.
+        ttl: Tiempo de vida por defecto en segundos.
+        redis_url: URL de Redis. Si se indica, se añade una L2 compartida.
+
+    Returns:
+        CacheBackend: Caché en memoria o caché de dos niveles.
+    """
+    l1 = LRUTTLCache(max_entries=max_entries, max_bytes=max_bytes, default_ttl=ttl, name=name)
+    if not redis_url:
+        return l1
+    client = get_redis_client(redis_url)
+    if client is None:
+        return l1
+    l2 = RedisCache(client, prefix=f"mcp-serper:{name}:", default_ttl=ttl, name=f"{name}-redis")
+    return TieredCache(l1, l2, name=name)
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Índice local de texto completo (BM25) para MCP-Serper.
+
+Cada página que extrae fetch_url se añade a un índice invertido en memoria,
+etiquetada con su dominio y con las bibliotecas de docs_urls a las que pertenece.
+Así get_docs puede responder consultas frecuentes sin llamar a Serper.
+
+Las listas de postings se guardan como pares de array.array (identificadores de
+documento y frecuencias), mucho más compactos que listas de objetos Python.
+"""
+
+import re
+import math
+import logging
+from array import array
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger("mcp-serper")
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Palabras vacías frecuentes en inglés y español
+STOPWORDS = frozenset(
+    """
+    a an and are as at be by for from has have in is it its of on or that the this to was
+    were will with how what when where which who why you your can do does not
+    de del el la las los un una unos unas y o en para por con sin que se su sus es al lo
+    como más pero sobre este esta estos estas
+    """.split()
+)
+
+# Peso del título frente al cuerpo (el título se cuenta varias veces)
+TITLE_WEIGHT = 3
+
+# Longitud máxima del fragmento guardado por documento
+SNIPPET_LENGTH = 300
+
+# Frecuencia máxima representable en los postings (array "H")
+_MAX_TF = 65535
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Divide un texto en términos normalizados.
+
+    Args:
+        text: Texto a analizar.
+
+    Returns:
+        List: Términos en minúsculas, sin palabras vacías ni términos de un carácter.
+    """
+    return [
+        token for token in _TOKEN_RE.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+def analyze_document(title: str, content: str) -> Tuple[Dict[str, int], int]:
+    """
+    Calcula las frecuencias de términos de un documento.
+
+    Es la parte costosa de la indexación y no toca el índice, por lo que puede
+    ejecutarse fuera del bucle de eventos.
+
+    Args:
+        title: Título del documento.
+        content: Texto del documento.
+
+    Returns:
+        Tuple: Frecuencia de cada término y longitud del documento en términos.
+    """
+    counts = Counter(tokenize(content))
+    for token in tokenize(title or ""):
+        counts[token] += TITLE_WEIGHT
+    return dict(counts), sum(counts.values())
+
+
+class _Document:
+    """Metadatos de un documento indexado."""
+
+    __slots__ = ("url", "location", "title", "snippet", "domain", "libraries", "length")
+
+    def __init__(
+        self,
+        url: str,
+        location: str,
+        title: str,
+        snippet: str,
+        domain: str,
+        libraries: Tuple[str, ...],
+        length: int,
+    ):
+        self.url = url
+        self.location = location
+        self.title = title
+        self.snippet = snippet
+        self.domain = domain
+        self.libraries = libraries
+        self.length = length
+
+
+class DocsIndex:
+    """
+    Índice invertido con ranking BM25.
+
+    El índice está acotado por número de documentos: al superarlo se retiran los más
+    antiguos. Reindexar una URL sustituye su versión anterior. Los documentos
+    retirados se eliminan de los postings cuando superan una fracción del índice.
+    """
+
+    def __init__(
+        self,
+        library_sites: Optional[Dict[str, str]] = None,
+        max_documents: int = 5000,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        """
+        Args:
+            library_sites: Biblioteca -> sitio (docs_urls), para etiquetar documentos.
+            max_documents: Número máximo de documentos indexados.
+            k1: Parámetro de saturación de frecuencia de BM25.
+            b: Parámetro de normalización por longitud de BM25.
+        """
+        self.max_documents = max_documents
+        self.k1 = k1
+        self.b = b
+        # Sitios ordenados de más a menos específico
+        self._sites: List[Tuple[str, str]] = sorted(
+            ((site.lower(), library) for library, site in (library_sites or {}).items()),
+            key=lambda item: -len(item[0]),
+        )
+        self._documents: List[Optional[_Document]] = []
+        self._by_url: Dict[str, int] = {}
+        self._order: Deque[int] = deque()
+        # término -> (identificadores de documento, frecuencias)
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._live = 0
+        self._dead = 0
+        self._total_length = 0
+        self.queries = 0
+
+    @staticmethod
+    def _location(url: str) -> Tuple[str, str]:
+        """Devuelve el dominio y la ubicación (dominio + ruta) de una URL."""
+        parsed = urlparse(url)
+        domain = parsed.netloc.lower()
+        return domain, domain + parsed.path
+
+    @staticmethod
+    def _matches_site(location: str, site: str) -> bool:
+        """
+        Indica si una ubicación pertenece a un sitio (dominio con o sin ruta).
+
+        El dominio coincide consigo mismo y con sus subdominios (docs.python.org con
+        python.org, pero no python.org.evil.com); la ruta, por prefijo de segmentos.
+        """
+        host, _, path = location.partition("/")
+        site_host, _, site_path = site.lower().rstrip("/").partition("/")
+        if host != site_host and not host.endswith("." + site_host):
+            return False
+        return not site_path or path == site_path or path.startswith(site_path + "/")
+
+    def libraries_for(self, url: str) -> Tuple[str, ...]:
+        """
+        Bibliotecas de docs_urls a las que pertenece una URL.
+
+        Args:
+            url: URL del documento.
+
+        Returns:
+            Tuple: Nombres de biblioteca.
+        """
+        _, location = self._location(url)
+        return tuple(library for site, library in self._sites if self._matches_site(location, site))
+
+    def __len__(self) -> int:
+        return self._live
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._by_url
+
+    def _retire(self, doc_id: int) -> None:
+        document = self._documents[doc_id]
+        if document is None:
+            return
+        self._documents[doc_id] = None
+        del self._by_url[document.url]
+        self._total_length -= document.length
+        self._live -= 1
+        self._dead += 1
+
+    def _compact(self) -> None:
+        """Elimina de los postings los documentos retirados."""
+        documents = self._documents
+        for term in list(self._postings):
+            doc_ids, freqs = self._postings[term]
+            kept = [(d, f) for d, f in zip(doc_ids, freqs) if documents[d] is not None]
+            if kept:
+                self._postings[term] = (array("I", (d for d, _ in kept)), array("H", (f for _, f in kept)))
+            else:
+                del self._postings[term]
+        self._dead = 0
+
+    def add_analyzed(
+        self,
+        url: str,
+        title: str,
+        content: str,
+        term_counts: Dict[str, int],
+        length: int,
+    ) -> None:
+        """
+        Añade un documento ya analizado con analyze_document.
+
+        Args:
+            url: URL del documento.
+            title: Título del documento.
+            content: Texto del documento (solo se guarda un fragmento).
+            term_counts: Frecuencia de cada término.
+            length: Longitud del documento en términos.
+        """
+        if not term_counts:
+            return
+
+        if url in self._by_url:
+            self._retire(self._by_url[url])
+
+        domain, location = self._location(url)
+        doc_id = len(self._documents)
+        self._documents.append(_Document(
+            url=url,
+            location=location,
+            title=title or "Sin título",
+            snippet=content[:SNIPPET_LENGTH],
+            domain=domain,
+            libraries=self.libraries_for(url),
+            length=length,
+        ))
+        self._by_url[url] = doc_id
+        self._order.append(doc_id)
+        self._live += 1
+        self._total_length += length
+
+        for term, count in term_counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = (array("I"), array("H"))
+                self._postings[term] = postings
+            postings[0].append(doc_id)
+            postings[1].append(min(count, _MAX_TF))
+
+        # Retirar los documentos más antiguos si se supera el límite
+        while self._live > self.max_documents and self._order:
+            self._retire(self._order.popleft())
+        if self._dead > max(64, self._live // 4):
+            self._compact()
+
+    def add(self, url: str, title: str, content: str) -> None:
+        """
+        Analiza y añade un documento al índice.
+
+        Args:
+            url: URL del documento.
+            title: Título del documento.
+            content: Texto del documento.
+        """
+        term_counts, length = analyze_document(title, content)
+        self.add_analyzed(url, title, content, term_counts, length)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 5,
+        library: Optional[str] = None,
+        site: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Busca documentos con ranking BM25.
+
+        Args:
+            query: Consulta de búsqueda.
+            limit: Número máximo de resultados.
+            library: Filtrar por biblioteca de docs_urls.
+            site: Filtrar por dominio o dominio + ruta.
+
+        Returns:
+            List: Resultados con "title", "link", "snippet", "score" y "coverage" (fracción
+            de los términos de la consulta presentes en el documento), de mayor a menor relevancia.
+        """
+        self.queries += 1
+        terms = set(tokenize(query))
+        if not terms or not self._live:
+            return []
+
+        documents = self._documents
+        total = self._live
+        avg_length = self._total_length / total
+        k1, b = self.k1, self.b
+        scores: Dict[int, float] = {}
+        matched: Dict[int, int] = {}
+
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            # Los documentos retirados que siguen en los postings no cuentan para df
+            live = [(documents[d], d, tf) for d, tf in zip(*postings) if documents[d] is not None]
+            idf = math.log(1 + (total - len(live) + 0.5) / (len(live) + 0.5))
+            for document, doc_id, tf in live:
+                norm = k1 * (1 - b + b * document.length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+                matched[doc_id] = matched.get(doc_id, 0) + 1
+
+        ranked = sorted(scores.items(), key=lambda item: -item[1])
+        results = []
+        for doc_id, score in ranked:
+            document = documents[doc_id]
+            # Solo se puntúan documentos vivos; la comprobación es para el tipado
+            if document is None:
+                continue
+            if library and library not in document.libraries:
+                continue
+            if site and not self._matches_site(document.location, site):
+                continue
+            results.append({
+                "title": document.title,
+                "link": document.url,
+                "snippet": document.snippet,
+                "score": round(score, 4),
+                "coverage": round(matched[doc_id] / len(terms), 4),
+            })
+            if len(results) >= limit:
+                break
+        return results
+
+    def libraries(self) -> Dict[str, int]:
+        """Número de documentos indexados por biblioteca."""
+        counts: Counter = Counter()
+        for document in self._documents:
+            if document is not None:
+                counts.update(document.libraries)
+        return dict(counts)
+
+    def stats(self) -> Dict[str, Any]:
+        postings = sum(len(doc_ids) for doc_ids, _ in self._postings.values())
+        return {
+            "documents": self._live,
+            "max_documents": self.max_documents,
+            "terms": len(self._postings),
+            "postings": postings,
+            "postings_bytes": postings * 6,
+            "retired_pending": self._dead,
+            "queries": self.queries,
+        }
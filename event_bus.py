@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Bus de eventos entre workers para el servidor SSE.
+
+Una sesión SSE vive en el worker que mantiene la conexión, pero la solicitud que
+lanza un trabajo (o lo cancela) puede llegar a cualquier otro worker o nodo. El bus
+entrega cada evento al worker que tiene la sesión y difunde las cancelaciones a
+todos los workers.
+
+Backends (EVENT_BUS):
+
+    memory  un solo proceso: las sesiones y los trabajos están siempre en el mismo
+            worker y el bus no hace nada
+    redis   cada worker registra sus sesiones en Redis (clave con TTL que indica el
+            worker y si el cliente está conectado) y se suscribe a un canal propio;
+            los eventos se publican en el canal del worker de la sesión y las
+            cancelaciones en un canal común. Los trabajos terminados se guardan en
+            Redis para consultarlos desde cualquier worker
+
+El backend de Redis falla en abierto: si Redis no responde, los eventos para
+sesiones de otros workers se pierden, pero las sesiones locales siguen funcionando.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from cache import RedisCache
+
+logger = logging.getLogger("mcp-serper-server")
+
+# Backend del bus: memory o redis
+EVENT_BUS = os.environ.get("EVENT_BUS", "memory")
+# URL de Redis para el bus (por defecto REDIS_URL)
+EVENT_BUS_REDIS_URL = os.environ.get("EVENT_BUS_REDIS_URL") or os.environ.get("REDIS_URL")
+# Prefijo de claves y canales en Redis
+EVENT_BUS_PREFIX = os.environ.get("EVENT_BUS_PREFIX", "mcp-serper:bus:")
+# Segundos que se recuerda en local el worker de una sesión remota
+EVENT_BUS_ROUTE_TTL = float(os.environ.get("EVENT_BUS_ROUTE_TTL", 5))
+
+EventHandler = Callable[[str, Dict[str, Any]], Awaitable[None]]
+CancelHandler = Callable[[str, Optional[str]], Awaitable[None]]
+AdoptHandler = Callable[[str], Awaitable[None]]
+
+
+class EventBus:
+    """
+    Bus en memoria para un solo proceso.
+
+    Define la interfaz de los backends: como todas las sesiones son locales, no hay
+    nada que enrutar y las operaciones no tienen efecto.
+    """
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._on_event: Optional[EventHandler] = None
+        self._on_cancel: Optional[CancelHandler] = None
+        self._on_adopt: Optional[AdoptHandler] = None
+        self.published = 0
+        self.delivered = 0
+        self.undeliverable = 0
+        self.errors = 0
+
+    async def start(
+        self,
+        on_event: EventHandler,
+        on_cancel: CancelHandler,
+        on_adopt: Optional[AdoptHandler] = None,
+    ) -> None:
+        """
+        Empieza a recibir mensajes de otros workers.
+
+        Args:
+            on_event: Entrega un evento a una sesión local.
+            on_cancel: Cancela trabajos locales de un cliente (y opcionalmente un job_id).
+            on_adopt: Libera la copia local de una sesión que otro worker ha adoptado.
+        """
+        self._on_event = on_event
+        self._on_cancel = on_cancel
+        self._on_adopt = on_adopt
+
+    async def publish_event(self, client_id: str, data: Dict[str, Any]) -> bool:
+        """
+        Envía un evento a la sesión de otro worker.
+
+        Returns:
+            bool: True si algún worker tiene la sesión.
+        """
+        self.undeliverable += 1
+        return False
+
+    async def publish_cancel(self, client_id: str, job_id: Optional[str] = None) -> None:
+        """Difunde una cancelación a los demás workers."""
+
+    async def register_session(self, client_id: str, disconnected_at: Optional[float] = None) -> None:
+        """
+        Anuncia que una sesión vive en este worker.
+
+        Args:
+            client_id: ID de la sesión SSE.
+            disconnected_at: Momento (epoch) de la desconexión, o None si está conectada.
+        """
+
+    async def adopt_session(self, client_id: str) -> None:
+        """
+        Registra en este worker una sesión que tenía otro y avisa a los demás.
+
+        Los demás workers olvidan la ruta que tenían en caché y liberan su copia local.
+        """
+        await self.register_session(client_id)
+
+    async def session_owner(self, client_id: str) -> Optional[str]:
+        """
+        Worker que tiene registrada una sesión.
+
+        Returns:
+            Optional[str]: ID del worker, o None si no se sabe o ningún worker la tiene.
+        """
+        return None
+
+    async def session_idle(self, client_id: str) -> float:
+        """
+        Segundos que lleva desconectada una sesión de otro worker.
+
+        Returns:
+            float: 0 si está conectada, infinito si ningún worker la tiene.
+        """
+        return float("inf")
+
+    async def store_job(self, job: Dict[str, Any], ttl: float) -> None:
+        """Guarda un trabajo terminado para consultarlo desde otros workers."""
+
+    async def load_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Recupera un trabajo terminado en otro worker."""
+        return None
+
+    async def close(self) -> None:
+        """Deja de recibir mensajes."""
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "worker_id": self.worker_id,
+            "published": self.published,
+            "delivered": self.delivered,
+            "undeliverable": self.undeliverable,
+            "errors": self.errors,
+        }
+
+
+class RedisEventBus(EventBus):
+    """
+    Bus sobre Redis pub/sub.
+
+    Sesiones:      {prefix}session:<client_id> -> {"w": worker, "d": desconexión}
+    Eventos:       canal {prefix}worker:<worker_id>, un mensaje por evento
+    Cancelaciones: canal {prefix}cancel, recibido por todos los workers (también
+                   los avisos de sesiones adoptadas por otro worker)
+    Trabajos:      {prefix}job:<job_id> mediante RedisCache (JSON con zlib)
+    """
+
+    name = "redis"
+
+    def __init__(
+        self,
+        url: str,
+        prefix: str = EVENT_BUS_PREFIX,
+        session_ttl: float = 120.0,
+        route_ttl: float = EVENT_BUS_ROUTE_TTL,
+    ):
+        """
+        Args:
+            url: URL de conexión a Redis.
+            prefix: Prefijo de claves y canales.
+            session_ttl: Tiempo de vida de la clave de una sesión (se renueva periódicamente).
+            route_ttl: Segundos que se recuerda en local el worker de una sesión remota.
+
+        Raises:
+            ImportError: Si el paquete redis no está instalado.
+        """
+        super().__init__()
+        import redis.asyncio as redis_asyncio
+
+        # Conexión propia: la suscripción mantiene una lectura bloqueante y no
+        # puede compartir el tiempo de espera corto del cliente de la caché
+        self._client = redis_asyncio.from_url(url, socket_connect_timeout=1.0, health_check_interval=30)
+        self.prefix = prefix
+        self.session_ttl = session_ttl
+        self.route_ttl = route_ttl
+        self._channel = f"{prefix}worker:{self.worker_id}"
+        self._cancel_channel = f"{prefix}cancel"
+        self._routes: Dict[str, Tuple[Optional[str], float]] = {}
+        self._jobs = RedisCache(self._client, prefix=f"{prefix}job:", name="jobs-redis")
+        self._listener: Optional["asyncio.Task[None]"] = None
+        self.cancels = 0
+
+    def _session_key(self, client_id: str) -> str:
+        return f"{self.prefix}session:{client_id}"
+
+    async def start(
+        self,
+        on_event: EventHandler,
+        on_cancel: CancelHandler,
+        on_adopt: Optional[AdoptHandler] = None,
+    ) -> None:
+        await super().start(on_event, on_cancel, on_adopt)
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.ensure_future(self._listen())
+
+    async def _listen(self) -> None:
+        """Recibe los mensajes del canal del worker y del canal de cancelaciones."""
+        delay = 1.0
+        while True:
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self._channel, self._cancel_channel)
+                logger.info(f"Bus de eventos suscrito a Redis como {self.worker_id}")
+                delay = 1.0
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        await self._handle(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Suscripción del bus de eventos interrumpida ({e}). Reintentando en {delay:.0f}s.")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def _handle(self, raw: bytes) -> None:
+        try:
+            message = json.loads(raw)
+            # Los manejadores se registran en start(); sin ellos el mensaje se descarta
+            if message["t"] == "event":
+                if self._on_event is not None:
+                    self.delivered += 1
+                    await self._on_event(message["c"], message["d"])
+            elif message["t"] == "cancel" and message.get("w") != self.worker_id:
+                if self._on_cancel is not None:
+                    self.cancels += 1
+                    await self._on_cancel(message["c"], message.get("j"))
+            elif message["t"] == "adopt" and message.get("w") != self.worker_id:
+                # La ruta en caché apunta al worker anterior
+                self._routes.pop(message["c"], None)
+                if self._on_adopt is not None:
+                    await self._on_adopt(message["c"])
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error al procesar un mensaje del bus de eventos: {str(e)}")
+
+    async def _route(self, client_id: str) -> Optional[str]:
+        """Worker que tiene la sesión, con una caché local de route_ttl segundos."""
+        now = time.monotonic()
+        cached = self._routes.get(client_id)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+        data = await self._client.get(self._session_key(client_id))
+        worker = json.loads(data)["w"] if data else None
+        if len(self._routes) > 10000:
+            self._routes.clear()
+        self._routes[client_id] = (worker, now + self.route_ttl)
+        return worker
+
+    async def publish_event(self, client_id: str, data: Dict[str, Any]) -> bool:
+        try:
+            worker = await self._route(client_id)
+            if worker is None:
+                self.undeliverable += 1
+                return False
+            message = json.dumps({"t": "event", "c": client_id, "d": data}, ensure_ascii=False)
+            receivers = await self._client.publish(f"{self.prefix}worker:{worker}", message)
+            self.published += 1
+            if not receivers:
+                # El worker ya no existe: volver a consultar la sesión en el siguiente evento
+                self._routes.pop(client_id, None)
+                self.undeliverable += 1
+            return bool(receivers)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"No se pudo publicar un evento para {client_id}: {str(e)}")
+            return False
+
+    async def publish_cancel(self, client_id: str, job_id: Optional[str] = None) -> None:
+        try:
+            message = json.dumps({"t": "cancel", "c": client_id, "j": job_id, "w": self.worker_id})
+            await self._client.publish(self._cancel_channel, message)
+            self.published += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"No se pudo difundir la cancelación de {client_id}: {str(e)}")
+
+    async def register_session(self, client_id: str, disconnected_at: Optional[float] = None) -> None:
+        try:
+            value = json.dumps({"w": self.worker_id, "d": disconnected_at})
+            await self._client.set(self._session_key(client_id), value, ex=max(1, int(self.session_ttl)))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"No se pudo registrar la sesión {client_id} en Redis: {str(e)}")
+
+    async def adopt_session(self, client_id: str) -> None:
+        await self.register_session(client_id)
+        self._routes.pop(client_id, None)
+        try:
+            message = json.dumps({"t": "adopt", "c": client_id, "w": self.worker_id})
+            await self._client.publish(self._cancel_channel, message)
+            self.published += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"No se pudo anunciar la adopción de la sesión {client_id}: {str(e)}")
+
+    async def session_owner(self, client_id: str) -> Optional[str]:
+        try:
+            data = await self._client.get(self._session_key(client_id))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"No se pudo consultar la sesión {client_id} en Redis: {str(e)}")
+            return None
+        return json.loads(data)["w"] if data else None
+
+    async def session_idle(self, client_id: str) -> float:
+        try:
+            data = await self._client.get(self._session_key(client_id))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"No se pudo consultar la sesión {client_id} en Redis: {str(e)}")
+            # Sin información, no dar la sesión por abandonada
+            return 0.0
+        if not data:
+            return float("inf")
+        disconnected_at = json.loads(data).get("d")
+        return 0.0 if disconnected_at is None else max(0.0, time.time() - disconnected_at)
+
+    async def store_job(self, job: Dict[str, Any], ttl: float) -> None:
+        await self._jobs.set(job["job_id"], job, ttl=ttl)
+
+    async def load_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self._jobs.get(job_id)
+
+    async def close(self) -> None:
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.cancel()
+            try:
+                await listener
+            except asyncio.CancelledError:
+                pass
+        close = getattr(self._client, "aclose", None) or self._client.close
+        await close()
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(
+            super().stats(),
+            cancels_received=self.cancels,
+            routes_cached=len(self._routes),
+            listening=self._listener is not None and not self._listener.done(),
+        )
+
+
+def build_event_bus(session_ttl: float = 120.0) -> EventBus:
+    """
+    Crea el bus de eventos configurado en EVENT_BUS.
+
+    Args:
+        session_ttl: Tiempo de vida de las claves de sesión en Redis.
+
+    Returns:
+        EventBus: Bus de Redis, o en memoria si no está configurado o no se puede crear.
+    """
+    if EVENT_BUS == "redis":
+        if not EVENT_BUS_REDIS_URL:
+            logger.warning("EVENT_BUS=redis sin REDIS_URL. Se usará el bus en memoria.")
+        else:
+            try:
+                return RedisEventBus(EVENT_BUS_REDIS_URL, session_ttl=session_ttl)
+            except ImportError:
+                logger.warning("El paquete 'redis' no está instalado. Se usará el bus en memoria.")
+    elif EVENT_BUS != "memory":
+        logger.warning(f"Bus de eventos no soportado: {EVENT_BUS}. Se usará el bus en memoria.")
+    return EventBus()
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Motores de extracción de contenido HTML para MCP-Serper.
+
+Todos los motores aplican la misma heurística: el contenido principal es el primer
+<main>, <article> o <div> con clase "content", "main" o "article" (o el <body> si no
+hay ninguno), sin scripts, estilos ni elementos de navegación. Los motores basados
+en parsers en C (lxml, selectolax) son mucho más rápidos que BeautifulSoup, que se
+mantiene como alternativa cuando no están instalados.
+
+La decodificación y el análisis son CPU intensivos, así que fetch_url los ejecuta en
+un pool de hilos o de procesos (ExtractionPool) para no bloquear el bucle de eventos.
+"""
+
+import os
+import re
+import codecs
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("mcp-serper")
+
+# Elementos que no forman parte del contenido
+REMOVED_TAGS = ["script", "style", "nav", "footer", "header", "aside"]
+
+# Clases de <div> que se consideran contenido principal
+CONTENT_CLASSES = ["content", "main", "article"]
+
+# Motor configurado: auto, lxml, selectolax o bs4
+HTML_EXTRACTOR = os.environ.get("HTML_EXTRACTOR", "auto").lower()
+
+# Pool de extracción: thread, process o inline (en el propio bucle de eventos)
+EXTRACT_EXECUTOR = os.environ.get("EXTRACT_EXECUTOR", "thread").lower()
+EXTRACT_WORKERS = int(os.environ.get("EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))
+EXTRACT_MAX_PENDING = int(os.environ.get("EXTRACT_MAX_PENDING", 32))
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Declaración de codificación en <meta charset> o <meta http-equiv="Content-Type">
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+
+# lxml no admite texto Unicode con declaración de codificación XML
+_XML_DECLARATION_RE = re.compile(r"^\s*<\?xml[^>]*\?>", re.IGNORECASE)
+
+
+def _clean_text(text: str) -> str:
+    """Colapsa espacios y saltos de línea."""
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+class HTMLExtractor:
+    """
+    Interfaz de un motor de extracción de contenido.
+    """
+
+    name = "base"
+
+    def extract(self, html: str) -> Dict[str, Optional[str]]:
+        """
+        Extrae el título y el texto principal de un documento HTML.
+
+        Args:
+            html: Documento HTML decodificado.
+
+        Returns:
+            Dict: Claves "title" y "content".
+        """
+        raise NotImplementedError
+
+
+class BeautifulSoupExtractor(HTMLExtractor):
+    """
+    Motor basado en BeautifulSoup con html.parser (Python puro).
+    """
+
+    name = "bs4"
+
+    def __init__(self) -> None:
+        from bs4 import BeautifulSoup
+
+        self._soup = BeautifulSoup
+
+    def extract(self, html: str) -> Dict[str, Optional[str]]:
+        soup = self._soup(html, "html.parser")
+
+        # Extraer título (como str: un NavigableString mantendría vivo todo el árbol)
+        if soup.title:
+            title = str(soup.title.string) if soup.title.string is not None else None
+        else:
+            title = "Sin título"
+
+        # Intentar encontrar el contenido principal
+        main_content = (
+            soup.find("main")
+            or soup.find("article")
+            or soup.find("div", class_=CONTENT_CLASSES)
+            or soup.body
+            or soup
+        )
+
+        # Eliminar scripts, estilos y elementos de navegación
+        for element in main_content(REMOVED_TAGS):
+            element.decompose()
+
+        content = main_content.get_text(separator=" ", strip=True)
+        return {"title": title, "content": _clean_text(content)}
+
+
+class LxmlExtractor(HTMLExtractor):
+    """
+    Motor basado en lxml (libxml2).
+    """
+
+    name = "lxml"
+
+    # Primer <div> cuya lista de clases contiene alguna de CONTENT_CLASSES
+    _CONTENT_DIV_XPATH = "(//div[{}])[1]".format(
+        " or ".join(
+            f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+            for cls in CONTENT_CLASSES
+        )
+    )
+
+    def __init__(self) -> None:
+        import lxml.html
+        from lxml.etree import ParserError, XPath
+
+        self._fromstring = lxml.html.document_fromstring
+        self._parser_error = ParserError
+        self._content_div = XPath(self._CONTENT_DIV_XPATH)
+
+    def extract(self, html: str) -> Dict[str, Optional[str]]:
+        try:
+            root = self._fromstring(_XML_DECLARATION_RE.sub("", html, count=1))
+        except self._parser_error:
+            # Documento vacío
+            return {"title": "Sin título", "content": ""}
+
+        title_element = root.find(".//title")
+        title = title_element.text if title_element is not None else "Sin título"
+
+        main_content = root.find(".//main")
+        if main_content is None:
+            main_content = root.find(".//article")
+        if main_content is None:
+            divs = self._content_div(root)
+            main_content = divs[0] if divs else None
+        if main_content is None:
+            main_content = root.find("body")
+        if main_content is None:
+            main_content = root
+
+        # drop_tree() conserva el texto que sigue al elemento eliminado, pero lo une
+        # al texto anterior; el espacio mantiene la separación como en BeautifulSoup
+        for element in list(main_content.iter(*REMOVED_TAGS)):
+            if element.tail:
+                element.tail = " " + element.tail
+            element.drop_tree()
+
+        parts = (part.strip() for part in main_content.itertext())
+        content = " ".join(part for part in parts if part)
+        return {"title": title, "content": _clean_text(content)}
+
+
+class SelectolaxExtractor(HTMLExtractor):
+    """
+    Motor basado en selectolax (Lexbor).
+    """
+
+    name = "selectolax"
+
+    _CONTENT_DIV_SELECTOR = ", ".join(f"div.{cls}" for cls in CONTENT_CLASSES)
+
+    def __init__(self) -> None:
+        from selectolax.lexbor import LexborHTMLParser
+
+        self._parser = LexborHTMLParser
+
+    def extract(self, html: str) -> Dict[str, Optional[str]]:
+        tree = self._parser(html)
+
+        title_node = tree.css_first("title")
+        # Un <title> vacío se devuelve como None, igual que en BeautifulSoup
+        title = (title_node.text() or None) if title_node is not None else "Sin título"
+
+        main_content = (
+            tree.css_first("main")
+            or tree.css_first("article")
+            or tree.css_first(self._CONTENT_DIV_SELECTOR)
+            or tree.body
+            or tree.root
+        )
+        if main_content is None:
+            return {"title": title, "content": ""}
+
+        main_content.strip_tags(REMOVED_TAGS)
+        content = main_content.text(separator=" ", strip=True)
+        return {"title": title, "content": _clean_text(content)}
+
+
+# Motores disponibles, en orden de preferencia para "auto"
+EXTRACTORS = {
+    SelectolaxExtractor.name: SelectolaxExtractor,
+    LxmlExtractor.name: LxmlExtractor,
+    BeautifulSoupExtractor.name: BeautifulSoupExtractor,
+}
+
+_instances: Dict[str, HTMLExtractor] = {}
+
+
+def available_extractors() -> List[str]:
+    """
+    Lista los motores cuyas dependencias están instaladas.
+
+    Returns:
+        List: Nombres de los motores disponibles.
+    """
+    names = []
+    for name in EXTRACTORS:
+        try:
+            get_extractor(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def get_extractor(name: Optional[str] = None) -> HTMLExtractor:
+    """
+    Obtiene un motor de extracción.
+
+    Con "auto" se usa el primer motor disponible: selectolax, lxml y, en último
+    lugar, BeautifulSoup.
+
+    Args:
+        name: Nombre del motor. Por defecto, HTML_EXTRACTOR.
+
+    Returns:
+        HTMLExtractor: Instancia compartida del motor.
+
+    Raises:
+        ValueError: Si el motor no existe.
+        ImportError: Si se pide un motor concreto cuya dependencia no está instalada.
+    """
+    name = (name or HTML_EXTRACTOR).lower()
+    if name in _instances:
+        return _instances[name]
+
+    if name == "auto":
+        for candidate in EXTRACTORS:
+            try:
+                extractor = get_extractor(candidate)
+            except ImportError:
+                continue
+            logger.info(f"Motor de extracción HTML: {extractor.name}")
+            _instances[name] = extractor
+            return extractor
+        raise ImportError("No hay ningún motor de extracción HTML instalado")
+
+    if name not in EXTRACTORS:
+        raise ValueError(f"Motor de extracción no soportado: {name}. Opciones: auto, {', '.join(EXTRACTORS)}")
+
+    extractor = EXTRACTORS[name]()
+    _instances[name] = extractor
+    return extractor
+
+
+def extract_html(html: str, engine: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """
+    Extrae el título y el texto principal de un documento HTML.
+
+    Args:
+        html: Documento HTML decodificado.
+        engine: Motor a usar. Por defecto, HTML_EXTRACTOR.
+
+    Returns:
+        Dict: Claves "title" y "content".
+    """
+    return get_extractor(engine).extract(html)
+
+
+def _sniff_charset(head: bytes) -> Optional[str]:
+    """
+    Busca la codificación declarada en las etiquetas <meta> del inicio del documento.
+
+    Args:
+        head: Primeros bytes del documento.
+
+    Returns:
+        Optional[str]: Nombre de la codificación, o None si no se declara.
+    """
+    match = _META_CHARSET_RE.search(head)
+    return match.group(1).decode("ascii", errors="ignore") if match else None
+
+
+def decode_body(body: bytes, encoding: Optional[str] = None, truncated: bool = False) -> str:
+    """
+    Decodifica el cuerpo de una página.
+
+    La codificación se toma de la cabecera HTTP, de <meta charset> o, en su defecto,
+    UTF-8. Si el cuerpo se truncó, el carácter multibyte incompleto del punto de
+    corte se descarta en lugar de sustituirse.
+
+    Args:
+        body: Bytes del documento.
+        encoding: Codificación declarada en la cabecera Content-Type.
+        truncated: Si el cuerpo se cortó al alcanzar el límite de bytes.
+
+    Returns:
+        str: Documento decodificado.
+    """
+    encoding = encoding or _sniff_charset(body[:2048]) or "utf-8"
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    return decoder.decode(body, final=not truncated)
+
+
+def extract_document(
+    body: bytes,
+    encoding: Optional[str] = None,
+    truncated: bool = False,
+    engine: Optional[str] = None,
+) -> Dict[str, Optional[str]]:
+    """
+    Decodifica y extrae una página. Es la unidad de trabajo del pool de extracción.
+
+    Args:
+        body: Bytes del documento.
+        encoding: Codificación declarada en la cabecera Content-Type.
+        truncated: Si el cuerpo se cortó al alcanzar el límite de bytes.
+        engine: Motor a usar. Por defecto, HTML_EXTRACTOR.
+
+    Returns:
+        Dict: Claves "title" y "content".
+    """
+    return extract_html(decode_body(body, encoding, truncated), engine)
+
+
+class ExtractionPool:
+    """
+    Ejecuta la extracción de páginas fuera del bucle de eventos.
+
+    Con "thread" las páginas se comparten con los hilos sin copias; con "process"
+    se envían los bytes sin decodificar, que es la representación más compacta.
+    El número de extracciones pendientes (en cola o en ejecución) está acotado:
+    cuando se alcanza el límite, los nuevos llamantes esperan su turno.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        workers: int = 4,
+        max_pending: int = 32,
+        engine: Optional[str] = None,
+    ):
+        """
+        Args:
+            kind: "thread", "process" o "inline".
+            workers: Hilos o procesos del pool.
+            max_pending: Extracciones pendientes máximas.
+            engine: Motor de extracción. Por defecto, HTML_EXTRACTOR.
+
+        Raises:
+            ValueError: Si el tipo de pool no existe.
+        """
+        if kind not in ("thread", "process", "inline"):
+            raise ValueError(f"Tipo de pool de extracción no soportado: {kind}. Opciones: thread, process, inline")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.engine = engine
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.pending = 0
+        self.completed = 0
+        self.cancelled = 0
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self._executor is None and self.kind != "inline":
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="extract")
+        return self._executor
+
+    async def extract(
+        self,
+        body: bytes,
+        encoding: Optional[str] = None,
+        truncated: bool = False,
+    ) -> Dict[str, Optional[str]]:
+        """
+        Decodifica y extrae una página en el pool.
+
+        Args:
+            body: Bytes del documento.
+            encoding: Codificación declarada en la cabecera Content-Type.
+            truncated: Si el cuerpo se cortó al alcanzar el límite de bytes.
+
+        Returns:
+            Dict: Claves "title" y "content".
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+
+        async with self._slots:
+            self.pending += 1
+            try:
+                executor = self._get_executor()
+                if executor is None:
+                    result = extract_document(body, encoding, truncated, self.engine)
+                else:
+                    loop = asyncio.get_running_loop()
+                    # Cancelar la espera retira del pool las extracciones que no han empezado
+                    result = await loop.run_in_executor(
+                        executor, extract_document, body, encoding, truncated, self.engine
+                    )
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            finally:
+                self.pending -= 1
+            self.completed += 1
+            return result
+
+    def shutdown(self) -> None:
+        """Detiene el pool; las extracciones que no han empezado se cancelan."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "engine": get_extractor(self.engine).name,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+        }
+
+
+# Pool global del proceso
+_extraction_pool: Optional[ExtractionPool] = None
+
+
+def get_extraction_pool() -> ExtractionPool:
+    """
+    Obtiene el pool de extracción del proceso, creándolo si no existe.
+
+    Returns:
+        ExtractionPool: Pool configurado con EXTRACT_EXECUTOR, EXTRACT_WORKERS y
+        EXTRACT_MAX_PENDING.
+    """
+    global _extraction_pool
+    if _extraction_pool is None:
+        _extraction_pool = ExtractionPool(
+            kind=EXTRACT_EXECUTOR,
+            workers=EXTRACT_WORKERS,
+            max_pending=EXTRACT_MAX_PENDING,
+        )
+    return _extraction_pool
+
+
+async def close_extraction_pool() -> None:
+    """Detiene el pool de extracción (apagado de la aplicación)."""
+    global _extraction_pool
+    pool, _extraction_pool = _extraction_pool, None
+    if pool is not None:
+        pool.shutdown()
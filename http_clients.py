@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Clientes HTTP compartidos para MCP-Serper.
+
+Este módulo mantiene un único httpx.AsyncClient por perfil de uso (API de Serper,
+páginas de documentación) durante toda la vida del proceso. Así las conexiones se
+reutilizan mediante keep-alive en lugar de repetir DNS + TCP + TLS en cada llamada.
+"""
+
+import os
+import logging
+from dataclasses import dataclass, field
+from typing import Dict
+
+import httpx
+
+logger = logging.getLogger("mcp-serper")
+
+
+def _env_int(name: str, default: int) -> int:
+    """Lee un entero de las variables de entorno."""
+    return int(os.environ.get(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    """Lee un número decimal de las variables de entorno."""
+    return float(os.environ.get(name, default))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Lee un valor booleano de las variables de entorno."""
+    return os.environ.get(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+
+def _http2_available() -> bool:
+    """Indica si el paquete opcional h2 está instalado."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+@dataclass(frozen=True)
+class ClientProfile:
+    """
+    Configuración de un cliente HTTP compartido.
+
+    Attributes:
+        name: Nombre del perfil.
+        max_connections: Conexiones simultáneas máximas del pool.
+        max_keepalive_connections: Conexiones inactivas que se conservan abiertas.
+        keepalive_expiry: Segundos que una conexión inactiva permanece en el pool.
+        http2: Si es True, negocia HTTP/2 cuando el servidor lo admite.
+        timeout: Tiempo máximo de espera por defecto en segundos.
+        headers: Cabeceras enviadas en todas las solicitudes del perfil.
+    """
+    name: str
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    timeout: float = 30.0
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+# Perfil para la API de Serper: un solo host, pocas conexiones de larga duración
+SERPER_PROFILE = ClientProfile(
+    name="serper",
+    max_connections=_env_int("SERPER_MAX_CONNECTIONS", 20),
+    max_keepalive_connections=_env_int("SERPER_MAX_KEEPALIVE", 10),
+    keepalive_expiry=_env_float("SERPER_KEEPALIVE_EXPIRY", 60.0),
+    http2=_env_bool("HTTP2_ENABLED", False),
+)
+
+# Perfil para páginas de documentación: muchos hosts distintos
+DOCS_PROFILE = ClientProfile(
+    name="docs",
+    max_connections=_env_int("DOCS_MAX_CONNECTIONS", 100),
+    max_keepalive_connections=_env_int("DOCS_MAX_KEEPALIVE", 20),
+    keepalive_expiry=_env_float("DOCS_KEEPALIVE_EXPIRY", 30.0),
+    http2=_env_bool("HTTP2_ENABLED", False),
+    headers={
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    },
+)
+
+
+class HTTPClientManager:
+    """
+    Gestor de clientes httpx.AsyncClient compartidos por perfil.
+
+    Los clientes se crean en el arranque de la aplicación (o de forma perezosa en
+    el primer uso) y se cierran explícitamente al apagarla.
+    """
+
+    def __init__(self, profiles: Dict[str, ClientProfile]):
+        """
+        Args:
+            profiles: Perfiles disponibles indexados por nombre.
+        """
+        self._profiles = dict(profiles)
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _create_client(self, profile: ClientProfile) -> httpx.AsyncClient:
+        """Crea un cliente httpx para el perfil indicado."""
+        http2 = profile.http2
+        if http2 and not _http2_available():
+            logger.warning(
+                f"HTTP/2 solicitado para el perfil '{profile.name}' pero el paquete 'h2' "
+                "no está instalado. Se usará HTTP/1.1."
+            )
+            http2 = False
+
+        limits = httpx.Limits(
+            max_connections=profile.max_connections,
+            max_keepalive_connections=profile.max_keepalive_connections,
+            keepalive_expiry=profile.keepalive_expiry,
+        )
+        return httpx.AsyncClient(
+            limits=limits,
+            http2=http2,
+            timeout=profile.timeout,
+            headers=profile.headers,
+        )
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """
+        Obtiene el cliente compartido de un perfil, creándolo si no existe.
+
+        Args:
+            name: Nombre del perfil.
+
+        Returns:
+            httpx.AsyncClient: Cliente compartido del perfil.
+
+        Raises:
+            KeyError: Si el perfil no está registrado.
+        """
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._create_client(self._profiles[name])
+            self._clients[name] = client
+        return client
+
+    async def start(self) -> None:
+        """Crea los clientes de todos los perfiles registrados."""
+        for name in self._profiles:
+            self.get(name)
+        logger.info(f"Clientes HTTP compartidos iniciados: {', '.join(self._profiles)}")
+
+    async def close(self) -> None:
+        """Cierra todos los clientes abiertos y libera sus conexiones."""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+        if clients:
+            logger.info("Clientes HTTP compartidos cerrados")
+
+
+# Gestor global del proceso
+http_clients = HTTPClientManager({
+    SERPER_PROFILE.name: SERPER_PROFILE,
+    DOCS_PROFILE.name: DOCS_PROFILE,
+})
+
+
+def get_http_client(profile: str) -> httpx.AsyncClient:
+    """
+    Obtiene el cliente HTTP compartido de un perfil.
+
+    Args:
+        profile: Nombre del perfil ("serper" o "docs").
+
+    Returns:
+        httpx.AsyncClient: Cliente compartido.
+    """
+    return http_clients.get(profile)
+
+
+async def start_http_clients() -> None:
+    """Inicia los clientes HTTP compartidos (arranque de la aplicación)."""
+    await http_clients.start()
+
+
+async def close_http_clients() -> None:
+    """Cierra los clientes HTTP compartidos (apagado de la aplicación)."""
+    await http_clients.close()
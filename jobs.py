@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Gestor de trabajos en segundo plano del servidor SSE.
+
+Cada búsqueda con streaming es un trabajo con su propio ID, ligado a las sesiones
+SSE que lo siguen (sus suscriptores). Todos los eventos del trabajo llevan su
+"job_id", de modo que una sesión puede seguir varios trabajos a la vez. Un trabajo
+idéntico a otro en curso (mismo tipo y parámetros) no se lanza de nuevo: la sesión
+se suscribe al existente y recibe los eventos emitidos hasta ese momento (los
+últimos JOB_EVENT_HISTORY, con un aviso "gap" si se descartaron anteriores).
+
+Cancelar un trabajo cancela su tarea de inmediato: la cancelación llega a la
+petición en curso a Serper, cierra las descargas abiertas (los streams de httpx se
+cierran al salir de su contexto) y retira del pool de extracción las páginas que
+aún no habían empezado a procesarse. Un trabajo compartido solo se cancela cuando
+lo abandonan todos sus suscriptores.
+
+Un recolector periódico cancela los trabajos cuyos suscriptores llevan más de
+JOB_IDLE_TIMEOUT segundos desconectados. Los trabajos terminados se conservan
+JOB_RESULT_TTL segundos para consultar su resultado por REST.
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger("mcp-serper-server")
+
+# Segundos que un trabajo sigue en marcha con sus clientes desconectados
+JOB_IDLE_TIMEOUT = float(os.environ.get("JOB_IDLE_TIMEOUT", 60))
+# Intervalo en segundos del recolector de trabajos abandonados
+JOB_REAPER_INTERVAL = float(os.environ.get("JOB_REAPER_INTERVAL", 10))
+# Segundos que se conserva el resultado de un trabajo terminado
+JOB_RESULT_TTL = float(os.environ.get("JOB_RESULT_TTL", 300))
+# Trabajos terminados conservados como máximo
+JOB_RESULT_MAX = int(os.environ.get("JOB_RESULT_MAX", 200))
+# Eventos recientes de un trabajo en curso conservados para nuevos suscriptores
+JOB_EVENT_HISTORY = int(os.environ.get("JOB_EVENT_HISTORY", 100))
+JOB_EVENT_HISTORY_BYTES = int(os.environ.get("JOB_EVENT_HISTORY_BYTES", 1024 * 1024))
+
+JOB_STATUSES = ("running", "completed", "failed", "cancelled")
+
+
+class Job:
+    """Trabajo en segundo plano y sus suscriptores."""
+
+    def __init__(
+        self,
+        kind: str,
+        params: Dict[str, Any],
+        key: str,
+        history_size: int = JOB_EVENT_HISTORY,
+        history_bytes: int = JOB_EVENT_HISTORY_BYTES,
+    ):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.params = params
+        self.key = key
+        self.subscribers: Set[str] = set()
+        self.task: Optional["asyncio.Task[None]"] = None
+        self.status = "running"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        # Últimos eventos emitidos mientras el trabajo está en curso, para nuevos suscriptores
+        self.history_size = history_size
+        self.history_bytes = history_bytes
+        self.events: Deque[Tuple[Dict[str, Any], int]] = deque()
+        self._event_bytes = 0
+        self.events_dropped = 0
+        self.emitted = 0
+
+    def remember(self, event: Dict[str, Any]) -> None:
+        """Guarda un evento en el historial, descartando los más antiguos al superar los límites."""
+        size = len(json.dumps(event, ensure_ascii=False))
+        self.emitted += 1
+        self.events.append((event, size))
+        self._event_bytes += size
+        while self.events and (
+            len(self.events) > self.history_size or self._event_bytes > self.history_bytes
+        ):
+            _, old = self.events.popleft()
+            self._event_bytes -= old
+            self.events_dropped += 1
+
+    def catch_up(self, after: int = 0) -> List[Dict[str, Any]]:
+        """
+        Eventos para un nuevo suscriptor, con un aviso si se descartaron anteriores.
+
+        Args:
+            after: Número de eventos que el suscriptor ya ha recibido.
+        """
+        # Número de orden (desde 1) del evento más antiguo del historial
+        first = self.emitted - len(self.events) + 1
+        events = [event for event, _ in list(self.events)[max(0, after + 1 - first):]]
+        missed = first - after - 1
+        if missed > 0:
+            events.insert(0, {"type": "gap", "missed": missed, "job_id": self.id})
+        return events
+
+    def forget_events(self) -> None:
+        self.events.clear()
+        self._event_bytes = 0
+
+    def to_dict(self, with_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "subscribers": len(self.subscribers),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        if with_result and self.status == "completed":
+            data["result"] = self.result
+        return data
+
+
+def job_key(kind: str, params: Dict[str, Any]) -> str:
+    """Clave que identifica trabajos idénticos (mismo tipo y parámetros)."""
+    return kind + ":" + json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+
+class JobManager:
+    """
+    Trabajos en curso y terminados recientes, con deduplicación y cancelación.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, Dict[str, Any]], Awaitable[None]],
+        client_idle: Callable[[str], Awaitable[float]],
+        idle_timeout: float = JOB_IDLE_TIMEOUT,
+        interval: float = JOB_REAPER_INTERVAL,
+        result_ttl: float = JOB_RESULT_TTL,
+        max_results: int = JOB_RESULT_MAX,
+        on_finish: Optional[Callable[[Job], Awaitable[None]]] = None,
+    ):
+        """
+        Args:
+            send: Envía un evento a un cliente SSE.
+            client_idle: Devuelve los segundos que lleva desconectado un cliente (0 si está conectado).
+            idle_timeout: Segundos de desconexión tras los que se cancelan los trabajos.
+            interval: Intervalo del recolector en segundos.
+            result_ttl: Segundos que se conserva un trabajo terminado.
+            max_results: Trabajos terminados conservados como máximo.
+            on_finish: Se llama con cada trabajo terminado (por ejemplo, para compartirlo con otros workers).
+        """
+        self.send = send
+        self.client_idle = client_idle
+        self.idle_timeout = idle_timeout
+        self.interval = interval
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self.on_finish = on_finish
+        self._running: Dict[str, Job] = {}
+        self._by_key: Dict[str, Job] = {}
+        self._finished: "OrderedDict[str, Job]" = OrderedDict()
+        self._reaper: Optional["asyncio.Task[None]"] = None
+        self.started = 0
+        self.deduplicated = 0
+        self.cancelled = 0
+        self.reaped = 0
+
+    def __len__(self) -> int:
+        return len(self._running)
+
+    async def submit(
+        self,
+        client_id: str,
+        kind: str,
+        params: Dict[str, Any],
+        run: Callable[[Job], Awaitable[Any]],
+    ) -> Tuple[Job, bool]:
+        """
+        Lanza un trabajo para un cliente o lo suscribe a uno idéntico en curso.
+
+        Args:
+            client_id: ID de la sesión SSE que recibirá los eventos.
+            kind: Tipo de trabajo.
+            params: Parámetros del trabajo (identifican trabajos idénticos).
+            run: Función que ejecuta el trabajo y devuelve su resultado.
+
+        Returns:
+            Tuple: Trabajo y si se ha reutilizado uno en curso.
+        """
+        key = job_key(kind, params)
+        job = self._by_key.get(key)
+        if job is not None:
+            self.deduplicated += 1
+            if client_id not in job.subscribers:
+                await self._catch_up(client_id, job)
+            return job, True
+
+        job = Job(kind, params, key)
+        job.subscribers.add(client_id)
+        self._running[job.id] = job
+        self._by_key[key] = job
+        self.started += 1
+        job.task = asyncio.ensure_future(self._run(job, run))
+        # Una tarea cancelada antes de empezar no llega a ejecutar _run
+        job.task.add_done_callback(lambda task: self._finish(job, "cancelled") if task.cancelled() else None)
+        return job, False
+
+    async def _catch_up(self, client_id: str, job: Job) -> None:
+        """
+        Envía a un nuevo suscriptor los eventos ya emitidos y después lo suscribe.
+
+        Los eventos emitidos mientras se envían los anteriores se recogen en la
+        siguiente vuelta; el cliente se suscribe sin ceder el bucle tras la última
+        comprobación, por lo que ningún evento se pierde ni llega desordenado.
+        """
+        seen = 0
+        while seen < job.emitted and job.finished_at is None:
+            target = job.emitted
+            for event in job.catch_up(seen):
+                await self.send(client_id, event)
+            seen = target
+        if job.finished_at is None:
+            job.subscribers.add(client_id)
+        else:
+            # El trabajo terminó durante la puesta al día y ya envió su aviso final
+            await self.send(client_id, {"type": "job_end", "job_id": job.id, "status": job.status})
+
+    async def _run(self, job: Job, run: Callable[[Job], Awaitable[Any]]) -> None:
+        try:
+            job.result = await run(job)
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            self._finish(job, job.status)
+        end = {"type": "job_end", "job_id": job.id, "status": job.status}
+        for client_id in list(job.subscribers):
+            await self.send(client_id, end)
+        if self.on_finish is not None:
+            try:
+                await self.on_finish(job)
+            except Exception as e:
+                logger.error(f"Error al publicar el trabajo {job.id}: {str(e)}")
+
+    def _finish(self, job: Job, status: str) -> None:
+        if job.finished_at is not None:
+            return
+        job.status = status
+        job.finished_at = time.time()
+        job.forget_events()
+        self._running.pop(job.id, None)
+        if self._by_key.get(job.key) is job:
+            del self._by_key[job.key]
+        self._finished[job.id] = job
+        while len(self._finished) > self.max_results:
+            self._finished.popitem(last=False)
+
+    async def emit(self, job: Job, data: Dict[str, Any]) -> None:
+        """
+        Envía un evento del trabajo a todos sus suscriptores.
+
+        Args:
+            job: Trabajo que emite el evento.
+            data: Evento (se le añade "job_id").
+        """
+        event = dict(data, job_id=job.id)
+        job.remember(event)
+        for client_id in list(job.subscribers):
+            await self.send(client_id, event)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Trabajo en curso o terminado recientemente."""
+        job = self._running.get(job_id)
+        if job is not None:
+            return job
+        self.expire()
+        return self._finished.get(job_id)
+
+    def for_client(self, client_id: str) -> List[Job]:
+        return [job for job in self._running.values() if client_id in job.subscribers]
+
+    def cancel(self, client_id: str, job_id: Optional[str] = None) -> int:
+        """
+        Retira a un cliente de sus trabajos en curso (o de uno concreto).
+
+        Los trabajos de los que el cliente es el único suscriptor se cancelan.
+
+        Args:
+            client_id: ID de la sesión SSE.
+            job_id: Trabajo concreto; por defecto, todos los del cliente.
+
+        Returns:
+            int: Número de trabajos cancelados.
+        """
+        count = 0
+        for job in self.for_client(client_id):
+            if job_id is not None and job.id != job_id:
+                continue
+            if job.subscribers != {client_id}:
+                job.subscribers.discard(client_id)
+            # El último suscriptor sigue recibiendo el aviso de cancelación
+            elif job.task is not None and job.task.cancel():
+                count += 1
+        self.cancelled += count
+        return count
+
+    def expire(self) -> int:
+        """Elimina los trabajos terminados hace más de result_ttl segundos."""
+        now = time.time()
+        count = 0
+        while self._finished:
+            job = next(iter(self._finished.values()))
+            finished_at = job.finished_at if job.finished_at is not None else now
+            if now - finished_at <= self.result_ttl:
+                break
+            self._finished.popitem(last=False)
+            count += 1
+        return count
+
+    async def reap(self) -> int:
+        """
+        Cancela los trabajos cuyos suscriptores llevan más de idle_timeout segundos desconectados.
+
+        Returns:
+            int: Número de trabajos cancelados.
+        """
+        count = 0
+        for job in list(self._running.values()):
+            idle = [await self.client_idle(client_id) for client_id in job.subscribers]
+            if all(seconds > self.idle_timeout for seconds in idle):
+                if job.task is not None and job.task.cancel():
+                    logger.info(f"Cancelado trabajo abandonado {job.id} ({job.kind})")
+                    count += 1
+        self.reaped += count
+        self.cancelled += count
+        self.expire()
+        return count
+
+    async def _run_reaper(self, on_tick: Optional[Callable[[], Awaitable[Any]]] = None) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if on_tick is not None:
+                    await on_tick()
+                await self.reap()
+            except Exception as e:
+                logger.error(f"Error en el recolector de trabajos: {str(e)}")
+
+    def start_reaper(self, on_tick: Optional[Callable[[], Awaitable[Any]]] = None) -> None:
+        """
+        Inicia el recolector de trabajos abandonados en el bucle de eventos actual.
+
+        Args:
+            on_tick: Corrutina adicional a ejecutar en cada pasada (por ejemplo, expirar sesiones).
+        """
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.ensure_future(self._run_reaper(on_tick))
+
+    async def shutdown(self) -> None:
+        """Detiene el recolector y cancela todos los trabajos en curso."""
+        reaper, self._reaper = self._reaper, None
+        if reaper is not None:
+            reaper.cancel()
+        tasks = [job.task for job in self._running.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        if reaper is not None:
+            tasks.append(reaper)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": len(self._running),
+            "finished": len(self._finished),
+            "started": self.started,
+            "deduplicated": self.deduplicated,
+            "cancelled": self.cancelled,
+            "reaped": self.reaped,
+            "idle_timeout": self.idle_timeout,
+            "result_ttl": self.result_ttl,
+        }
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Medición del retraso (lag) del bucle de eventos para MCP-Serper.
+
+Una tarea duerme un intervalo fijo y mide cuánto tarda de más en despertar. Ese
+exceso es el tiempo que el bucle ha estado bloqueado por código síncrono (por
+ejemplo, análisis de HTML), durante el cual no se atienden streams SSE, latidos
+ni nuevas solicitudes.
+"""
+
+import os
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+# Intervalo de muestreo en segundos
+LOOP_LAG_INTERVAL = float(os.environ.get("LOOP_LAG_INTERVAL", 0.1))
+
+
+class LoopLagMonitor:
+    """
+    Mide periódicamente el retraso del bucle de eventos.
+    """
+
+    def __init__(self, interval: float = 0.1, window: int = 600):
+        """
+        Args:
+            interval: Intervalo de muestreo en segundos.
+            window: Número de muestras recientes usadas para media y percentiles.
+        """
+        self.interval = interval
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.last = 0.0
+        self.max = 0.0
+        self.count = 0
+
+    def _record(self, lag: float) -> None:
+        self.last = lag
+        self.max = max(self.max, lag)
+        self.count += 1
+        self._samples.append(lag)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self._record(max(0.0, loop.time() - start - self.interval))
+
+    def start(self) -> None:
+        """Inicia la medición en el bucle de eventos actual."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Detiene la medición."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        samples = sorted(self._samples)
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] if samples else 0.0
+        avg = sum(samples) / len(samples) if samples else 0.0
+        return {
+            "interval_ms": round(self.interval * 1000, 1),
+            "samples": self.count,
+            "last_ms": round(self.last * 1000, 2),
+            "avg_ms": round(avg * 1000, 2),
+            "p99_ms": round(p99 * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+# Monitor global del proceso
+loop_lag_monitor = LoopLagMonitor(LOOP_LAG_INTERVAL)
+
+
+async def start_loop_monitor() -> None:
+    """Inicia el monitor de lag (arranque de la aplicación)."""
+    loop_lag_monitor.start()
+
+
+async def stop_loop_monitor() -> None:
+    """Detiene el monitor de lag (apagado de la aplicación)."""
+    await loop_lag_monitor.stop()
@@ -10,15 +10,26 @@ a través del protocolo MCP (Model Control Protocol).
 
 import os
 import json
+import time
 import asyncio
 import logging
-from typing import Dict, List, Any, Optional, Callable, Awaitable
+import logging.handlers
+from typing import Dict, List, Any, Optional, Callable, Awaitable, Tuple
 from urllib.parse import urlparse, quote_plus
 
 import httpx
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
+from cache import CacheBackend, SingleFlight, build_cache
+from docs_index import DocsIndex, analyze_document
+from extraction import get_extraction_pool, close_extraction_pool
+from http_clients import get_http_client, close_http_clients
+from page_store import PAGE_STORE_TTL, get_page_store, close_page_store
+from metrics import SERPER_REQUEST_SECONDS, SERPER_QUEUE_SECONDS, FETCH_DOWNLOAD_SECONDS, FETCH_PARSE_SECONDS
+from rate_limit import RateLimiter, current_priority, request_priority
+from resilience import RETRYABLE_STATUS, HostResilience
+from timing import span, traced
+
 # Cargar variables de entorno
 load_dotenv()
 
@@ -31,7 +42,57 @@ logger = logging.getLogger("mcp-serper")
 
 # APIs y Claves
 SERPER_API_KEY = os.environ.get("SERPER_API_KEY")
-SERPER_API_URL = "https://google.serper.dev/search"
+# Endpoint de búsqueda (configurable para apuntar a un servidor local en benchmarks)
+SERPER_API_URL = os.environ.get("SERPER_API_URL", "https://google.serper.dev/search")
+
+# Límites de la caché de resultados de búsqueda
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", 1000))
+SEARCH_CACHE_MAX_BYTES = int(os.environ.get("SEARCH_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", 3600))
+# Fichero JSONL donde se registran las consultas de search_web (vacío: desactivado)
+SEARCH_QUERY_LOG = os.environ.get("SEARCH_QUERY_LOG", "")
+
+# Resultados mínimos pedidos a Serper: una respuesta mayor sirve también a consultas más pequeñas
+SEARCH_MIN_NUM_RESULTS = int(os.environ.get("SEARCH_MIN_NUM_RESULTS", 10))
+# Ventanas de gracia tras SEARCH_CACHE_TTL: se sirve el resultado caducado mientras se
+# refresca en segundo plano (stale-while-revalidate) o si Serper falla (stale-if-error)
+SEARCH_STALE_WHILE_REVALIDATE = float(os.environ.get("SEARCH_STALE_WHILE_REVALIDATE", 600))
+SEARCH_STALE_IF_ERROR = float(os.environ.get("SEARCH_STALE_IF_ERROR", 86400))
+
+# Límites de la caché de páginas extraídas por fetch_url
+PAGE_CACHE_MAX_ENTRIES = int(os.environ.get("PAGE_CACHE_MAX_ENTRIES", 500))
+PAGE_CACHE_MAX_BYTES = int(os.environ.get("PAGE_CACHE_MAX_BYTES", 100 * 1024 * 1024))
+PAGE_CACHE_TTL = float(os.environ.get("PAGE_CACHE_TTL", 86400))
+# Segundos tras los que una página con ETag o Last-Modified se revalida con el servidor
+PAGE_REVALIDATE_AFTER = float(os.environ.get("PAGE_REVALIDATE_AFTER", 3600))
+
+# Descargas de contenido simultáneas en get_docs / get_docs_from_domain
+FETCH_CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY", 5))
+
+# Búsqueda en varias bibliotecas: plazo común en segundos y máximo de bibliotecas
+MULTI_SEARCH_TIMEOUT = float(os.environ.get("MULTI_SEARCH_TIMEOUT", 20))
+MULTI_SEARCH_MAX_LIBRARIES = int(os.environ.get("MULTI_SEARCH_MAX_LIBRARIES", 10))
+
+# Búsqueda por lotes: consultas por solicitud a Serper y máximo por llamada
+SERPER_BATCH_SIZE = int(os.environ.get("SERPER_BATCH_SIZE", 20))
+SEARCH_BATCH_MAX_QUERIES = int(os.environ.get("SEARCH_BATCH_MAX_QUERIES", 100))
+
+# Redis como segundo nivel de caché compartido (opcional)
+REDIS_URL = os.environ.get("REDIS_URL")
+
+# Índice local BM25 de las páginas descargadas
+DOCS_INDEX_ENABLED = os.environ.get("DOCS_INDEX_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+DOCS_INDEX_MAX_DOCUMENTS = int(os.environ.get("DOCS_INDEX_MAX_DOCUMENTS", 5000))
+# Resultados locales mínimos para que el modo local_first no consulte Serper
+DOCS_INDEX_MIN_RESULTS = int(os.environ.get("DOCS_INDEX_MIN_RESULTS", 3))
+# Relevancia mínima de un resultado local para contar en local_first: fracción de los
+# términos de la consulta que contiene y puntuación BM25
+DOCS_INDEX_MIN_COVERAGE = float(os.environ.get("DOCS_INDEX_MIN_COVERAGE", 1.0))
+DOCS_INDEX_MIN_SCORE = float(os.environ.get("DOCS_INDEX_MIN_SCORE", 0))
+
+# Modos de búsqueda de get_docs / get_docs_from_domain
+DOCS_SEARCH_MODES = ("serper", "local", "local_first", "merged")
+DOCS_SEARCH_MODE = os.environ.get("DOCS_SEARCH_MODE", "serper")
 
 # Biblioteca de URLs de documentación
 docs_urls = {
@@ -137,181 +198,1252 @@ docs_urls = {
     "jasmine": "jasmine.github.io",
 }
 
-# Caché en memoria para respuestas
-results_cache = {}
+# Caché de respuestas de Serper: LRU en memoria y, si hay REDIS_URL, Redis compartido.
+# Las entradas se conservan durante las ventanas de gracia además del TTL.
+results_cache: CacheBackend = build_cache(
+    "search",
+    max_entries=SEARCH_CACHE_MAX_ENTRIES,
+    max_bytes=SEARCH_CACHE_MAX_BYTES,
+    ttl=SEARCH_CACHE_TTL + max(SEARCH_STALE_WHILE_REVALIDATE, SEARCH_STALE_IF_ERROR),
+    redis_url=REDIS_URL,
+)
+
+# Caché de páginas extraídas por fetch_url, con sus validadores (ETag, Last-Modified)
+page_cache: CacheBackend = build_cache(
+    "pages",
+    max_entries=PAGE_CACHE_MAX_ENTRIES,
+    max_bytes=PAGE_CACHE_MAX_BYTES,
+    ttl=PAGE_CACHE_TTL,
+    redis_url=REDIS_URL,
+)
+
+
+# Agrupación de consultas y descargas idénticas en curso
+search_flights = SingleFlight("search")
+page_flights = SingleFlight("pages")
+
+# Resultados caducados servidos por search_web y refrescos en segundo plano
+search_staleness = {"stale": 0, "stale_if_error": 0, "refreshes": 0, "refresh_errors": 0}
+_background_refreshes: Dict[str, "asyncio.Task[Any]"] = {}
+
+# Cupo de solicitudes a Serper (SERPER_RATE_LIMIT) con cola por prioridad
+serper_limiter = RateLimiter()
+
+# Circuit breaker, reintentos y hedging de las descargas de páginas por host
+fetch_resilience = HostResilience()
+
+# Resultado de las consultas de fetch_url: sin red, 304, página nueva o descarga completa
+page_revalidation = {"hit": 0, "revalidated": 0, "changed": 0, "miss": 0}
+
+# Índice local de las páginas extraídas, etiquetadas por biblioteca y dominio
+docs_index = DocsIndex(docs_urls, max_documents=DOCS_INDEX_MAX_DOCUMENTS)
+
+
+def _serper_headers() -> Dict[str, str]:
+    """Cabeceras de autenticación para la API de Serper."""
+    return {
+        "X-API-KEY": SERPER_API_KEY or "",
+        "Content-Type": "application/json"
+    }
+
+
+def _retry_after(response: httpx.Response, default: float = 1.0) -> float:
+    """Segundos indicados en la cabecera Retry-After de un 429 (solo el formato numérico)."""
+    try:
+        return max(0.0, float(response.headers.get("retry-after", default)))
+    except ValueError:
+        return default
+
+
+async def _serper_request(
+    body: Any,
+    headers: Dict[str, str],
+    timeout: float,
+    endpoint: str
+) -> httpx.Response:
+    """
+    Envía una solicitud a Serper respetando el límite de tasa.
+    
+    La solicitud espera su turno en serper_limiter con la prioridad de la tarea
+    actual, y se rechaza sin esperar si la espera estimada supera el timeout. Un 429
+    pausa el limitador durante el Retry-After y se reintenta una vez.
+    
+    Args:
+        body: Cuerpo JSON (una consulta o una lista de consultas).
+        headers: Cabeceras de la solicitud.
+        timeout: Tiempo máximo en segundos, incluida la espera en la cola.
+        endpoint: Etiqueta de las métricas ("search" o "batch").
+        
+    Returns:
+        httpx.Response: Respuesta de Serper.
+        
+    Raises:
+        Exception: Si se supera el límite de tasa o falla la solicitud.
+    """
+    # Cada consulta de un lote consume un crédito del plan
+    cost = len(body) if isinstance(body, list) else 1
+    priority = current_priority()
+    deadline = time.monotonic() + timeout
+    client = get_http_client("serper")
+    
+    for attempt in range(2):
+        with span("serper.queue", priority=priority):
+            queued = await serper_limiter.acquire(cost, priority, deadline - time.monotonic())
+        SERPER_QUEUE_SECONDS.labels(priority).observe(queued)
+        
+        start = time.perf_counter()
+        status: Any = "cancelled"
+        try:
+            with span("serper.post") as post_span:
+                response = await client.post(
+                    SERPER_API_URL,
+                    headers=headers,
+                    json=body,
+                    timeout=max(0.1, deadline - time.monotonic())
+                )
+                post_span.set(status=response.status_code)
+            status = response.status_code
+        except httpx.TimeoutException:
+            status = "timeout"
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            SERPER_REQUEST_SECONDS.labels(endpoint, status).observe(time.perf_counter() - start)
+        
+        if response.status_code != 429:
+            return response
+        
+        # Cuota agotada: nadie envía más solicitudes hasta que Serper lo permita
+        wait = _retry_after(response)
+        serper_limiter.pause(wait)
+        if attempt == 0:
+            logger.warning(f"Serper respondió 429; solicitudes en pausa durante {wait:.1f}s")
+    
+    return response
+
+
+# Operadores de Google que distinguen mayúsculas y no deben pasarse a minúsculas
+_QUERY_OPERATORS = {"OR", "AND"}
+
+
+def normalize_site(site: Optional[str]) -> Optional[str]:
+    """
+    Normaliza un dominio (con o sin ruta) para usarlo en el operador site:.
+    
+    Args:
+        site: Dominio, URL o dominio con ruta.
+        
+    Returns:
+        Optional[str]: Host en minúsculas con la ruta original, sin esquema ni barra
+        final, o None si el sitio está vacío.
+    """
+    if not site:
+        return None
+    site = site.strip()
+    parsed = urlparse(site if "://" in site else f"//{site}")
+    host = (parsed.netloc or "").lower().rstrip(".")
+    path = parsed.path.rstrip("/")
+    return (host + path) or None
+
+
+def normalize_query(query: str, site: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """
+    Normaliza una consulta para que variantes equivalentes compartan caché.
+    
+    Pasa la consulta a minúsculas (salvo los operadores OR y AND), colapsa los
+    espacios y extrae un único operador site: de cualquier posición para tratarlo
+    igual que el parámetro site.
+    
+    Args:
+        query: Consulta de búsqueda.
+        site: Dominio específico para buscar.
+        
+    Returns:
+        Tuple: Consulta normalizada y sitio normalizado (o None).
+    """
+    site = normalize_site(site)
+    tokens = query.split()
+    site_tokens = [i for i, token in enumerate(tokens) if token.lower().startswith("site:") and len(token) > 5]
+    
+    # Un único site: compatible con el parámetro se convierte en el sitio de la búsqueda
+    if len(site_tokens) == 1:
+        inline = normalize_site(tokens[site_tokens[0]][5:])
+        if site is None or inline == site:
+            site = inline
+            del tokens[site_tokens[0]]
+    
+    words = []
+    for token in tokens:
+        if token in _QUERY_OPERATORS:
+            words.append(token)
+        elif token.lower().startswith("site:") and len(token) > 5:
+            words.append(f"site:{normalize_site(token[5:])}")
+        else:
+            words.append(token.lower())
+    return " ".join(words), site
+
+
+def _build_search(
+    query: str,
+    site: Optional[str],
+    num_results: int
+) -> Tuple[str, Dict[str, Any], str]:
+    """
+    Construye la consulta de Serper, su cuerpo JSON y su clave de caché.
+    
+    La clave no incluye el número de resultados: una respuesta con más resultados
+    sirve también a las consultas que piden menos. Se piden al menos
+    SEARCH_MIN_NUM_RESULTS resultados para que esa reutilización sea frecuente.
+    
+    Args:
+        query: Consulta de búsqueda.
+        site: Dominio específico para buscar.
+        num_results: Número de resultados a devolver.
+        
+    Returns:
+        Tuple: Consulta final, cuerpo de la solicitud y clave de caché.
+    """
+    query, site = normalize_query(query, site)
+    
+    # Construir la consulta con el sitio específico
+    search_query = query
+    if site:
+        search_query = f"site:{site} {query}"
+    
+    payload = {
+        "q": search_query,
+        "num": max(num_results, SEARCH_MIN_NUM_RESULTS),
+    }
+    
+    return search_query, payload, search_query
+
+
+# Registro de consultas: un mensaje JSON por línea, solo en SEARCH_QUERY_LOG. El
+# fichero se abre en la primera consulta, se reabre si lo rota una herramienta
+# externa (logrotate) y logging lo cierra al terminar el proceso.
+query_logger = logging.getLogger("mcp-serper.queries")
+query_logger.propagate = False
+if SEARCH_QUERY_LOG:
+    _query_handler = logging.handlers.WatchedFileHandler(SEARCH_QUERY_LOG, encoding="utf-8", delay=True)
+    _query_handler.setFormatter(logging.Formatter("%(message)s"))
+    query_logger.addHandler(_query_handler)
+    query_logger.setLevel(logging.INFO)
+
+
+def _record_query(query: str, site: Optional[str], num_results: int) -> None:
+    """
+    Añade una consulta al registro SEARCH_QUERY_LOG, si está configurado.
+    
+    El registro permite medir la tasa de aciertos de la caché con consultas reales
+    (benchmarks/bench_query_cache.py).
+    """
+    if not SEARCH_QUERY_LOG:
+        return
+    query_logger.info(json.dumps(
+        {"ts": round(time.time(), 3), "query": query, "site": site, "num_results": num_results},
+        ensure_ascii=False
+    ))
+
+
+def _slice_results(result: Dict[str, Any], num_results: int) -> Dict[str, Any]:
+    """Recorta los resultados orgánicos de una respuesta de Serper a num_results."""
+    organic = result.get("organic")
+    if not organic or len(organic) <= num_results:
+        return result
+    return dict(result, organic=organic[:num_results])
+
+
+async def _post_serper(
+    payload: Dict[str, Any],
+    headers: Dict[str, str],
+    cache_key: str,
+    timeout: int
+) -> Dict[str, Any]:
+    """
+    Envía una consulta a Serper y guarda la respuesta en caché.
+    
+    Args:
+        payload: Cuerpo JSON de la solicitud.
+        headers: Cabeceras de la solicitud.
+        cache_key: Clave de caché de la consulta.
+        timeout: Tiempo máximo de espera en segundos.
+        
+    Returns:
+        Dict: Respuesta de Serper.
+        
+    Raises:
+        Exception: Si ocurre un error durante la búsqueda.
+    """
+    # Realizar la solicitud con el cliente compartido (conexiones keep-alive)
+    try:
+        response = await _serper_request(payload, headers, timeout, "search")
+        
+        if response.status_code == 200:
+            result: Dict[str, Any] = response.json()
+            
+            # Almacenar en caché
+            with span("search.cache_store"):
+                await results_cache.set(cache_key, _search_entry(result, payload["num"]))
+            
+            return result
+        else:
+            error_msg = f"Error en Serper API: {response.status_code} - {response.text}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+    
+    except httpx.TimeoutException:
+        raise Exception(f"Tiempo de espera agotado al consultar la API. Timeout: {timeout}s")
+    
+    except Exception as e:
+        logger.error(f"Error inesperado al buscar en la web: {str(e)}")
+        raise Exception(f"Error al buscar en la web: {str(e)}")
+
+
+def _search_entry(result: Dict[str, Any], num_results: int) -> Dict[str, Any]:
+    """Envuelve una respuesta de Serper con la hora en que se obtuvo y los resultados pedidos."""
+    return {"result": result, "fetched_at": time.time(), "num": num_results}
+
+
+def _search_age(entry: Optional[Dict[str, Any]]) -> Optional[float]:
+    """
+    Edad en segundos de una entrada de la caché de búsquedas.
+    
+    Returns:
+        Optional[float]: Edad de la entrada, o None si no existe o tiene un formato
+        anterior (respuestas sin envolver guardadas en Redis por otras versiones).
+    """
+    if not isinstance(entry, dict) or "fetched_at" not in entry or "num" not in entry:
+        return None
+    return time.time() - float(entry["fetched_at"])
+
+
+def _refresh_in_background(cache_key: str, fn: Callable[[], Awaitable[Dict[str, Any]]]) -> None:
+    """
+    Refresca una entrada caducada sin bloquear al solicitante.
+    
+    Solo se lanza un refresco por clave: si ya hay una consulta en curso, la
+    respuesta nueva llegará a la caché igualmente.
+    """
+    if cache_key in _background_refreshes or cache_key in search_flights:
+        return
+    
+    search_staleness["refreshes"] += 1
+    # La tarea hereda la prioridad: el refresco cede el cupo de Serper a las consultas interactivas
+    with request_priority("background"):
+        task = asyncio.ensure_future(search_flights.do(cache_key, fn))
+    _background_refreshes[cache_key] = task
+    
+    def done(task: "asyncio.Task[Any]") -> None:
+        _background_refreshes.pop(cache_key, None)
+        if not task.cancelled() and task.exception() is not None:
+            search_staleness["refresh_errors"] += 1
+            logger.warning(f"Error al refrescar en segundo plano '{cache_key}': {task.exception()}")
+    
+    task.add_done_callback(done)
+
+
+def search_staleness_stats() -> Dict[str, Any]:
+    """Contadores de resultados caducados servidos y de refrescos en segundo plano."""
+    return dict(
+        search_staleness,
+        refreshing=len(_background_refreshes),
+        stale_while_revalidate_window=SEARCH_STALE_WHILE_REVALIDATE,
+        stale_if_error_window=SEARCH_STALE_IF_ERROR
+    )
+
+
+@traced("search_web")
+async def search_web(
+    query: str,
+    site: Optional[str] = None,
+    num_results: int = 10,
+    timeout: int = 30,
+) -> Dict[str, Any]:
+    """
+    Realiza una búsqueda en la web usando Google Serper API.
+    
+    Un resultado caducado hace menos de SEARCH_STALE_WHILE_REVALIDATE segundos se
+    devuelve de inmediato mientras se refresca en segundo plano. Si Serper falla, se
+    devuelve el último resultado válido con menos de SEARCH_STALE_IF_ERROR segundos
+    de caducidad.
+    
+    Args:
+        query: Consulta de búsqueda.
+        site: Dominio específico para buscar.
+        num_results: Número de resultados a devolver.
+        timeout: Tiempo máximo de espera en segundos.
+        timings: Si es True, añade al resultado el bloque "timings" (ver timing.traced).
+        
+    Returns:
+        Dict: Resultados de la búsqueda.
+        
+    Raises:
+        Exception: Si ocurre un error durante la búsqueda.
+    """
+    if not SERPER_API_KEY:
+        raise Exception("SERPER_API_KEY no está configurado. Defina esta variable de entorno.")
+    
+    _record_query(query, site, num_results)
+    
+    # Preparar la solicitud
+    search_query, payload, cache_key = _build_search(query, site, num_results)
+    headers = _serper_headers()
+    # Las solicitudes en curso se agrupan por consulta y número de resultados pedidos
+    flight_key = f"{cache_key}#{payload['num']}"
+    
+    def fetch() -> Awaitable[Dict[str, Any]]:
+        return _post_serper(payload, headers, cache_key, timeout)
+    
+    # Verificar caché; una respuesta con más resultados también sirve
+    with span("search.cache") as cache_span:
+        entry: Dict[str, Any] = await results_cache.get(cache_key) or {}
+        age = _search_age(entry)
+        cache_span.set(hit=age is not None)
+    if age is not None and entry["num"] >= num_results:
+        if age <= SEARCH_CACHE_TTL:
+            logger.info(f"Recuperando resultados de caché para: {search_query}")
+            return _slice_results(entry["result"], num_results)
+        if age <= SEARCH_CACHE_TTL + SEARCH_STALE_WHILE_REVALIDATE:
+            logger.info(f"Resultados caducados servidos mientras se refrescan: {search_query}")
+            search_staleness["stale"] += 1
+            _refresh_in_background(flight_key, fetch)
+            return _slice_results(entry["result"], num_results)
+    
+    # Unirse a una solicitud idéntica en curso, si la hay
+    try:
+        with span("search.serper"):
+            result = await search_flights.do(flight_key, fetch)
+    except Exception as e:
+        if age is not None and age <= SEARCH_CACHE_TTL + SEARCH_STALE_IF_ERROR:
+            logger.warning(f"Serper no disponible, se sirve el último resultado de '{search_query}': {str(e)}")
+            search_staleness["stale_if_error"] += 1
+            return _slice_results(entry["result"], num_results)
+        raise
+    
+    return _slice_results(result, num_results)
+
+
+async def _post_serper_batch(
+    payloads: List[Dict[str, Any]],
+    timeout: int
+) -> List[Dict[str, Any]]:
+    """
+    Envía varias consultas a Serper en una sola solicitud (cuerpo JSON en forma de lista).
+    
+    Args:
+        payloads: Cuerpos de las consultas.
+        timeout: Tiempo máximo de espera en segundos.
+        
+    Returns:
+        List: Respuestas de Serper en el mismo orden que las consultas.
+        
+    Raises:
+        Exception: Si ocurre un error durante la búsqueda.
+    """
+    try:
+        response = await _serper_request(payloads, _serper_headers(), timeout, "batch")
+        
+        if response.status_code != 200:
+            error_msg = f"Error en Serper API: {response.status_code} - {response.text}"
+            logger.error(error_msg)
+            raise Exception(error_msg)
+        
+        results = response.json()
+        if not isinstance(results, list) or len(results) != len(payloads):
+            raise Exception("Respuesta de lote inesperada de Serper API")
+        return results
+    
+    except httpx.TimeoutException:
+        raise Exception(f"Tiempo de espera agotado al consultar la API. Timeout: {timeout}s")
+    
+    except Exception as e:
+        logger.error(f"Error inesperado en la búsqueda por lotes: {str(e)}")
+        raise Exception(f"Error al buscar en la web: {str(e)}")
+
+
+async def search_batch(
+    queries: List[Dict[str, Any]],
+    num_results: int = 10,
+    timeout: int = 30,
+) -> Dict[str, Any]:
+    """
+    Realiza varias búsquedas con el mínimo de solicitudes a Google Serper API.
+    
+    Cada consulta usa la misma clave de caché que search_web. Las que ya están en
+    caché no se envían; el resto se agrupa, sin consultas equivalentes repetidas, en
+    solicitudes por lotes de hasta SERPER_BATCH_SIZE consultas, con prioridad
+    "batch" en el limitador de tasa de Serper.
+    
+    Args:
+        queries: Consultas con las claves "query" y, opcionalmente, "site" y "num_results".
+        num_results: Número de resultados por defecto para cada consulta.
+        timeout: Tiempo máximo de espera en segundos.
+        
+    Returns:
+        Dict: Resultados por consulta, en el mismo orden, con "result" o "error";
+        "total" y "cached" cuentan consultas enviadas (las repetidas incluidas).
+        
+    Raises:
+        Exception: Si la API no está configurada o las consultas no son válidas.
+    """
+    if not SERPER_API_KEY:
+        raise Exception("SERPER_API_KEY no está configurado. Defina esta variable de entorno.")
+    
+    if not queries:
+        raise Exception("Se requiere al menos una consulta.")
+    
+    if len(queries) > SEARCH_BATCH_MAX_QUERIES:
+        raise Exception(f"Demasiadas consultas: {len(queries)}. El máximo es {SEARCH_BATCH_MAX_QUERIES}.")
+    
+    # Validar todas las consultas antes de registrar o enviar ninguna
+    for position, entry in enumerate(queries):
+        if not isinstance(entry, dict):
+            raise Exception(f"La consulta {position} debe ser un objeto.")
+        if not isinstance(entry.get("query"), str) or not entry["query"].strip():
+            raise Exception(f"La consulta {position} requiere el campo 'query'.")
+        if entry.get("site") is not None and not isinstance(entry["site"], str):
+            raise Exception(f"El campo 'site' de la consulta {position} debe ser una cadena.")
+        item_num = entry.get("num_results", num_results)
+        if not isinstance(item_num, int) or isinstance(item_num, bool) or item_num < 1:
+            raise Exception(f"El campo 'num_results' de la consulta {position} debe ser un entero positivo.")
+    
+    items = []
+    for entry in queries:
+        item_num = entry.get("num_results", num_results)
+        _record_query(entry["query"], entry.get("site"), item_num)
+        _, payload, cache_key = _build_search(entry["query"], entry.get("site"), item_num)
+        items.append({
+            "query": entry["query"],
+            "site": entry.get("site"),
+            "num_results": item_num,
+            "payload": payload,
+            "cache_key": cache_key
+        })
+    
+    # Consultas equivalentes comparten clave; se pide el mayor número de resultados
+    payloads: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        key = item["cache_key"]
+        if key not in payloads or item["payload"]["num"] > payloads[key]["num"]:
+            payloads[key] = item["payload"]
+    
+    # Resolver desde caché y agrupar las consultas pendientes (sin duplicados)
+    outcomes: Dict[str, Dict[str, Any]] = {}
+    pending: Dict[str, Dict[str, Any]] = {}
+    stale: Dict[str, Dict[str, Any]] = {}
+    for key, payload in payloads.items():
+        cached: Dict[str, Any] = await results_cache.get(key) or {}
+        age = _search_age(cached)
+        if age is not None and age <= SEARCH_CACHE_TTL and cached["num"] >= payload["num"]:
+            outcomes[key] = {"result": cached["result"], "cached": True}
+        else:
+            pending[key] = payload
+            if age is not None and age <= SEARCH_CACHE_TTL + SEARCH_STALE_IF_ERROR:
+                stale[key] = cached["result"]
+    
+    keys = list(pending)
+    chunks = [keys[i:i + SERPER_BATCH_SIZE] for i in range(0, len(keys), SERPER_BATCH_SIZE)]
+    
+    async def run_chunk(chunk: List[str]) -> None:
+        try:
+            results = await _post_serper_batch([pending[key] for key in chunk], timeout)
+        except Exception as e:
+            # Un lote fallido solo afecta a sus consultas; se usa el último resultado válido si lo hay
+            for key in chunk:
+                if key in stale:
+                    search_staleness["stale_if_error"] += 1
+                    outcomes[key] = {"result": stale[key], "cached": True, "stale": True}
+                else:
+                    outcomes[key] = {"error": str(e)}
+            return
+        for key, result in zip(chunk, results):
+            await results_cache.set(key, _search_entry(result, pending[key]["num"]))
+            outcomes[key] = {"result": result, "cached": False}
+    
+    if chunks:
+        logger.info(f"Enviando {len(keys)} consultas a Serper en {len(chunks)} lote(s)")
+        # Los lotes ceden el cupo de Serper a las consultas interactivas
+        with request_priority("batch"):
+            await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+    
+    results = []
+    for item in items:
+        entry = {"query": item["query"], "site": item["site"]}
+        entry.update(outcomes[item["cache_key"]])
+        if "result" in entry:
+            entry["result"] = _slice_results(entry["result"], item["num_results"])
+        results.append(entry)
+    
+    return {
+        "results": results,
+        "total": len(results),
+        "cached": sum(1 for item in items if outcomes[item["cache_key"]].get("cached")),
+        "upstream_requests": len(chunks)
+    }
+
+
+def _normalize_url(url: str) -> str:
+    """
+    Normaliza una URL para usarla como clave de caché y de agrupación.
+    
+    Args:
+        url: URL original.
+        
+    Returns:
+        str: URL con esquema y host en minúsculas y sin fragmento.
+    """
+    parsed = urlparse(url.strip())
+    return parsed._replace(
+        scheme=parsed.scheme.lower(),
+        netloc=parsed.netloc.lower(),
+        fragment=""
+    ).geturl()
+
+
+async def _read_capped_body(response: httpx.Response, max_bytes: int) -> Tuple[bytes, bool]:
+    """
+    Lee el cuerpo de una respuesta en streaming sin superar max_bytes.
+    
+    El límite se aplica sobre los bytes ya descomprimidos, por lo que también se
+    respeta con respuestas chunked o comprimidas sin Content-Length. Los bytes se
+    devuelven sin decodificar para que la decodificación y el análisis se hagan
+    fuera del bucle de eventos.
+    
+    Args:
+        response: Respuesta abierta con client.stream().
+        max_bytes: Número máximo de bytes a leer.
+        
+    Returns:
+        Tuple: Cuerpo leído y si el contenido se truncó.
+    """
+    body = bytearray()
+    truncated = False
+    
+    async for chunk in response.aiter_bytes():
+        if len(body) + len(chunk) > max_bytes:
+            body += chunk[:max_bytes - len(body)]
+            truncated = True
+            break
+        body += chunk
+    
+    return bytes(body), truncated
+
+
+async def _fetch_once(
+    url: str,
+    headers: Dict[str, str],
+    timeout: float,
+    max_content_length: int
+) -> Dict[str, Any]:
+    """
+    Un intento de descarga de una página.
+    
+    El cuerpo solo se lee si la respuesta es 200.
+    
+    Args:
+        url: URL a recuperar.
+        headers: Cabeceras de la solicitud (condicionales, si las hay).
+        timeout: Tiempo máximo de espera en segundos.
+        max_content_length: Tamaño máximo de contenido a recuperar en bytes.
+        
+    Returns:
+        Dict: Estado, motivo, cuerpo, si se truncó, codificación, URL final, ETag y
+        Last-Modified de la respuesta.
+    """
+    # El perfil "docs" ya incluye el User-Agent y reutiliza conexiones por host
+    client = get_http_client("docs")
+    start = time.perf_counter()
+    status: Any = "cancelled"
+    try:
+        async with client.stream(
+            "GET",
+            url,
+            headers=headers,
+            timeout=timeout,
+            follow_redirects=True
+        ) as response:
+            status = response.status_code
+            body, truncated = None, False
+            if response.status_code == 200:
+                # Leer el cuerpo por fragmentos hasta el límite de bytes
+                body, truncated = await _read_capped_body(response, max_content_length)
+            return {
+                "status": response.status_code,
+                "reason": response.reason_phrase,
+                "body": body,
+                "truncated": truncated,
+                "encoding": response.charset_encoding,
+                "url": str(response.url),
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified")
+            }
+    except httpx.TimeoutException:
+        status = "timeout"
+        raise
+    except Exception:
+        if status == "cancelled":
+            status = "error"
+        raise
+    finally:
+        FETCH_DOWNLOAD_SECONDS.labels(status).observe(time.perf_counter() - start)
+
+
+def _page_entry(
+    page: Dict[str, Any],
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    fetched_at: Optional[float] = None,
+    limit: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Envuelve una página con los datos necesarios para revalidarla.
+    
+    Args:
+        page: Página en el formato de fetch_url.
+        etag: Cabecera ETag de la respuesta.
+        last_modified: Cabecera Last-Modified de la respuesta.
+        fetched_at: Hora de descarga o de la última revalidación (por defecto, ahora).
+        limit: Límite en bytes con el que se cortó la página, si se truncó.
+        
+    Returns:
+        Dict: Entrada de la caché de páginas.
+    """
+    return {
+        "page": page,
+        "etag": etag,
+        "last_modified": last_modified,
+        "fetched_at": fetched_at or time.time(),
+        "limit": limit
+    }
+
+
+def _covers(entry: Dict[str, Any], max_content_length: int) -> bool:
+    """
+    Indica si una entrada de página sirve para una solicitud con este límite de bytes.
+    
+    Una página truncada solo sirve a solicitudes con un límite igual o menor que
+    aquel con el que se cortó; las entradas truncadas sin límite conocido no sirven.
+    """
+    if not entry["page"].get("truncated"):
+        return True
+    return (entry.get("limit") or 0) >= max_content_length
+
+
+def _is_fresh(entry: Dict[str, Any]) -> bool:
+    """
+    Indica si una entrada de página puede servirse sin consultar al servidor.
+    
+    Las entradas sin ETag ni Last-Modified no pueden revalidarse y se sirven hasta
+    que expiran; las demás se revalidan pasados PAGE_REVALIDATE_AFTER segundos.
+    """
+    if not entry.get("etag") and not entry.get("last_modified"):
+        return True
+    return time.time() - float(entry["fetched_at"]) <= PAGE_REVALIDATE_AFTER
+
+
+def _count_page_lookup(outcome: str) -> None:
+    """Registra el resultado de una consulta de página (hit, revalidated, changed o miss)."""
+    page_revalidation[outcome] += 1
+
+
+def page_revalidation_stats() -> Dict[str, Any]:
+    """
+    Tasas de acierto, revalidación y fallo de fetch_url.
+    
+    Returns:
+        Dict: Contadores y tasas: "hit" (servida sin red), "revalidated" (304),
+        "changed" (revalidación con página nueva) y "miss" (descarga completa).
+    """
+    total = sum(page_revalidation.values())
+    stats: Dict[str, Any] = dict(page_revalidation, total=total)
+    for outcome in ("hit", "revalidated", "changed", "miss"):
+        stats[f"{outcome}_rate"] = round(page_revalidation[outcome] / total, 4) if total else 0.0
+    return stats
+
+
+async def _store_page(cache_key: str, entry: Dict[str, Any]) -> None:
+    """Guarda una entrada nueva en la caché de páginas, el almacén y el índice local."""
+    page = entry["page"]
+    await page_cache.set(cache_key, entry)
+    store = get_page_store()
+    if store is not None:
+        await store.put(cache_key, page, entry["etag"], entry["last_modified"], entry.get("limit"))
+    await _index_page(page)
+
+
+async def _download_page(
+    url: str,
+    cache_key: str,
+    timeout: int,
+    max_content_length: int,
+    previous: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Descarga una página, extrae su contenido y lo guarda en caché.
+    
+    Si hay una copia anterior con ETag o Last-Modified, la solicitud es condicional:
+    un 304 renueva la copia sin descargar ni analizar el cuerpo, y un error de red
+    o una respuesta distinta de 200 devuelven la copia anterior. Los errores de red, timeouts y respuestas 429/5xx se
+    reintentan dentro de timeout, y un host con el circuito abierto falla al momento
+    (ver resilience.HostResilience).
+    
+    Args:
+        url: URL a recuperar.
+        cache_key: Clave de caché de la página.
+        timeout: Tiempo máximo de espera en segundos.
+        max_content_length: Tamaño máximo de contenido a recuperar en bytes.
+        previous: Entrada anterior de la página, para revalidarla.
+        
+    Returns:
+        Dict: Título y contenido de la página, o descripción del error.
+    """
+    headers = {}
+    if previous is not None:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+    
+    try:
+        with span("page.download", url=url) as download_span:
+            response = await fetch_resilience.call(
+                urlparse(url).netloc.lower(),
+                lambda remaining: _fetch_once(url, headers, remaining, max_content_length),
+                timeout,
+                is_failure=lambda response: response["status"] in RETRYABLE_STATUS,
+                retry_on=(httpx.TransportError,)
+            )
+            download_span.set(status=response["status"])
+        
+        if response["status"] == 304 and previous is not None:
+            # Sin cambios: renovar la copia sin descargar ni analizar el cuerpo
+            _count_page_lookup("revalidated")
+            refreshed = dict(previous, fetched_at=time.time())
+            await page_cache.set(cache_key, refreshed)
+            store = get_page_store()
+            if store is not None:
+                await store.touch(cache_key, refreshed["fetched_at"])
+            logger.info(f"Página sin cambios (304): {url}")
+            return previous["page"]
+        
+        if response["status"] != 200:
+            if previous is not None:
+                # Un error transitorio del servidor no sustituye a una copia válida
+                logger.warning(
+                    f"Respuesta {response['status']} al revalidar {url}; se sirve la copia anterior"
+                )
+                return previous["page"]
+            return {
+                "title": f"Error {response['status']}",
+                "content": f"No se pudo obtener el contenido: {response['status']} - {response['reason']}"
+            }
+        
+        body, truncated, encoding = response["body"], response["truncated"], response["encoding"]
+        final_url, etag, last_modified = response["url"], response["etag"], response["last_modified"]
+        
+        _count_page_lookup("changed" if previous is not None else "miss")
+        
+        if truncated:
+            logger.info(f"Contenido truncado a {max_content_length // 1024}KB: {url}")
+        
+        # Decodificar y extraer título y contenido principal en el pool de extracción
+        parse_start = time.perf_counter()
+        with span("page.parse", bytes=len(body)):
+            extracted = await get_extraction_pool().extract(body, encoding, truncated)
+        FETCH_PARSE_SECONDS.observe(time.perf_counter() - parse_start)
+        
+        page = {
+            "title": extracted["title"],
+            "content": extracted["content"],
+            "url": final_url,
+            "truncated": truncated
+        }
+        
+        # Almacenar en caché solo las páginas recuperadas correctamente
+        with span("page.cache_store"):
+            entry = _page_entry(page, etag, last_modified, limit=max_content_length if truncated else None)
+            await _store_page(cache_key, entry)
+        
+        return page
+    
+    except httpx.TimeoutException:
+        if previous is not None:
+            logger.warning(f"Tiempo agotado al revalidar {url}; se sirve la copia anterior")
+            return previous["page"]
+        return {
+            "title": "Tiempo de espera agotado",
+            "content": f"No se pudo obtener el contenido dentro del tiempo límite de {timeout} segundos."
+        }
+    
+    except Exception as e:
+        if previous is not None:
+            logger.warning(f"Error al revalidar {url}: {str(e)}; se sirve la copia anterior")
+            return previous["page"]
+        logger.error(f"Error al recuperar URL {url}: {str(e)}")
+        return {
+            "title": "Error al recuperar contenido",
+            "content": f"Ocurrió un error: {str(e)}"
+        }
+
+
+async def _index_page(page: Dict[str, Any]) -> None:
+    """
+    Añade una página extraída al índice local.
+    
+    El análisis del texto se hace en un hilo; solo la inserción en el índice,
+    proporcional al número de términos distintos, se ejecuta en el bucle de eventos.
+    
+    Args:
+        page: Página con "url", "title" y "content".
+    """
+    if not DOCS_INDEX_ENABLED or not page.get("content"):
+        return
+    try:
+        term_counts, length = await asyncio.to_thread(analyze_document, page["title"] or "", page["content"])
+        docs_index.add_analyzed(page["url"], page["title"], page["content"], term_counts, length)
+    except Exception as e:
+        logger.warning(f"No se pudo indexar {page.get('url')}: {str(e)}")
 
 
-async def search_web(
-    query: str,
-    site: Optional[str] = None,
-    num_results: int = 10,
-    timeout: int = 30,
+async def _load_page(
+    url: str,
+    cache_key: str,
+    timeout: int,
+    max_content_length: int,
+    previous: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
     """
-    Realiza una búsqueda en la web usando Google Serper API.
+    Obtiene una página del almacén persistente o de la red.
+    
+    Una copia del almacén que ya no está fresca se revalida con una solicitud
+    condicional en lugar de descargarse de nuevo.
     
     Args:
-        query: Consulta de búsqueda.
-        site: Dominio específico para buscar.
-        num_results: Número de resultados a devolver.
+        url: URL a recuperar.
+        cache_key: URL canónica de la página.
         timeout: Tiempo máximo de espera en segundos.
+        max_content_length: Tamaño máximo de contenido a recuperar en bytes.
+        previous: Entrada de la caché de páginas que debe revalidarse, si la hay.
         
     Returns:
-        Dict: Resultados de la búsqueda.
-        
-    Raises:
-        Exception: Si ocurre un error durante la búsqueda.
+        Dict: Título y contenido de la página, o descripción del error.
     """
-    if not SERPER_API_KEY:
-        raise Exception("SERPER_API_KEY no está configurado. Defina esta variable de entorno.")
-    
-    # Construir la consulta con el sitio específico
-    search_query = query
-    if site:
-        search_query = f"site:{site} {query}"
-    
-    # Preparar la solicitud
-    headers = {
-        "X-API-KEY": SERPER_API_KEY,
-        "Content-Type": "application/json"
-    }
-    
-    payload = {
-        "q": search_query,
-        "num": num_results,
-    }
-    
-    cache_key = f"{search_query}_{num_results}"
-    
-    # Verificar caché
-    if cache_key in results_cache:
-        logger.info(f"Recuperando resultados de caché para: {search_query}")
-        return results_cache[cache_key]
-    
-    # Realizar la solicitud
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                SERPER_API_URL,
-                headers=headers,
-                json=payload,
-                timeout=timeout
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                
-                # Almacenar en caché
-                results_cache[cache_key] = result
-                
-                return result
-            else:
-                error_msg = f"Error en Serper API: {response.status_code} - {response.text}"
-                logger.error(error_msg)
-                raise Exception(error_msg)
-    
-    except httpx.TimeoutException:
-        raise Exception(f"Tiempo de espera agotado al consultar la API. Timeout: {timeout}s")
+    store = get_page_store()
+    if previous is None and store is not None:
+        with span("page.store") as store_span:
+            stored = await store.get(cache_key)
+            store_span.set(hit=stored is not None)
+        entry = None
+        if stored is not None and stored.age <= PAGE_STORE_TTL:
+            entry = _page_entry(stored.page, stored.etag, stored.last_modified, stored.fetched_at, stored.limit)
+        # Una copia truncada con un límite menor se descarga de nuevo
+        if entry is not None and stored is not None and _covers(entry, max_content_length):
+            if stored.page["url"] not in docs_index:
+                await _index_page(stored.page)
+            if _is_fresh(entry):
+                logger.info(f"Recuperando página del almacén: {url}")
+                _count_page_lookup("hit")
+                await page_cache.set(cache_key, entry)
+                return stored.page
+            previous = entry
     
-    except Exception as e:
-        logger.error(f"Error inesperado al buscar en la web: {str(e)}")
-        raise Exception(f"Error al buscar en la web: {str(e)}")
+    return await _download_page(url, cache_key, timeout, max_content_length, previous)
 
 
+@traced("fetch_url")
 async def fetch_url(
     url: str,
     timeout: int = 30,
     max_content_length: int = 500000  # ~500KB
-) -> Dict[str, str]:
+) -> Dict[str, Any]:
     """
     Recupera el contenido de una URL.
     
+    El cuerpo se descarga en streaming y se corta al llegar a max_content_length,
+    de modo que el uso de memoria no depende del tamaño de la página. Si
+    PAGE_STORE_PATH está definido, las páginas se leen y guardan también en el
+    almacén persistente, que sobrevive a los reinicios. Las copias con ETag o
+    Last-Modified se revalidan con una solicitud condicional pasados
+    PAGE_REVALIDATE_AFTER segundos. Una copia truncada solo se reutiliza si se
+    cortó con un límite igual o mayor que max_content_length.
+    
     Args:
         url: URL a recuperar.
         timeout: Tiempo máximo de espera en segundos.
         max_content_length: Tamaño máximo de contenido a recuperar en bytes.
+        timings: Si es True, añade al resultado el bloque "timings" (ver timing.traced).
         
     Returns:
-        Dict: Título y contenido de la página.
+        Dict: Título, contenido y URL final de la página, y "truncated" si el
+        contenido se cortó al alcanzar max_content_length.
         
     Raises:
         Exception: Si ocurre un error durante la recuperación.
     """
+    cache_key = _normalize_url(url)
+    
+    # Verificar caché (las entradas sin "page" son de versiones anteriores en Redis)
+    with span("page.cache") as cache_span:
+        cached = await page_cache.get(cache_key)
+        if cached is not None and ("page" not in cached or not _covers(cached, max_content_length)):
+            cached = None
+        cache_span.set(hit=cached is not None)
+    if cached is not None and _is_fresh(cached):
+        logger.info(f"Recuperando página de caché: {url}")
+        _count_page_lookup("hit")
+        return cached["page"]
+    
+    # Unirse a una descarga o revalidación idéntica en curso, si la hay (con el mismo
+    # límite de bytes: una descarga con un límite menor podría devolver una página truncada)
+    with span("page.load"):
+        return await page_flights.do(
+            f"{cache_key}#{max_content_length}",
+            lambda: _load_page(url, cache_key, timeout, max_content_length, cached)
+        )
+
+
+async def _fetch_contents(
+    items: List[Dict[str, Any]],
+    stream_callback: Optional[Callable[[Dict[str, Any], bool], Awaitable[None]]],
+    max_concurrency: int
+) -> None:
+    """
+    Descarga el contenido de varios resultados en paralelo con concurrencia acotada.
+    
+    Cada página se envía al callback en cuanto termina, sin esperar al orden de
+    relevancia. El contenido se guarda en cada elemento de `items`, por lo que la
+    lista conserva su orden original. Un fallo en una página no afecta al resto.
+    
+    Args:
+        items: Resultados con las claves "title" y "url"; se completan con "content".
+        stream_callback: Función de callback para streaming de resultados.
+        max_concurrency: Número máximo de descargas simultáneas.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    
+    async def fetch(index: int) -> Tuple[int, Optional[Dict[str, Any]]]:
+        link = items[index]["url"]
+        if not link:
+            return index, None
+        async with semaphore:
+            try:
+                return index, await fetch_url(link)
+            except Exception as e:
+                logger.error(f"Error al recuperar contenido de {link}: {str(e)}")
+                return index, {"title": "Error al recuperar contenido", "content": "", "error": str(e)}
+    
+    tasks = [asyncio.ensure_future(fetch(i)) for i in range(len(items))]
+    completed = 0
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-        }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                url,
-                headers=headers,
-                timeout=timeout,
-                follow_redirects=True
-            )
-            
-            if response.status_code != 200:
-                return {
-                    "title": f"Error {response.status_code}",
-                    "content": f"No se pudo obtener el contenido: {response.status_code} - {response.reason_phrase}"
-                }
-            
-            if int(response.headers.get("content-length", 0)) > max_content_length:
-                return {
-                    "title": "Contenido demasiado grande",
-                    "content": f"El contenido de la página excede el tamaño máximo permitido de {max_content_length // 1024}KB."
-                }
-            
-            # Procesar el contenido HTML
-            soup = BeautifulSoup(response.text, "html.parser")
-            
-            # Extraer título
-            title = soup.title.string if soup.title else "Sin título"
+        for next_done in asyncio.as_completed(tasks):
+            index, content_data = await next_done
+            completed += 1
+            result_item = items[index]
             
-            # Extraer contenido principal
-            # Intentar encontrar el contenido principal
-            main_content = soup.find("main") or soup.find("article") or soup.find("div", class_=["content", "main", "article"])
-            
-            if not main_content:
-                main_content = soup.body
-            
-            # Eliminar scripts, estilos y comentarios
-            for element in main_content(["script", "style", "nav", "footer", "header", "aside"]):
-                element.decompose()
+            # Informar del progreso
+            if stream_callback:
+                await stream_callback({
+                    "progress": {
+                        "current": completed,
+                        "total": len(items),
+                        "title": result_item["title"]
+                    }
+                })
             
-            # Extraer texto
-            content = main_content.get_text(separator=" ", strip=True)
+            if content_data is None:
+                continue
             
-            # Limpiar espacios excesivos y saltos de línea
-            import re
-            content = re.sub(r'\s+', ' ', content).strip()
+            result_item["content"] = content_data.get("content", "")
+            if content_data.get("truncated"):
+                result_item["truncated"] = True
+            if "error" in content_data:
+                result_item["error"] = content_data["error"]
             
-            return {
-                "title": title,
-                "content": content,
-                "url": str(response.url)
-            }
+            # Enviar contenido al callback si existe
+            if stream_callback:
+                await stream_callback({
+                    "content": {
+                        "title": result_item["title"],
+                        "source": result_item["url"],
+                        "text": result_item["content"],
+                        "rank": index + 1
+                    }
+                })
+    finally:
+        # Si el callback falla o la tarea se cancela, no dejar descargas huérfanas
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def _process_results(
+    organic_results: List[Dict[str, Any]],
+    with_content: bool,
+    stream_callback: Optional[Callable[[Dict[str, Any], bool], Awaitable[None]]],
+    max_concurrency: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Convierte los resultados orgánicos de Serper en resultados de documentación.
     
-    except httpx.TimeoutException:
-        return {
-            "title": "Tiempo de espera agotado",
-            "content": f"No se pudo obtener el contenido dentro del tiempo límite de {timeout} segundos."
+    Args:
+        organic_results: Resultados orgánicos ya recortados al número solicitado.
+        with_content: Si es True, incluye el contenido de cada resultado.
+        stream_callback: Función de callback para streaming de resultados.
+        max_concurrency: Descargas de contenido simultáneas (por defecto FETCH_CONCURRENCY).
+        
+    Returns:
+        List: Resultados en el orden de relevancia original.
+    """
+    results = []
+    for result in organic_results:
+        item = {
+            "title": result.get("title", "Sin título"),
+            "url": result.get("link", ""),
+            "snippet": result.get("snippet", "Sin descripción")
         }
+        # Origen del resultado en los modos que combinan el índice local y Serper
+        if "source" in result:
+            item["source"] = result["source"]
+        results.append(item)
+    
+    # Opcionalmente recuperar el contenido completo en paralelo
+    if with_content:
+        await _fetch_contents(results, stream_callback, max_concurrency or FETCH_CONCURRENCY)
+        return results
+    
+    if stream_callback:
+        for i, result_item in enumerate(results):
+            await stream_callback({
+                "progress": {
+                    "current": i + 1,
+                    "total": len(results),
+                    "title": result_item["title"]
+                }
+            })
+    
+    return results
+
+
+def _interleave_sources(
+    local: List[Dict[str, Any]],
+    remote: List[Dict[str, Any]],
+    limit: int
+) -> List[Dict[str, Any]]:
+    """
+    Intercala resultados locales y de Serper eliminando URLs duplicadas.
+    
+    Args:
+        local: Resultados del índice local en orden de relevancia.
+        remote: Resultados orgánicos de Serper en orden de relevancia.
+        limit: Número máximo de resultados.
+        
+    Returns:
+        List: Resultados combinados, empezando por el mejor de Serper.
+    """
+    merged: List[Dict[str, Any]] = []
+    seen = set()
+    for rank in range(max(len(local), len(remote))):
+        for results in (remote, local):
+            if rank >= len(results):
+                continue
+            result = results[rank]
+            key = _normalize_url(result.get("link", "")) or f"{result.get('source')}#{rank}"
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(result)
+    return merged[:limit]
+
+
+async def _search_docs(
+    query: str,
+    site: str,
+    num_results: int,
+    mode: str,
+    library: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Obtiene los resultados orgánicos de una búsqueda de documentación.
+    
+    Modos:
+        serper: solo Google Serper API.
+        local: solo el índice local, sin llamadas externas.
+        local_first: el índice local si tiene al menos DOCS_INDEX_MIN_RESULTS
+            resultados relevantes (o num_results, si es menor); en caso contrario,
+            Serper. Un resultado es relevante si contiene al menos
+            DOCS_INDEX_MIN_COVERAGE de los términos de la consulta y su puntuación
+            llega a DOCS_INDEX_MIN_SCORE.
+        merged: ambos, intercalados y sin duplicados.
+    
+    Args:
+        query: Consulta de búsqueda.
+        site: Dominio (o dominio + ruta) donde buscar.
+        num_results: Número de resultados a devolver.
+        mode: Modo de búsqueda.
+        library: Biblioteca de docs_urls, para filtrar el índice local por etiqueta.
+        
+    Returns:
+        List: Resultados en formato orgánico de Serper; en los modos distintos de
+        "serper" cada resultado indica su origen en "source".
+        
+    Raises:
+        Exception: Si el modo no es válido o falla la búsqueda en Serper.
+    """
+    if mode not in DOCS_SEARCH_MODES:
+        raise Exception(f"Modo de búsqueda no válido: {mode}. Los modos válidos son: {', '.join(DOCS_SEARCH_MODES)}")
     
+    if mode == "serper":
+        search_results = await search_web(query, site, num_results)
+        return search_results.get("organic", [])[:num_results]
+    
+    local: List[Dict[str, Any]] = []
+    if DOCS_INDEX_ENABLED:
+        with span("docs.local_index"):
+            hits = docs_index.search(
+                query,
+                num_results,
+                library=library,
+                site=None if library else site
+            )
+        local = [dict(hit, source="local") for hit in hits]
+    
+    if mode == "local":
+        return local
+    if mode == "local_first":
+        relevant = [
+            hit for hit in local
+            if hit["coverage"] >= DOCS_INDEX_MIN_COVERAGE and hit["score"] >= DOCS_INDEX_MIN_SCORE
+        ]
+        if len(relevant) >= min(num_results, DOCS_INDEX_MIN_RESULTS):
+            logger.info(f"Resultados del índice local para: {query} ({len(relevant)})")
+            return relevant
+    
+    try:
+        search_results = await search_web(query, site, num_results)
     except Exception as e:
-        logger.error(f"Error al recuperar URL {url}: {str(e)}")
-        return {
-            "title": "Error al recuperar contenido",
-            "content": f"Ocurrió un error: {str(e)}"
-        }
+        # Con resultados locales disponibles, un fallo de Serper no es fatal
+        if not local:
+            raise
+        logger.warning(f"Serper no disponible, se usan {len(local)} resultados locales: {str(e)}")
+        return local
+    
+    remote = [dict(result, source="serper") for result in search_results.get("organic", [])[:num_results]]
+    if mode == "merged":
+        return _interleave_sources(local, remote, num_results)
+    return remote
 
 
+@traced("get_docs")
 async def get_docs(
     query: str,
     library: str,
     num_results: int = 5,
     with_content: bool = False,
-    stream_callback: Optional[Callable[[Dict[str, Any], bool], Awaitable[None]]] = None
+    stream_callback: Optional[Callable[[Dict[str, Any], bool], Awaitable[None]]] = None,
+    max_concurrency: Optional[int] = None,
+    mode: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Busca documentación para una consulta específica en una biblioteca.
@@ -322,6 +1454,9 @@ async def get_docs(
         num_results: Número de resultados a devolver.
         with_content: Si es True, incluye el contenido de cada resultado.
         stream_callback: Función de callback para streaming de resultados.
+        max_concurrency: Descargas de contenido simultáneas (por defecto FETCH_CONCURRENCY).
+        mode: "serper", "local", "local_first" o "merged" (por defecto DOCS_SEARCH_MODE).
+        timings: Si es True, añade al resultado el bloque "timings" (ver timing.traced).
         
     Returns:
         Dict: Resultados de la búsqueda.
@@ -336,18 +1471,15 @@ async def get_docs(
         raise Exception(error_msg)
     
     site = docs_urls[library]
+    mode = mode or DOCS_SEARCH_MODE
     
     try:
-        # Buscar resultados
-        search_results = await search_web(query, site, num_results)
-        
-        # Extraer enlaces orgánicos
-        organic_results = search_results.get("organic", [])
-        
-        results = []
+        # Buscar resultados (Serper, índice local o ambos)
+        with span("docs.search", mode=mode):
+            organic_results = await _search_docs(query, site, num_results, mode, library=library)
         
         # Informar del total de resultados
-        total_results = min(len(organic_results), num_results)
+        total_results = len(organic_results)
         if stream_callback:
             await stream_callback({
                 "progress": {
@@ -358,49 +1490,20 @@ async def get_docs(
             })
         
         # Procesar cada resultado
-        for i, result in enumerate(organic_results[:num_results]):
-            title = result.get("title", "Sin título")
-            link = result.get("link", "")
-            snippet = result.get("snippet", "Sin descripción")
-            
-            # Informar del progreso
-            if stream_callback:
-                await stream_callback({
-                    "progress": {
-                        "current": i + 1,
-                        "total": total_results,
-                        "title": title
-                    }
-                })
-            
-            result_item = {
-                "title": title,
-                "url": link,
-                "snippet": snippet
-            }
-            
-            # Opcionalmente recuperar el contenido completo
-            if with_content and link:
-                content_data = await fetch_url(link)
-                result_item["content"] = content_data.get("content", "")
-                
-                # Enviar contenido al callback si existe
-                if stream_callback:
-                    await stream_callback({
-                        "content": {
-                            "title": title,
-                            "source": link,
-                            "text": content_data.get("content", "")
-                        }
-                    })
-            
-            results.append(result_item)
+        with span("docs.results", with_content=with_content):
+            results = await _process_results(
+                organic_results,
+                with_content,
+                stream_callback,
+                max_concurrency
+            )
         
         return {
             "results": results,
             "total": len(results),
             "library": library,
-            "query": query
+            "query": query,
+            "mode": mode
         }
     
     except Exception as e:
@@ -411,12 +1514,15 @@ async def get_docs(
         raise Exception(error_msg)
 
 
+@traced("get_docs_from_domain")
 async def get_docs_from_domain(
     query: str,
     domain: str,
     num_results: int = 5,
     with_content: bool = False,
-    stream_callback: Optional[Callable[[Dict[str, Any], bool], Awaitable[None]]] = None
+    stream_callback: Optional[Callable[[Dict[str, Any], bool], Awaitable[None]]] = None,
+    max_concurrency: Optional[int] = None,
+    mode: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     Busca documentación para una consulta específica en un dominio personalizado.
@@ -427,6 +1533,9 @@ async def get_docs_from_domain(
         num_results: Número de resultados a devolver.
         with_content: Si es True, incluye el contenido de cada resultado.
         stream_callback: Función de callback para streaming de resultados.
+        max_concurrency: Descargas de contenido simultáneas (por defecto FETCH_CONCURRENCY).
+        mode: "serper", "local", "local_first" o "merged" (por defecto DOCS_SEARCH_MODE).
+        timings: Si es True, añade al resultado el bloque "timings" (ver timing.traced).
         
     Returns:
         Dict: Resultados de la búsqueda.
@@ -443,19 +1552,16 @@ async def get_docs_from_domain(
     
     # Extraer el dominio base
     parsed_domain = urlparse(domain)
-    base_domain = parsed_domain.netloc or parsed_domain.path
+    base_domain = normalize_site(parsed_domain.netloc or parsed_domain.path)
+    mode = mode or DOCS_SEARCH_MODE
     
     try:
-        # Buscar resultados
-        search_results = await search_web(query, base_domain, num_results)
-        
-        # Extraer enlaces orgánicos
-        organic_results = search_results.get("organic", [])
-        
-        results = []
+        # Buscar resultados (Serper, índice local o ambos)
+        with span("docs.search", mode=mode):
+            organic_results = await _search_docs(query, base_domain or domain, num_results, mode)
         
         # Informar del total de resultados
-        total_results = min(len(organic_results), num_results)
+        total_results = len(organic_results)
         if stream_callback:
             await stream_callback({
                 "progress": {
@@ -466,49 +1572,20 @@ async def get_docs_from_domain(
             })
         
         # Procesar cada resultado
-        for i, result in enumerate(organic_results[:num_results]):
-            title = result.get("title", "Sin título")
-            link = result.get("link", "")
-            snippet = result.get("snippet", "Sin descripción")
-            
-            # Informar del progreso
-            if stream_callback:
-                await stream_callback({
-                    "progress": {
-                        "current": i + 1,
-                        "total": total_results,
-                        "title": title
-                    }
-                })
-            
-            result_item = {
-                "title": title,
-                "url": link,
-                "snippet": snippet
-            }
-            
-            # Opcionalmente recuperar el contenido completo
-            if with_content and link:
-                content_data = await fetch_url(link)
-                result_item["content"] = content_data.get("content", "")
-                
-                # Enviar contenido al callback si existe
-                if stream_callback:
-                    await stream_callback({
-                        "content": {
-                            "title": title,
-                            "source": link,
-                            "text": content_data.get("content", "")
-                        }
-                    })
-            
-            results.append(result_item)
+        with span("docs.results", with_content=with_content):
+            results = await _process_results(
+                organic_results,
+                with_content,
+                stream_callback,
+                max_concurrency
+            )
         
         return {
             "results": results,
             "total": len(results),
             "domain": base_domain,
-            "query": query
+            "query": query,
+            "mode": mode
         }
     
     except Exception as e:
@@ -519,12 +1596,195 @@ async def get_docs_from_domain(
         raise Exception(error_msg)
 
 
+def _merge_results(results_by_library: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Combina los resultados de varias bibliotecas eliminando URLs duplicadas.
+    
+    Los resultados se intercalan por posición (primero el mejor de cada biblioteca,
+    luego el segundo, etc.) para que ninguna biblioteca acapare las primeras
+    posiciones. Una URL repetida conserva su primera aparición y acumula en
+    "libraries" todas las bibliotecas que la devolvieron.
+    
+    Args:
+        results_by_library: Resultados de cada biblioteca en orden de relevancia.
+        
+    Returns:
+        List: Resultados combinados sin duplicados.
+    """
+    merged: List[Dict[str, Any]] = []
+    seen: Dict[str, Dict[str, Any]] = {}
+    depth = max((len(results) for results in results_by_library.values()), default=0)
+    
+    for rank in range(depth):
+        for library, results in results_by_library.items():
+            if rank >= len(results):
+                continue
+            result = results[rank]
+            key = _normalize_url(result["url"]) if result.get("url") else f"{library}#{rank}"
+            if key in seen:
+                seen[key]["libraries"].append(library)
+                continue
+            item = dict(result, library=library, libraries=[library])
+            seen[key] = item
+            merged.append(item)
+    
+    return merged
+
+
+@traced("get_docs_multi")
+async def get_docs_multi(
+    query: str,
+    libraries: List[str],
+    num_results: int = 5,
+    with_content: bool = False,
+    timeout: Optional[float] = None,
+    stream_callback: Optional[Callable[[Dict[str, Any], bool], Awaitable[None]]] = None,
+    max_concurrency: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Busca documentación en varias bibliotecas a la vez y combina los resultados.
+    
+    Las búsquedas se ejecutan en paralelo con un plazo común. Los resultados de cada
+    biblioteca se envían al callback en cuanto llegan; si el plazo vence, se
+    devuelven los resultados de las bibliotecas que hayan terminado. Una biblioteca
+    cuya búsqueda terminó pero cuya descarga de contenido sigue en curso conserva sus
+    resultados, con el contenido ya descargado, y se marca como "partial".
+    
+    Args:
+        query: Consulta de búsqueda.
+        libraries: Bibliotecas para buscar (deben estar en docs_urls).
+        num_results: Número de resultados a devolver por biblioteca.
+        with_content: Si es True, incluye el contenido de cada resultado.
+        timeout: Plazo común en segundos (por defecto MULTI_SEARCH_TIMEOUT).
+        stream_callback: Función de callback para streaming de resultados.
+        max_concurrency: Descargas de contenido simultáneas por biblioteca.
+        timings: Si es True, añade al resultado el bloque "timings" (ver timing.traced).
+        
+    Returns:
+        Dict: Resultados combinados y estado de cada biblioteca.
+        
+    Raises:
+        Exception: Si la lista de bibliotecas está vacía o contiene bibliotecas no soportadas.
+    """
+    # Eliminar duplicados conservando el orden
+    libraries = list(dict.fromkeys(libraries or []))
+    
+    error_msg = None
+    if not libraries:
+        error_msg = "Se requiere al menos una biblioteca."
+    elif len(libraries) > MULTI_SEARCH_MAX_LIBRARIES:
+        error_msg = f"Demasiadas bibliotecas: {len(libraries)}. El máximo es {MULTI_SEARCH_MAX_LIBRARIES}."
+    else:
+        unsupported = [library for library in libraries if library not in docs_urls]
+        if unsupported:
+            error_msg = f"Bibliotecas no soportadas: {', '.join(unsupported)}. Las bibliotecas soportadas son: {', '.join(docs_urls.keys())}"
+    
+    if error_msg:
+        if stream_callback:
+            await stream_callback(error_msg, error=True)
+        raise Exception(error_msg)
+    
+    timeout = MULTI_SEARCH_TIMEOUT if timeout is None else timeout
+    
+    def library_callback(library: str, errors_only: bool = False) -> Optional[Callable[..., Awaitable[None]]]:
+        """Etiqueta con la biblioteca los eventos de cada búsqueda."""
+        if not stream_callback:
+            return None
+        
+        async def callback(data: Any, error: bool = False) -> None:
+            if error:
+                await stream_callback(f"[{library}] {data}", error=True)
+                return
+            if errors_only:
+                return
+            for event in data.values():
+                event["library"] = library
+            await stream_callback(data)
+        
+        return callback
+    
+    # Resultados de las bibliotecas cuya búsqueda ya terminó; si el plazo vence
+    # durante la descarga de contenido, se devuelven sin el contenido pendiente
+    searched: Dict[str, List[Dict[str, Any]]] = {}
+    
+    async def search_library(library: str) -> Dict[str, Any]:
+        # Con contenido, el progreso se informa durante la descarga y no por resultado
+        result = await get_docs(
+            query,
+            library,
+            num_results,
+            False,
+            stream_callback=library_callback(library, errors_only=with_content)
+        )
+        searched[library] = result["results"]
+        if with_content:
+            with span("docs.results", with_content=True, library=library):
+                await _fetch_contents(
+                    result["results"],
+                    library_callback(library),
+                    max_concurrency or FETCH_CONCURRENCY
+                )
+        if stream_callback:
+            await stream_callback({
+                "library_results": {
+                    "library": library,
+                    "results": result["results"],
+                    "total": result["total"]
+                }
+            })
+        return result
+    
+    tasks = {library: asyncio.ensure_future(search_library(library)) for library in libraries}
+    try:
+        await asyncio.wait(tasks.values(), timeout=timeout)
+        # Una búsqueda cancelada desde el callback cancela toda la operación
+        if any(task.cancelled() for task in tasks.values()):
+            raise asyncio.CancelledError("Operación cancelada")
+    finally:
+        # Cancelar las búsquedas que no han terminado dentro del plazo
+        for task in tasks.values():
+            if not task.done():
+                task.cancel()
+    
+    results_by_library: Dict[str, List[Dict[str, Any]]] = {}
+    status: Dict[str, Dict[str, Any]] = {}
+    timed_out = []
+    for library, task in tasks.items():
+        if not task.done() or task.cancelled():
+            timed_out.append(library)
+            if library in searched:
+                # La búsqueda terminó pero la descarga de contenido no
+                results_by_library[library] = searched[library]
+                status[library] = {"status": "partial", "total": len(searched[library]), "content": "timeout"}
+            else:
+                status[library] = {"status": "timeout"}
+        elif task.exception() is not None:
+            status[library] = {"status": "error", "error": str(task.exception())}
+        else:
+            results_by_library[library] = task.result()["results"]
+            status[library] = {"status": "ok", "total": task.result()["total"]}
+    
+    if timed_out:
+        logger.warning(f"Plazo de {timeout}s agotado para: {', '.join(timed_out)}")
+    
+    merged = _merge_results(results_by_library)
+    return {
+        "results": merged,
+        "total": len(merged),
+        "libraries": status,
+        "partial": bool(timed_out) or len(results_by_library) < len(libraries),
+        "query": query
+    }
+
+
 # Exposición de herramientas para MCP
 async def mcp__get_docs(
     query: str,
     library: str,
     num_results: int = 5,
-    with_content: bool = False
+    with_content: bool = False,
+    mode: Optional[str] = None,
+    timings: bool = False
 ) -> Dict[str, Any]:
     """
     Herramienta MCP para buscar documentación para una consulta específica en una biblioteca.
@@ -534,18 +1794,22 @@ async def mcp__get_docs(
         library: Biblioteca para buscar (debe estar en docs_urls).
         num_results: Número de resultados a devolver.
         with_content: Si es True, incluye el contenido de cada resultado.
+        mode: "serper", "local" (solo índice local), "local_first" o "merged".
+        timings: Si es True, añade al resultado el tiempo de cada etapa en "timings".
         
     Returns:
         Dict: Resultados de la búsqueda.
     """
-    return await get_docs(query, library, num_results, with_content)
+    return await get_docs(query, library, num_results, with_content, mode=mode, timings=timings)
 
 
 async def mcp__get_docs_from_domain(
     query: str,
     domain: str,
     num_results: int = 5,
-    with_content: bool = False
+    with_content: bool = False,
+    mode: Optional[str] = None,
+    timings: bool = False
 ) -> Dict[str, Any]:
     """
     Herramienta MCP para buscar documentación para una consulta específica en un dominio personalizado.
@@ -555,17 +1819,43 @@ async def mcp__get_docs_from_domain(
         domain: Dominio específico para buscar.
         num_results: Número de resultados a devolver.
         with_content: Si es True, incluye el contenido de cada resultado.
+        mode: "serper", "local" (solo índice local), "local_first" o "merged".
+        timings: Si es True, añade al resultado el tiempo de cada etapa en "timings".
         
     Returns:
         Dict: Resultados de la búsqueda.
     """
-    return await get_docs_from_domain(query, domain, num_results, with_content)
+    return await get_docs_from_domain(query, domain, num_results, with_content, mode=mode, timings=timings)
+
+
+async def mcp__get_docs_multi(
+    query: str,
+    libraries: List[str],
+    num_results: int = 5,
+    with_content: bool = False,
+    timings: bool = False
+) -> Dict[str, Any]:
+    """
+    Herramienta MCP para buscar documentación en varias bibliotecas a la vez.
+    
+    Args:
+        query: Consulta de búsqueda.
+        libraries: Bibliotecas para buscar (deben estar en docs_urls).
+        num_results: Número de resultados a devolver por biblioteca.
+        with_content: Si es True, incluye el contenido de cada resultado.
+        timings: Si es True, añade al resultado el tiempo de cada etapa en "timings".
+        
+    Returns:
+        Dict: Resultados combinados y sin duplicados, y estado de cada biblioteca.
+    """
+    return await get_docs_multi(query, libraries, num_results, with_content, timings=timings)
 
 
 async def mcp__search_web(
     query: str,
     site: Optional[str] = None,
-    num_results: int = 10
+    num_results: int = 10,
+    timings: bool = False
 ) -> Dict[str, Any]:
     """
     Herramienta MCP para realizar una búsqueda en la web usando Google Serper API.
@@ -574,28 +1864,48 @@ async def mcp__search_web(
         query: Consulta de búsqueda.
         site: Dominio específico para buscar.
         num_results: Número de resultados a devolver.
+        timings: Si es True, añade al resultado el tiempo de cada etapa en "timings".
         
     Returns:
         Dict: Resultados de la búsqueda.
     """
-    return await search_web(query, site, num_results)
+    return await search_web(query, site, num_results, timings=timings)
+
+
+async def mcp__search_batch(
+    queries: List[Dict[str, Any]],
+    num_results: int = 10
+) -> Dict[str, Any]:
+    """
+    Herramienta MCP para realizar varias búsquedas en una sola llamada.
+    
+    Args:
+        queries: Consultas con las claves "query" y, opcionalmente, "site" y "num_results".
+        num_results: Número de resultados por defecto para cada consulta.
+        
+    Returns:
+        Dict: Resultados por consulta, en el mismo orden.
+    """
+    return await search_batch(queries, num_results)
 
 
 async def mcp__fetch_url(
     url: str,
-    timeout: int = 30
-) -> Dict[str, str]:
+    timeout: int = 30,
+    timings: bool = False
+) -> Dict[str, Any]:
     """
     Herramienta MCP para recuperar el contenido de una URL.
     
     Args:
         url: URL a recuperar.
         timeout: Tiempo máximo de espera en segundos.
+        timings: Si es True, añade al resultado el tiempo de cada etapa en "timings".
         
     Returns:
         Dict: Título y contenido de la página.
     """
-    return await fetch_url(url, timeout)
+    return await fetch_url(url, timeout, timings=timings)
 
 
 async def mcp__list_libraries() -> Dict[str, Any]:
@@ -641,6 +1951,11 @@ async def main():
     
     except Exception as e:
         print(f"Error: {str(e)}")
+    
+    finally:
+        await close_http_clients()
+        await close_extraction_pool()
+        await close_page_store()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Métricas en formato Prometheus para MCP-Serper.
+
+Las observaciones se hacen siempre desde el hilo del bucle de eventos, por lo que
+los contadores son atributos numéricos sin locks. Cada combinación de etiquetas
+tiene un objeto hijo que se crea la primera vez y se reutiliza: en el camino
+crítico solo hay una búsqueda en un diccionario (o ninguna si el hijo se guarda),
+un bisect sobre los límites del histograma y dos sumas. Los valores de las
+etiquetas se guardan tal cual (por ejemplo, el código HTTP como entero) y solo se
+convierten a texto al generar la exposición en /metrics.
+
+Los contadores que ya mantienen otros componentes (cachés, sesiones SSE, trabajos,
+lag del bucle) no se duplican: se leen de sus stats() con colectores que se
+ejecutan solo cuando se consulta /metrics.
+"""
+
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+# Límites por defecto de los histogramas de latencia, en segundos
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Familia de métricas generada por un colector: nombre, tipo, ayuda y muestras
+MetricFamily = Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]
+
+MetricT = TypeVar("MetricT", bound="_Metric")
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value: float = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # Un contador por límite más el de +Inf (no acumulados)
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class _Metric:
+    """Métrica con etiquetas; cada combinación de valores tiene su hijo."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[Any, ...], Any] = {}
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: Any) -> Any:
+        """
+        Devuelve el hijo de una combinación de valores de etiquetas.
+
+        Args:
+            *values: Valores en el orden de labelnames (no hace falta convertirlos a texto).
+
+        Returns:
+            Any: Hijo con inc() u observe().
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _samples(self) -> Iterable[Tuple[str, Dict[str, Any], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Contador monótono."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        """Incrementa el contador sin etiquetas."""
+        self.labels().inc(amount)
+
+    def _samples(self) -> Iterable[Tuple[str, Dict[str, Any], float]]:
+        for values, child in list(self._children.items()):
+            yield "_total", dict(zip(self.labelnames, values)), child.value
+
+
+class Histogram(_Metric):
+    """Histograma con límites fijos."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Registra una observación en el histograma sin etiquetas."""
+        self.labels().observe(value)
+
+    def _samples(self) -> Iterable[Tuple[str, Dict[str, Any], float]]:
+        for values, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, values))
+            counts = list(child.counts)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", dict(labels, le=_format_value(float(bound))), cumulative
+            yield "_sum", labels, child.sum
+            yield "_count", labels, cumulative
+
+
+class Registry:
+    """Métricas propias y colectores que se exponen en /metrics."""
+
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def register(self, metric: MetricT) -> MetricT:
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        """
+        Añade un colector que se ejecuta en cada consulta de /metrics.
+
+        Args:
+            collector: Devuelve familias (nombre, tipo, ayuda, [(etiquetas, valor)]).
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Genera la exposición en formato de texto de Prometheus (0.0.4).
+
+        Returns:
+            str: Texto de la exposición.
+        """
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Registro global del proceso
+registry = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    """Crea y registra un contador."""
+    return registry.register(Counter(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Sequence[str] = (),
+    buckets: Sequence[float] = DEFAULT_BUCKETS,
+) -> Histogram:
+    """Crea y registra un histograma."""
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def cache_families(caches: Dict[str, Any]) -> List[MetricFamily]:
+    """
+    Familias de aciertos, fallos y expulsiones por caché y nivel.
+
+    Args:
+        caches: Nombre lógico -> caché (LRUTTLCache, RedisCache o TieredCache).
+
+    Returns:
+        List: Familias de métricas para un colector.
+    """
+    counters = {
+        "hits": ("mcp_serper_cache_hits_total", "Aciertos de caché"),
+        "misses": ("mcp_serper_cache_misses_total", "Fallos de caché"),
+        "evictions": ("mcp_serper_cache_evictions_total", "Entradas expulsadas por capacidad"),
+        "expirations": ("mcp_serper_cache_expirations_total", "Entradas caducadas por TTL"),
+        "errors": ("mcp_serper_cache_errors_total", "Errores del backend de caché"),
+    }
+    samples: Dict[str, List[Tuple[Dict[str, Any], float]]] = {key: [] for key in counters}
+    entries: List[Tuple[Dict[str, Any], float]] = []
+    for cache_name, cache in caches.items():
+        stats = cache.stats()
+        tiers = [("memory", stats["l1"]), ("redis", stats["l2"])] if "l1" in stats else [
+            ("redis" if "available" in stats else "memory", stats)
+        ]
+        for tier, tier_stats in tiers:
+            labels = {"cache": cache_name, "tier": tier}
+            for key in counters:
+                if key in tier_stats:
+                    samples[key].append((labels, tier_stats[key]))
+            if "entries" in tier_stats:
+                entries.append((labels, tier_stats["entries"]))
+    families = [(name, "counter", doc, samples[key]) for key, (name, doc) in counters.items() if samples[key]]
+    families.append(("mcp_serper_cache_entries", "gauge", "Entradas en caché", entries))
+    return families
+
+
+def gauge_family(name: str, documentation: str, value: float, labels: Optional[Dict[str, Any]] = None) -> MetricFamily:
+    """Familia con una sola muestra de tipo gauge."""
+    return (name, "gauge", documentation, [(labels or {}, value)])
+
+
+# Latencia de las llamadas a Serper por tipo de solicitud y estado (código HTTP, timeout, error)
+SERPER_REQUEST_SECONDS = histogram(
+    "mcp_serper_serper_request_seconds",
+    "Duración de las solicitudes a la API de Serper",
+    ("endpoint", "status"),
+)
+# Espera en la cola del limitador de tasa de Serper por prioridad
+SERPER_QUEUE_SECONDS = histogram(
+    "mcp_serper_serper_queue_seconds",
+    "Espera en la cola del limitador de tasa antes de enviar la solicitud a Serper",
+    ("priority",),
+)
+
+# Descarga de páginas (hasta leer el cuerpo) por estado, y extracción por separado
+FETCH_DOWNLOAD_SECONDS = histogram(
+    "mcp_serper_fetch_download_seconds",
+    "Duración de la descarga de páginas en fetch_url",
+    ("status",),
+)
+FETCH_PARSE_SECONDS = histogram(
+    "mcp_serper_fetch_parse_seconds",
+    "Duración de la extracción de contenido (incluida la espera en el pool)",
+)
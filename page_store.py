@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Almacén persistente de páginas extraídas para MCP-Serper.
+
+Guarda en un fichero SQLite el texto extraído de cada página, comprimido con zlib
+y indexado por URL canónica, junto con la hora de descarga y las cabeceras ETag y
+Last-Modified. Así un reinicio no obliga a descargar y analizar de nuevo las mismas
+páginas de documentación.
+
+Las lecturas usan E/S mapeada en memoria de SQLite (PRAGMA mmap_size) y no escriben:
+la hora del último acceso se acumula en memoria y se vuelca cada
+PAGE_STORE_ACCESS_FLUSH segundos o antes de una recolección. Todas las operaciones se ejecutan en un único hilo dedicado para no bloquear el bucle de
+eventos. Como la caché de Redis, el almacén falla en abierto: un error de disco se
+registra y la página se descarga de la red.
+
+Uso desde la línea de comandos:
+
+    python page_store.py stats
+    python page_store.py gc --max-bytes 500000000 --vacuum
+"""
+
+import os
+import sys
+import time
+import zlib
+import sqlite3
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger("mcp-serper")
+
+T = TypeVar("T")
+
+# Ruta del fichero SQLite; si está vacía el almacén queda desactivado
+PAGE_STORE_PATH = os.environ.get("PAGE_STORE_PATH", "")
+# Tamaño máximo del almacén antes de retirar las páginas menos usadas
+PAGE_STORE_MAX_BYTES = int(os.environ.get("PAGE_STORE_MAX_BYTES", 1024 * 1024 * 1024))
+# Edad máxima en segundos de una página servida desde el almacén
+PAGE_STORE_TTL = float(os.environ.get("PAGE_STORE_TTL", 7 * 86400))
+# Bytes del fichero que SQLite puede mapear en memoria para las lecturas
+PAGE_STORE_MMAP_BYTES = int(os.environ.get("PAGE_STORE_MMAP_BYTES", 256 * 1024 * 1024))
+# Segundos entre volcados de las horas de acceso acumuladas en memoria
+PAGE_STORE_ACCESS_FLUSH = float(os.environ.get("PAGE_STORE_ACCESS_FLUSH", 60))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    final_url TEXT NOT NULL,
+    title TEXT,
+    body BLOB NOT NULL,
+    truncated INTEGER NOT NULL DEFAULT 0,
+    byte_cap INTEGER,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at);
+"""
+
+# Tras una recolección el almacén queda por debajo de esta fracción del límite
+_GC_LOW_WATERMARK = 0.9
+
+
+@dataclass
+class StoredPage:
+    """
+    Página leída del almacén.
+
+    Attributes:
+        page: Página en el formato de fetch_url ("title", "content", "url", "truncated").
+        fetched_at: Hora de descarga (segundos desde epoch).
+        etag: Cabecera ETag de la respuesta original.
+        last_modified: Cabecera Last-Modified de la respuesta original.
+        limit: Límite en bytes con el que se cortó la página, si se truncó.
+    """
+    page: Dict[str, Any]
+    fetched_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    limit: Optional[int] = None
+
+    @property
+    def age(self) -> float:
+        """Segundos transcurridos desde la descarga."""
+        return max(0.0, time.time() - self.fetched_at)
+
+
+class PageStore:
+    """
+    Almacén de páginas sobre SQLite con cuerpos comprimidos.
+
+    Cuando el tamaño total supera max_bytes se retiran las páginas leídas hace más
+    tiempo. La compactación del fichero (VACUUM) se hace bajo demanda con gc().
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = PAGE_STORE_MAX_BYTES,
+        mmap_bytes: int = PAGE_STORE_MMAP_BYTES,
+        compress_level: int = 6,
+        access_flush: float = PAGE_STORE_ACCESS_FLUSH,
+    ):
+        """
+        Args:
+            path: Ruta del fichero SQLite.
+            max_bytes: Tamaño máximo de las páginas almacenadas.
+            mmap_bytes: Bytes del fichero mapeados en memoria para lecturas.
+            compress_level: Nivel de compresión zlib (1-9).
+            access_flush: Segundos entre volcados de las horas de acceso.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.mmap_bytes = mmap_bytes
+        self.compress_level = compress_level
+        self.access_flush = access_flush
+        # URL -> hora del último acceso pendiente de escribir
+        self._accessed: Dict[str, float] = {}
+        self._flushed_at = time.monotonic()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Un solo hilo: la conexión nunca se comparte entre hilos
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-store")
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+
+    # Operaciones síncronas (hilo del almacén o línea de comandos)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            conn.executescript(_SCHEMA)
+            # Ficheros creados antes de la columna byte_cap: sus páginas truncadas se descargan de nuevo
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(pages)")}
+            if "byte_cap" not in columns:
+                conn.execute("ALTER TABLE pages ADD COLUMN byte_cap INTEGER")
+            self._bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get_sync(self, url: str) -> Optional[StoredPage]:
+        """Versión síncrona de get()."""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT final_url, title, body, truncated, byte_cap, etag, last_modified, fetched_at "
+            "FROM pages WHERE url = ?",
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+        final_url, title, body, truncated, byte_cap, etag, last_modified, fetched_at = row
+        self._accessed[url] = time.time()
+        if time.monotonic() - self._flushed_at >= self.access_flush:
+            self.flush_accessed_sync()
+        page = {
+            "title": title,
+            "content": zlib.decompress(body).decode("utf-8"),
+            "url": final_url,
+            "truncated": bool(truncated),
+        }
+        return StoredPage(page, fetched_at, etag, last_modified, byte_cap if truncated else None)
+
+    def flush_accessed_sync(self) -> int:
+        """
+        Escribe las horas de acceso acumuladas desde el último volcado.
+
+        Returns:
+            int: Número de páginas actualizadas.
+        """
+        pending, self._accessed = self._accessed, {}
+        self._flushed_at = time.monotonic()
+        if pending:
+            conn = self._connect()
+            conn.executemany(
+                "UPDATE pages SET accessed_at = ? WHERE url = ?",
+                [(accessed_at, url) for url, accessed_at in pending.items()],
+            )
+            conn.commit()
+        return len(pending)
+
+    def put_sync(
+        self,
+        url: str,
+        page: Dict[str, Any],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        fetched_at: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> None:
+        """Versión síncrona de put()."""
+        conn = self._connect()
+        body = zlib.compress((page.get("content") or "").encode("utf-8"), self.compress_level)
+        title = page.get("title")
+        final_url = page.get("url") or url
+        size = len(body) + len(url) + len(final_url) + len(title or "")
+        truncated = bool(page.get("truncated"))
+        now = time.time()
+
+        self._accessed.pop(url, None)
+        previous = conn.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+        conn.execute(
+            "INSERT OR REPLACE INTO pages "
+            "(url, final_url, title, body, truncated, byte_cap, etag, last_modified, fetched_at, accessed_at, size) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, final_url, title, body, int(truncated), limit if truncated else None, etag, last_modified,
+             fetched_at or now, now, size),
+        )
+        conn.commit()
+        self._bytes += size - (previous[0] if previous else 0)
+
+        if self._bytes > self.max_bytes:
+            self.gc_sync()
+
+    def touch_sync(self, url: str, fetched_at: Optional[float] = None) -> None:
+        """Versión síncrona de touch()."""
+        conn = self._connect()
+        now = time.time()
+        self._accessed.pop(url, None)
+        conn.execute(
+            "UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?",
+            (fetched_at or now, now, url),
+        )
+        conn.commit()
+
+    def delete_sync(self, url: str) -> None:
+        """Versión síncrona de delete()."""
+        conn = self._connect()
+        self._accessed.pop(url, None)
+        row = conn.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            conn.commit()
+            self._bytes -= row[0]
+
+    def gc_sync(self, max_bytes: Optional[int] = None, vacuum: bool = False) -> Dict[str, Any]:
+        """
+        Retira las páginas menos usadas hasta quedar por debajo del límite.
+
+        Args:
+            max_bytes: Límite de tamaño (por defecto el del almacén).
+            vacuum: Si es True, compacta el fichero para devolver el espacio al disco.
+
+        Returns:
+            Dict: Páginas retiradas y tamaño antes y después.
+        """
+        conn = self._connect()
+        # Retirar según las horas de acceso reales
+        self.flush_accessed_sync()
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        before = self._bytes
+        removed = []
+
+        if self._bytes > limit:
+            target = self._bytes - int(limit * _GC_LOW_WATERMARK)
+            freed = 0
+            for url, size in conn.execute("SELECT url, size FROM pages ORDER BY accessed_at"):
+                if freed >= target:
+                    break
+                removed.append((url,))
+                freed += size
+            conn.executemany("DELETE FROM pages WHERE url = ?", removed)
+            conn.commit()
+            self._bytes -= freed
+            self.evictions += len(removed)
+            logger.info(f"Almacén de páginas: {len(removed)} páginas retiradas ({freed // 1024}KB)")
+
+        if vacuum:
+            conn.execute("VACUUM")
+
+        return {
+            "removed": len(removed),
+            "bytes_before": before,
+            "bytes_after": self._bytes,
+            "file_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+    def count_sync(self) -> int:
+        return int(self._connect().execute("SELECT COUNT(*) FROM pages").fetchone()[0])
+
+    def close_sync(self) -> None:
+        if self._conn is not None:
+            self.flush_accessed_sync()
+            self._conn.close()
+            self._conn = None
+
+    # Interfaz asíncrona
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def get(self, url: str) -> Optional[StoredPage]:
+        """
+        Recupera una página del almacén.
+
+        Args:
+            url: URL canónica de la página.
+
+        Returns:
+            Optional[StoredPage]: Página y metadatos, o None si no existe o hay un error.
+        """
+        try:
+            stored = await self._run(self.get_sync, url)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Error al leer del almacén de páginas: {str(e)}")
+            return None
+        if stored is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return stored
+
+    async def put(
+        self,
+        url: str,
+        page: Dict[str, Any],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> None:
+        """
+        Guarda o sustituye una página en el almacén.
+
+        Args:
+            url: URL canónica de la página.
+            page: Página en el formato de fetch_url.
+            etag: Cabecera ETag de la respuesta.
+            last_modified: Cabecera Last-Modified de la respuesta.
+            limit: Límite en bytes con el que se cortó la página, si se truncó.
+        """
+        try:
+            await self._run(self.put_sync, url, page, etag, last_modified, None, limit)
+            self.writes += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Error al escribir en el almacén de páginas: {str(e)}")
+
+    async def touch(self, url: str, fetched_at: Optional[float] = None) -> None:
+        """
+        Actualiza la hora de descarga de una página sin reescribir su contenido.
+
+        Se usa cuando el servidor confirma con un 304 que la página no ha cambiado.
+
+        Args:
+            url: URL canónica de la página.
+            fetched_at: Nueva hora de descarga (por defecto, ahora).
+        """
+        try:
+            await self._run(self.touch_sync, url, fetched_at)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Error al actualizar el almacén de páginas: {str(e)}")
+
+    async def delete(self, url: str) -> None:
+        """Elimina una página del almacén."""
+        try:
+            await self._run(self.delete_sync, url)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Error al borrar del almacén de páginas: {str(e)}")
+
+    async def gc(self, max_bytes: Optional[int] = None, vacuum: bool = False) -> Dict[str, Any]:
+        """Versión asíncrona de gc_sync()."""
+        return await self._run(self.gc_sync, max_bytes, vacuum)
+
+    async def close(self) -> None:
+        """Cierra la conexión y el hilo del almacén."""
+        await self._run(self.close_sync)
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+
+# Almacén global del proceso (None si PAGE_STORE_PATH no está definido)
+_page_store: Optional[PageStore] = None
+
+
+def get_page_store() -> Optional[PageStore]:
+    """
+    Obtiene el almacén de páginas del proceso, creándolo si está configurado.
+
+    Returns:
+        Optional[PageStore]: Almacén, o None si PAGE_STORE_PATH está vacío.
+    """
+    global _page_store
+    if _page_store is None and PAGE_STORE_PATH:
+        _page_store = PageStore(PAGE_STORE_PATH)
+    return _page_store
+
+
+async def close_page_store() -> None:
+    """Cierra el almacén de páginas (apagado de la aplicación)."""
+    global _page_store
+    store, _page_store = _page_store, None
+    if store is not None:
+        await store.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=PAGE_STORE_PATH, help="Fichero SQLite (por defecto PAGE_STORE_PATH)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Mostrar el tamaño del almacén")
+    gc_parser = subparsers.add_parser("gc", help="Retirar páginas hasta el límite y compactar")
+    gc_parser.add_argument("--max-bytes", type=int, default=PAGE_STORE_MAX_BYTES)
+    gc_parser.add_argument("--vacuum", action="store_true", help="Compactar el fichero (VACUUM)")
+    args = parser.parse_args()
+
+    if not args.path:
+        print("Indique --path o defina PAGE_STORE_PATH.", file=sys.stderr)
+        return 1
+
+    store = PageStore(args.path)
+    try:
+        if args.command == "stats":
+            store._connect()
+            print(f"Páginas: {store.count_sync()}")
+            print(f"Tamaño: {store._bytes} bytes (fichero: {os.path.getsize(args.path)} bytes)")
+        else:
+            result = store.gc_sync(args.max_bytes, vacuum=args.vacuum)
+            print(f"Páginas retiradas: {result['removed']}")
+            print(f"Tamaño: {result['bytes_before']} -> {result['bytes_after']} bytes")
+            print(f"Fichero: {result['file_bytes']} bytes")
+    finally:
+        store.close_sync()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
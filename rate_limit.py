@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Limitador de tasa con prioridades para las solicitudes a Serper.
+
+Un token bucket de SERPER_RATE_LIMIT solicitudes por segundo (con ráfagas de hasta
+SERPER_RATE_BURST) reparte el cupo del plan de Serper. Cuando no quedan tokens, las
+solicitudes esperan en una cola con prioridad: primero las interactivas (llamadas a
+las herramientas MCP y búsquedas de los clientes SSE), después los lotes y por
+último el trabajo en segundo plano (refrescos de resultados caducados). Dentro de
+la misma prioridad, por orden de llegada.
+
+Una solicitud cuya espera estimada supera el tiempo que le queda al llamador se
+rechaza al momento en lugar de esperar para nada. Un 429 de Serper pausa el
+limitador durante el Retry-After indicado.
+
+La prioridad de la tarea actual se propaga con contextvars: las tareas creadas
+dentro de request_priority("background") heredan esa prioridad.
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import itertools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Solicitudes por segundo del plan de Serper (0 = sin límite)
+SERPER_RATE_LIMIT = float(os.environ.get("SERPER_RATE_LIMIT", 0))
+# Solicitudes que se pueden enviar seguidas tras un periodo de inactividad
+SERPER_RATE_BURST = float(os.environ.get("SERPER_RATE_BURST") or 0) or max(1.0, SERPER_RATE_LIMIT)
+# Solicitudes en espera como máximo
+SERPER_QUEUE_MAX = int(os.environ.get("SERPER_QUEUE_MAX", 1000))
+
+# Prioridades de menor a mayor valor (se atiende antes el menor)
+PRIORITIES = {"interactive": 0, "batch": 1, "background": 2}
+
+_priority: ContextVar[str] = ContextVar("mcp_serper_priority", default="interactive")
+
+
+def current_priority() -> str:
+    """Prioridad de la tarea actual."""
+    return _priority.get()
+
+
+@contextmanager
+def request_priority(name: str) -> Iterator[None]:
+    """
+    Asigna una prioridad a las solicitudes hechas dentro del bloque.
+
+    Args:
+        name: "interactive", "batch" o "background".
+    """
+    if name not in PRIORITIES:
+        raise ValueError(f"Prioridad no válida: {name}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class RateLimiter:
+    """
+    Token bucket con cola de espera por prioridad.
+
+    Pensado para un solo bucle de eventos: no usa locks.
+    """
+
+    def __init__(
+        self,
+        rate: float = SERPER_RATE_LIMIT,
+        burst: float = SERPER_RATE_BURST,
+        max_queue: int = SERPER_QUEUE_MAX,
+    ):
+        """
+        Args:
+            rate: Tokens por segundo (0 = sin límite, salvo pausas por 429).
+            burst: Capacidad del bucket.
+            max_queue: Solicitudes en espera como máximo.
+        """
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_queue = max_queue
+        self._tokens = self.burst
+        # Instante desde el que se acumulan tokens (en el futuro durante una pausa)
+        self._updated = time.monotonic()
+        self._waiters: List[Tuple[int, int, float, "asyncio.Future[None]"]] = []
+        self._queued_cost: Dict[int, float] = {level: 0.0 for level in PRIORITIES.values()}
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.granted = 0
+        self.queued = 0
+        self.rejected_deadline = 0
+        self.rejected_queue_full = 0
+        self.pauses = 0
+
+    @property
+    def limited(self) -> bool:
+        return self.rate > 0
+
+    def _refill(self, now: float) -> None:
+        if now <= self._updated:
+            return
+        if self.limited:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        else:
+            self._tokens = self.burst
+        self._updated = now
+
+    def _delay(self, needed: float, now: float) -> float:
+        """Segundos hasta disponer de needed tokens, sin contar nuevas llegadas."""
+        paused = max(0.0, self._updated - now)
+        missing = needed - self._tokens
+        if missing <= 0 or not self.limited:
+            return paused
+        return paused + missing / self.rate
+
+    def estimate_wait(self, cost: float = 1, priority: str = "interactive") -> float:
+        """
+        Espera estimada de una solicitud que llegara ahora.
+
+        Cuenta los tokens que necesitan las solicitudes en cola con la misma o mayor
+        prioridad, que se atenderán antes.
+
+        Returns:
+            float: Segundos de espera estimados.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        level = PRIORITIES[priority]
+        ahead = sum(queued for other, queued in self._queued_cost.items() if other <= level)
+        return self._delay(ahead + min(cost, self.burst), now)
+
+    async def acquire(self, cost: float = 1, priority: str = "interactive", timeout: Optional[float] = None) -> float:
+        """
+        Espera hasta poder enviar una solicitud.
+
+        Args:
+            cost: Tokens que consume (por ejemplo, consultas de un lote).
+            priority: "interactive", "batch" o "background".
+            timeout: Segundos que le quedan al llamador; si la espera estimada es
+                mayor, la solicitud se rechaza sin esperar.
+
+        Returns:
+            float: Segundos de espera en la cola.
+
+        Raises:
+            Exception: Si la espera estimada supera timeout o la cola está llena.
+        """
+        level = PRIORITIES[priority]
+        now = time.monotonic()
+        self._refill(now)
+        # Un coste mayor que el bucket se atiende con el bucket lleno (deja tokens negativos)
+        needed = min(cost, self.burst)
+
+        if not self._waiters and now >= self._updated and (not self.limited or self._tokens >= needed):
+            if self.limited:
+                self._tokens -= cost
+            self.granted += 1
+            return 0.0
+
+        estimate = self.estimate_wait(cost, priority)
+        if timeout is not None and estimate > timeout:
+            self.rejected_deadline += 1
+            raise Exception(
+                f"Límite de solicitudes a Serper: espera estimada de {estimate:.1f}s "
+                f"superior al tiempo disponible ({max(0.0, timeout):.1f}s)"
+            )
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise Exception(f"Límite de solicitudes a Serper: cola llena ({self.max_queue} solicitudes en espera)")
+
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        entry = (level, next(self._seq), cost, future)
+        heapq.heappush(self._waiters, entry)
+        self._queued_cost[level] += cost
+        self.queued += 1
+        self._schedule(0)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                # Cancelada mientras esperaba: deja de contar para la cola y las estimaciones
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                self._queued_cost[level] -= cost
+                if self._waiters:
+                    self._schedule(0)
+            elif self.limited:
+                # El token ya se había concedido: devolverlo
+                self._tokens += cost
+                self._schedule(0)
+            raise
+        return time.monotonic() - now
+
+    def _schedule(self, delay: float) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def _dispatch(self) -> None:
+        """Concede tokens a las solicitudes en cola por orden de prioridad."""
+        self._timer = None
+        now = time.monotonic()
+        self._refill(now)
+        while self._waiters:
+            level, _, cost, future = self._waiters[0]
+            if future.done():
+                # Cancelada y aún sin retirar (su tarea la retira al despertar)
+                heapq.heappop(self._waiters)
+                continue
+            delay = self._delay(min(cost, self.burst), now)
+            if delay > 0:
+                self._schedule(delay)
+                return
+            heapq.heappop(self._waiters)
+            self._queued_cost[level] -= cost
+            if self.limited:
+                self._tokens -= cost
+            self.granted += 1
+            future.set_result(None)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Deja de conceder tokens durante unos segundos (por ejemplo, tras un 429).
+
+        Args:
+            seconds: Duración de la pausa.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens = min(self._tokens, 0.0)
+        self._updated = max(self._updated, now + seconds)
+        self.pauses += 1
+        if self._waiters:
+            self._schedule(self._delay(min(self._waiters[0][2], self.burst), now))
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        self._refill(now)
+        depth = {name: 0 for name in PRIORITIES}
+        names = {level: name for name, level in PRIORITIES.items()}
+        for level, _, _, future in self._waiters:
+            if not future.done():
+                depth[names[level]] += 1
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tokens": round(self._tokens, 2),
+            "paused_for": round(max(0.0, self._updated - now), 2),
+            "queue_depth": depth,
+            "granted": self.granted,
+            "queued": self.queued,
+            "rejected_deadline": self.rejected_deadline,
+            "rejected_queue_full": self.rejected_queue_full,
+            "pauses": self.pauses,
+        }
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Resiliencia de las descargas de páginas para MCP-Serper.
+
+Cada host tiene un circuit breaker: tras FETCH_BREAKER_THRESHOLD fallos seguidos
+(errores de red, timeouts o respuestas 429/5xx) el circuito se abre y las
+solicitudes a ese host fallan al momento durante FETCH_BREAKER_COOLDOWN segundos.
+Pasado ese tiempo se deja pasar una única solicitud de prueba: si responde, el
+circuito se cierra; si falla, vuelve a abrirse.
+
+Los fallos se reintentan hasta FETCH_RETRIES veces con backoff exponencial y jitter
+completo, siempre dentro del tiempo total de la llamada. Solo debe usarse con
+solicitudes idempotentes (GET).
+
+Con FETCH_HEDGE activado, si la primera solicitud no ha respondido cuando se
+alcanza el p95 de latencia del host, se lanza una segunda idéntica y se usa la
+primera respuesta válida; la otra se cancela.
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Type, TypeVar
+
+logger = logging.getLogger("mcp-serper")
+
+# Reintentos tras un fallo (0 = un solo intento)
+FETCH_RETRIES = int(os.environ.get("FETCH_RETRIES", 2))
+# Espera base y máxima en segundos entre reintentos
+FETCH_RETRY_BACKOFF = float(os.environ.get("FETCH_RETRY_BACKOFF", 0.2))
+FETCH_RETRY_BACKOFF_MAX = float(os.environ.get("FETCH_RETRY_BACKOFF_MAX", 2.0))
+# Fallos seguidos que abren el circuito de un host (0 = sin circuit breaker)
+FETCH_BREAKER_THRESHOLD = int(os.environ.get("FETCH_BREAKER_THRESHOLD", 5))
+# Segundos con el circuito abierto antes de la solicitud de prueba
+FETCH_BREAKER_COOLDOWN = float(os.environ.get("FETCH_BREAKER_COOLDOWN", 30))
+# Solicitudes de cobertura (hedging) tras el p95 de latencia del host
+FETCH_HEDGE = os.environ.get("FETCH_HEDGE", "false").lower() in ("1", "true", "yes", "on")
+# Espera mínima antes de la solicitud de cobertura
+FETCH_HEDGE_MIN_DELAY = float(os.environ.get("FETCH_HEDGE_MIN_DELAY", 0.05))
+# Espera antes de la solicitud de cobertura cuando aún no hay latencias suficientes
+FETCH_HEDGE_DEFAULT_DELAY = float(os.environ.get("FETCH_HEDGE_DEFAULT_DELAY", 1.0))
+# Hosts cuyo estado se conserva en memoria como máximo
+FETCH_HEALTH_MAX_HOSTS = int(os.environ.get("FETCH_HEALTH_MAX_HOSTS", 1000))
+
+# Respuestas que cuentan como fallo del host y se reintentan
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+# Latencias necesarias para calcular un p95 útil
+_MIN_SAMPLES = 10
+
+T = TypeVar("T")
+
+
+def _p95(samples: Deque[float]) -> Optional[float]:
+    if len(samples) < _MIN_SAMPLES:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class HostHealth:
+    """
+    Estado de un host: circuito, fallos seguidos y latencias recientes.
+
+    Attributes:
+        state: "closed", "open" o "half_open".
+        failures: Fallos seguidos desde la última respuesta válida.
+        opened_at: Instante (monotonic) en que se abrió el circuito.
+        probing: Si hay una solicitud de prueba en curso (estado half_open).
+        latencies: Duración de las últimas respuestas válidas en segundos.
+    """
+
+    __slots__ = ("state", "failures", "opened_at", "probing", "latencies")
+
+    def __init__(self, window: int):
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.latencies: Deque[float] = deque(maxlen=window)
+
+
+class HostResilience:
+    """
+    Circuit breaker, reintentos y hedging por host.
+
+    Pensado para un solo bucle de eventos: no usa locks.
+    """
+
+    def __init__(
+        self,
+        retries: int = FETCH_RETRIES,
+        backoff: float = FETCH_RETRY_BACKOFF,
+        backoff_max: float = FETCH_RETRY_BACKOFF_MAX,
+        threshold: int = FETCH_BREAKER_THRESHOLD,
+        cooldown: float = FETCH_BREAKER_COOLDOWN,
+        hedge: bool = FETCH_HEDGE,
+        max_hosts: int = FETCH_HEALTH_MAX_HOSTS,
+        window: int = 100,
+    ):
+        """
+        Args:
+            retries: Reintentos tras un fallo.
+            backoff: Espera base en segundos entre reintentos.
+            backoff_max: Espera máxima en segundos entre reintentos.
+            threshold: Fallos seguidos que abren el circuito (0 = nunca se abre).
+            cooldown: Segundos con el circuito abierto antes de la solicitud de prueba.
+            hedge: Si es True, lanza solicitudes de cobertura tras el p95 del host.
+            max_hosts: Hosts cuyo estado se conserva como máximo.
+            window: Latencias recientes por host usadas para el p95.
+        """
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.hedge = hedge
+        self.max_hosts = max_hosts
+        self.window = window
+        self._hosts: "OrderedDict[str, HostHealth]" = OrderedDict()
+        # Latencias de todos los hosts, para los que aún no tienen muestras suficientes
+        self._latencies: Deque[float] = deque(maxlen=window * 5)
+        self.attempts = 0
+        self.retried = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.short_circuited = 0
+        self.circuits_opened = 0
+
+    def _host(self, host: str) -> HostHealth:
+        health = self._hosts.get(host)
+        if health is None:
+            health = self._hosts[host] = HostHealth(self.window)
+            while len(self._hosts) > self.max_hosts:
+                self._hosts.popitem(last=False)
+        else:
+            self._hosts.move_to_end(host)
+        return health
+
+    def check(self, host: str) -> None:
+        """
+        Comprueba si se puede enviar una solicitud al host.
+
+        Raises:
+            Exception: Si el circuito del host está abierto o ya hay una solicitud de prueba en curso.
+        """
+        health = self._host(host)
+        if health.state == "closed":
+            return
+        if health.state == "open":
+            remaining = health.opened_at + self.cooldown - time.monotonic()
+            if remaining <= 0:
+                # Pasado el enfriamiento, esta solicitud sirve de prueba
+                health.state = "half_open"
+                health.probing = True
+                return
+        else:
+            remaining = 0.0
+            if not health.probing:
+                health.probing = True
+                return
+        self.short_circuited += 1
+        raise Exception(
+            f"Circuito abierto para {host} tras {health.failures} fallos seguidos"
+            + (f"; se reintentará en {remaining:.1f}s" if remaining > 0 else "")
+        )
+
+    def record(self, host: str, ok: bool, latency: Optional[float] = None) -> None:
+        """
+        Registra el resultado de una solicitud al host.
+
+        Args:
+            host: Host de la solicitud.
+            ok: Si el host respondió correctamente.
+            latency: Duración de la solicitud en segundos (solo si ok).
+        """
+        health = self._host(host)
+        if ok:
+            if health.state != "closed":
+                logger.info(f"Circuito cerrado para {host}")
+            health.state = "closed"
+            health.failures = 0
+            health.probing = False
+            if latency is not None:
+                health.latencies.append(latency)
+                self._latencies.append(latency)
+            return
+        health.failures += 1
+        if self.threshold <= 0:
+            return
+        if health.state == "half_open" or (health.state == "closed" and health.failures >= self.threshold):
+            if health.state == "closed":
+                logger.warning(f"Circuito abierto para {host} tras {health.failures} fallos seguidos")
+            health.state = "open"
+            health.opened_at = time.monotonic()
+            health.probing = False
+            self.circuits_opened += 1
+
+    def hedge_delay(self, host: str) -> Optional[float]:
+        """
+        Espera antes de la solicitud de cobertura para el host.
+
+        Returns:
+            Optional[float]: p95 de latencia del host (o de todos los hosts si el
+            host tiene pocas muestras), o None si el hedging está desactivado o el
+            host no está sano.
+        """
+        if not self.hedge:
+            return None
+        health = self._host(host)
+        if health.state != "closed":
+            return None
+        delay = _p95(health.latencies) or _p95(self._latencies) or FETCH_HEDGE_DEFAULT_DELAY
+        return max(FETCH_HEDGE_MIN_DELAY, delay)
+
+    def backoff_delay(self, retry: int) -> float:
+        """Espera antes del reintento número retry (desde 0), con jitter completo."""
+        return random.uniform(0, min(self.backoff_max, self.backoff * (2 ** retry)))
+
+    async def call(
+        self,
+        host: str,
+        attempt: Callable[[float], Awaitable[T]],
+        timeout: float,
+        is_failure: Callable[[T], bool],
+        retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+    ) -> T:
+        """
+        Ejecuta una solicitud idempotente con circuit breaker, reintentos y hedging.
+
+        Args:
+            host: Host de la solicitud.
+            attempt: Función que lanza un intento con el tiempo restante en segundos.
+            timeout: Tiempo máximo total en segundos, incluidos reintentos y esperas.
+            is_failure: Indica si un resultado cuenta como fallo del host.
+            retry_on: Excepciones que cuentan como fallo del host y se reintentan;
+                el resto se propaga sin reintentar.
+
+        Returns:
+            T: Primer resultado válido, o el del último intento si todos fallan.
+
+        Raises:
+            Exception: Si el circuito está abierto, o la excepción del último intento.
+        """
+        deadline = time.monotonic() + timeout
+        retry = 0
+        while True:
+            self.check(host)
+            error: Optional[BaseException] = None
+            try:
+                result = await self._hedged(host, attempt, deadline, is_failure, retry_on)
+                if not is_failure(result):
+                    return result
+            except retry_on as e:
+                error = e
+            delay = self.backoff_delay(retry)
+            # Sin reintentos si el fallo ha abierto el circuito: se devuelve el error real
+            opened = self._host(host).state != "closed"
+            if retry >= self.retries or opened or time.monotonic() + delay >= deadline:
+                if error is not None:
+                    raise error
+                return result
+            retry += 1
+            self.retried += 1
+            await asyncio.sleep(delay)
+
+    async def _timed(
+        self,
+        host: str,
+        attempt: Callable[[float], Awaitable[T]],
+        deadline: float,
+        is_failure: Callable[[T], bool],
+        retry_on: Tuple[Type[BaseException], ...],
+    ) -> T:
+        """Un intento, registrado en el estado del host."""
+        self.attempts += 1
+        start = time.monotonic()
+        try:
+            result = await attempt(max(0.001, deadline - start))
+        except retry_on:
+            self.record(host, False)
+            raise
+        except BaseException:
+            # Una prueba cancelada o con un error ajeno al host no dice nada de él:
+            # la siguiente solicitud prueba de nuevo
+            self._host(host).probing = False
+            raise
+        ok = not is_failure(result)
+        self.record(host, ok, time.monotonic() - start if ok else None)
+        return result
+
+    async def _hedged(
+        self,
+        host: str,
+        attempt: Callable[[float], Awaitable[T]],
+        deadline: float,
+        is_failure: Callable[[T], bool],
+        retry_on: Tuple[Type[BaseException], ...],
+    ) -> T:
+        """Un intento y, si tarda más que el p95 del host, otro en paralelo."""
+        delay = self.hedge_delay(host)
+        if delay is None or delay >= deadline - time.monotonic():
+            return await self._timed(host, attempt, deadline, is_failure, retry_on)
+
+        first = asyncio.ensure_future(self._timed(host, attempt, deadline, is_failure, retry_on))
+        tasks: List["asyncio.Future[T]"] = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedged += 1
+                tasks.append(asyncio.ensure_future(self._timed(host, attempt, deadline, is_failure, retry_on)))
+            pending = set(tasks)
+            last: "asyncio.Future[T]" = first
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    last = task
+                    if task.exception() is None and not is_failure(task.result()):
+                        if task is not first:
+                            self.hedge_wins += 1
+                        return task.result()
+            # Ninguna respuesta válida: el resultado o la excepción del último en terminar
+            return last.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        unhealthy = {
+            host: {
+                "state": health.state,
+                "failures": health.failures,
+                "retry_in": round(max(0.0, health.opened_at + self.cooldown - now), 1) if health.state == "open" else 0.0,
+            }
+            for host, health in self._hosts.items()
+            if health.state != "closed"
+        }
+        p95 = _p95(self._latencies)
+        return {
+            "hosts": len(self._hosts),
+            "open_circuits": sum(1 for info in unhealthy.values() if info["state"] == "open"),
+            "unhealthy": unhealthy,
+            "attempts": self.attempts,
+            "retries": self.retried,
+            "hedges": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "short_circuited": self.short_circuited,
+            "circuits_opened": self.circuits_opened,
+            "hedging": self.hedge,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
@@ -8,15 +8,16 @@ Este módulo expone las herramientas MCP-Serper a través de una API web.
 
 import os
 import json
+import time
 import uuid
 import asyncio
 import logging
-from typing import Dict, List, Any, Optional, Set, Callable, Awaitable
+from typing import Dict, List, Any, Optional, Callable, Awaitable
 
 import uvicorn
 from starlette.applications import Starlette
 from starlette.routing import Route, Mount
-from starlette.responses import JSONResponse, Response
+from starlette.responses import JSONResponse, Response, StreamingResponse
 from starlette.staticfiles import StaticFiles
 from starlette.middleware import Middleware
 from starlette.middleware.cors import CORSMiddleware
@@ -25,10 +26,34 @@ from starlette.middleware.cors import CORSMiddleware
 from mcp_serper import (
     get_docs,
     get_docs_from_domain,
+    get_docs_multi,
     search_web,
+    search_batch,
     fetch_url,
-    docs_urls
+    docs_urls,
+    SEARCH_BATCH_MAX_QUERIES,
+    MULTI_SEARCH_MAX_LIBRARIES,
+    DOCS_SEARCH_MODES,
+    results_cache,
+    page_cache,
+    search_flights,
+    page_flights,
+    docs_index,
+    page_revalidation_stats,
+    search_staleness_stats,
+    serper_limiter,
+    fetch_resilience
 )
+from cache import close_redis_client
+from extraction import get_extraction_pool, close_extraction_pool
+from http_clients import start_http_clients, close_http_clients
+from page_store import get_page_store, close_page_store
+from sse_sessions import SSE_HEARTBEAT_INTERVAL, SSE_SESSION_TTL, SessionRegistry, parse_last_event_id
+from event_bus import build_event_bus
+from jobs import Job, JobManager
+from metrics import registry, cache_families, gauge_family, MetricFamily
+from loop_monitor import loop_lag_monitor, start_loop_monitor, stop_loop_monitor
+from timing import span, timing_stats
 
 # Configuración de logging
 logging.basicConfig(
@@ -40,33 +65,98 @@ logger = logging.getLogger("mcp-serper-server")
 # Permitir nuevas conexiones SSE
 allow_new_sse_clients = True
 
-# Clientes SSE activos
-sse_clients: Set[str] = set()
+# Sesiones SSE (cola acotada y búfer de reanudación por cliente)
+sse_sessions = SessionRegistry()
 
-# Cola de mensajes para clientes SSE
-message_queues: Dict[str, asyncio.Queue] = {}
-
-# Mapa de IDs de cancelación
-cancellation_tokens: Dict[str, bool] = {}
+# Bus de eventos entre workers (EVENT_BUS)
+event_bus = build_event_bus(SSE_SESSION_TTL)
 
 
 async def send_sse_message(client_id: str, data: Any) -> None:
     """
     Envía un mensaje al cliente SSE.
     
+    Si la sesión no está en este worker, el evento se publica en el bus para el
+    worker que la tenga.
+    
     Args:
         client_id: ID del cliente SSE.
         data: Datos a enviar (serán convertidos a JSON).
     """
-    if client_id in message_queues:
-        message = f"data: {json.dumps(data)}\n\n"
-        await message_queues[client_id].put(message)
+    session = sse_sessions.get(client_id)
+    if session is not None:
+        await session.send(data)
+    else:
+        await event_bus.publish_event(client_id, data)
+
+
+async def client_idle(client_id: str) -> float:
+    """
+    Segundos que lleva desconectada una sesión SSE, local o de otro worker.
+    
+    Una sesión desconectada en este worker puede estar conectada en otro que la
+    adoptó, así que en ese caso también se consulta el bus.
+    """
+    idle = sse_sessions.idle_for(client_id)
+    if idle > 0:
+        idle = min(idle, await event_bus.session_idle(client_id))
+    return idle
+
+
+async def share_job(job: Job) -> None:
+    """Guarda un trabajo terminado en el bus para consultarlo desde otros workers."""
+    await event_bus.store_job(job.to_dict(), jobs.result_ttl)
+
+
+# Trabajos en segundo plano ligados a sesiones SSE
+jobs = JobManager(send_sse_message, client_idle, on_finish=share_job)
+
+
+async def register_session(client_id: str) -> None:
+    """Anuncia en el bus una sesión local con su estado de conexión."""
+    idle = sse_sessions.idle_for(client_id)
+    if idle == float("inf"):
+        # La sesión se liberó o caducó mientras tanto
+        return
+    await event_bus.register_session(client_id, None if idle == 0 else time.time() - idle)
+
+
+async def resolve_client(data: Dict[str, Any]) -> Optional[JSONResponse]:
+    """
+    Comprueba que la solicitud indica una sesión SSE existente en "client_id".
+    
+    Args:
+        data: Cuerpo JSON de la solicitud.
+        
+    Returns:
+        Optional[JSONResponse]: Respuesta de error, o None si la sesión es válida.
+    """
+    client_id = data.get("client_id")
+    if not client_id:
+        return JSONResponse({"error": "Se requiere el parámetro 'client_id' (ID de la sesión SSE)"}, status_code=400)
+    if client_id not in sse_sessions and await event_bus.session_idle(client_id) == float("inf"):
+        return JSONResponse({"error": f"Sesión SSE no encontrada: {client_id}"}, status_code=404)
+    return None
+
+
+def job_response(client_id: str, job: Job, deduplicated: bool) -> JSONResponse:
+    """Respuesta de un endpoint de streaming con el trabajo lanzado o reutilizado."""
+    return JSONResponse({
+        "status": "Procesando",
+        "client_id": client_id,
+        "job_id": job.id,
+        "deduplicated": deduplicated
+    })
 
 
 async def sse_endpoint(request):
     """
     Endpoint para SSE que establece la conexión y transmite eventos al cliente.
     
+    Cada evento lleva un ID "<client_id>:<secuencia>". Al reconectarse, el navegador
+    envía la cabecera Last-Event-ID (o el parámetro last_event_id) y la sesión se
+    reanuda reenviando los eventos pendientes que siguen en el búfer.
+    
     Args:
         request: Solicitud HTTP.
         
@@ -79,55 +169,66 @@ async def sse_endpoint(request):
             status_code=503
         )
     
-    client_id = str(uuid.uuid4())
-    sse_clients.add(client_id)
+    sse_sessions.expire()
     
-    # Crear cola de mensajes para este cliente
-    queue = asyncio.Queue()
-    message_queues[client_id] = queue
-    
-    # Crear token de cancelación
-    cancellation_tokens[client_id] = False
+    # Reanudar la sesión indicada por Last-Event-ID, si sigue existiendo
+    last_event = parse_last_event_id(
+        request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    )
+    session = sse_sessions.get(last_event[0]) if last_event else None
+    resumed = session is not None
+    adopted = False
+    if session is None and last_event and await event_bus.session_idle(last_event[0]) != float("inf"):
+        # Sesión de otro worker: se adopta el mismo ID para que sus eventos lleguen
+        # aquí; los eventos de su búfer no se pueden reenviar
+        session = sse_sessions.create(last_event[0])
+        adopted = True
+    if session is None:
+        session = sse_sessions.create(str(uuid.uuid4()))
+    client_id = session.client_id
+    queue, replay = session.attach(last_event[1] if resumed else None)
+    if adopted:
+        await event_bus.adopt_session(client_id)
+    else:
+        await register_session(client_id)
     
-    logger.info(f"Nuevo cliente SSE conectado: {client_id}")
+    if resumed:
+        logger.info(f"Cliente SSE reconectado: {client_id} ({len(replay)} eventos reenviados)")
+    else:
+        logger.info(f"Nuevo cliente SSE conectado: {client_id}")
     
     async def event_generator():
         try:
             # Mensaje inicial de conexión
-            yield f"data: {json.dumps({'type': 'info', 'message': 'Conexión establecida'})}\n\n"
+            yield f"data: {json.dumps({'type': 'info', 'message': 'Conexión establecida', 'client_id': client_id, 'resumed': resumed})}\n\n"
+            
+            for message in replay:
+                yield message
             
             while True:
-                if client_id not in sse_clients:
-                    break
-                
-                if cancellation_tokens.get(client_id, False):
-                    logger.info(f"Operación cancelada para cliente: {client_id}")
-                    yield f"data: {json.dumps({'type': 'info', 'message': 'Operación cancelada'})}\n\n"
-                    break
-                
                 try:
-                    message = await asyncio.wait_for(queue.get(), timeout=30.0)
-                    yield message
+                    message = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_INTERVAL)
                 except asyncio.TimeoutError:
                     # Mantener la conexión con un latido
                     yield f"data: {json.dumps({'type': 'heartbeat'})}\n\n"
                     continue
+                
+                # Cola cerrada: cliente desbordado o sustituido por una reconexión
+                if message is None:
+                    break
+                yield message
         except asyncio.CancelledError:
             logger.info(f"Conexión SSE cancelada para cliente: {client_id}")
         except Exception as e:
             logger.error(f"Error en SSE para cliente {client_id}: {str(e)}")
             yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
         finally:
-            # Limpiar recursos
-            if client_id in sse_clients:
-                sse_clients.remove(client_id)
-            if client_id in message_queues:
-                del message_queues[client_id]
-            if client_id in cancellation_tokens:
-                del cancellation_tokens[client_id]
+            # La sesión se conserva SSE_SESSION_TTL segundos para poder reanudarla
+            session.detach(queue)
+            await register_session(client_id)
             logger.info(f"Cliente SSE desconectado: {client_id}")
     
-    return Response(
+    return StreamingResponse(
         event_generator(),
         media_type="text/event-stream",
         headers={
@@ -159,16 +260,26 @@ async def get_docs_stream_endpoint(request):
             return JSONResponse({"error": "Se requiere el parámetro 'library'"}, status_code=400)
         if library not in docs_urls:
             return JSONResponse({"error": f"Biblioteca no soportada: {library}"}, status_code=400)
+        mode = data.get("mode")
+        if mode is not None and mode not in DOCS_SEARCH_MODES:
+            return JSONResponse({"error": f"Modo no válido: {mode}. Modos: {', '.join(DOCS_SEARCH_MODES)}"}, status_code=400)
         
-        # Generar ID de cliente para rastrear la solicitud
-        client_id = next(iter(request.scope.get("headers", [])), [b"", b""])[1].decode("utf-8")
-        if not client_id:
-            client_id = str(uuid.uuid4())
+        timings = bool(data.get("timings", False))
+        
+        error = await resolve_client(data)
+        if error is not None:
+            return error
+        client_id = data["client_id"]
         
-        # Iniciar tarea en segundo plano
-        asyncio.create_task(process_docs_request(client_id, query, library))
+        # Iniciar el trabajo en segundo plano (o unirse a uno idéntico en curso)
+        job, deduplicated = await jobs.submit(
+            client_id,
+            "get_docs",
+            {"query": query, "library": library, "mode": mode, "timings": timings},
+            lambda job: process_docs_request(job, query, library, mode, timings)
+        )
         
-        return JSONResponse({"status": "Procesando", "client_id": client_id})
+        return job_response(client_id, job, deduplicated)
     
     except Exception as e:
         logger.error(f"Error en get_docs_stream_endpoint: {str(e)}")
@@ -194,25 +305,115 @@ async def get_docs_from_domain_stream_endpoint(request):
             return JSONResponse({"error": "Se requiere el parámetro 'query'"}, status_code=400)
         if not domain:
             return JSONResponse({"error": "Se requiere el parámetro 'domain'"}, status_code=400)
+        mode = data.get("mode")
+        if mode is not None and mode not in DOCS_SEARCH_MODES:
+            return JSONResponse({"error": f"Modo no válido: {mode}. Modos: {', '.join(DOCS_SEARCH_MODES)}"}, status_code=400)
         
-        # Generar ID de cliente para rastrear la solicitud
-        client_id = next(iter(request.scope.get("headers", [])), [b"", b""])[1].decode("utf-8")
-        if not client_id:
-            client_id = str(uuid.uuid4())
+        timings = bool(data.get("timings", False))
+        
+        error = await resolve_client(data)
+        if error is not None:
+            return error
+        client_id = data["client_id"]
         
-        # Iniciar tarea en segundo plano
-        asyncio.create_task(process_domain_docs_request(client_id, query, domain))
+        # Iniciar el trabajo en segundo plano (o unirse a uno idéntico en curso)
+        job, deduplicated = await jobs.submit(
+            client_id,
+            "get_docs_from_domain",
+            {"query": query, "domain": domain, "mode": mode, "timings": timings},
+            lambda job: process_domain_docs_request(job, query, domain, mode, timings)
+        )
         
-        return JSONResponse({"status": "Procesando", "client_id": client_id})
+        return job_response(client_id, job, deduplicated)
     
     except Exception as e:
         logger.error(f"Error en get_docs_from_domain_stream_endpoint: {str(e)}")
         return JSONResponse({"error": str(e)}, status_code=500)
 
 
+async def get_docs_multi_stream_endpoint(request):
+    """
+    Endpoint para buscar documentación en varias bibliotecas a la vez con streaming.
+    
+    Args:
+        request: Solicitud HTTP.
+        
+    Returns:
+        JSONResponse: Respuesta JSON con estado de la solicitud.
+    """
+    try:
+        data = await request.json()
+        query = data.get("query")
+        libraries = data.get("libraries")
+        
+        if not query:
+            return JSONResponse({"error": "Se requiere el parámetro 'query'"}, status_code=400)
+        if not libraries or not isinstance(libraries, list):
+            return JSONResponse({"error": "Se requiere el parámetro 'libraries' (lista de bibliotecas)"}, status_code=400)
+        if len(libraries) > MULTI_SEARCH_MAX_LIBRARIES:
+            return JSONResponse({"error": f"Máximo {MULTI_SEARCH_MAX_LIBRARIES} bibliotecas por búsqueda"}, status_code=400)
+        unsupported = [library for library in libraries if library not in docs_urls]
+        if unsupported:
+            return JSONResponse({"error": f"Bibliotecas no soportadas: {', '.join(unsupported)}"}, status_code=400)
+        
+        error = await resolve_client(data)
+        if error is not None:
+            return error
+        client_id = data["client_id"]
+        
+        # Iniciar el trabajo en segundo plano (o unirse a uno idéntico en curso)
+        job, deduplicated = await jobs.submit(
+            client_id,
+            "get_docs_multi",
+            {"query": query, "libraries": libraries},
+            lambda job: process_multi_docs_request(job, query, libraries)
+        )
+        
+        return job_response(client_id, job, deduplicated)
+    
+    except Exception as e:
+        logger.error(f"Error en get_docs_multi_stream_endpoint: {str(e)}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+async def search_batch_endpoint(request):
+    """
+    Endpoint para realizar varias búsquedas en una sola llamada.
+    
+    Args:
+        request: Solicitud HTTP.
+        
+    Returns:
+        JSONResponse: Respuesta JSON con los resultados de cada consulta.
+    """
+    try:
+        data = await request.json()
+        queries = data.get("queries")
+        num_results = data.get("num_results", 10)
+        
+        if not queries or not isinstance(queries, list):
+            return JSONResponse({"error": "Se requiere el parámetro 'queries' (lista de consultas)"}, status_code=400)
+        if len(queries) > SEARCH_BATCH_MAX_QUERIES:
+            return JSONResponse({"error": f"Máximo {SEARCH_BATCH_MAX_QUERIES} consultas por llamada"}, status_code=400)
+        if not all(isinstance(entry, dict) and entry.get("query") for entry in queries):
+            return JSONResponse({"error": "Cada consulta requiere el campo 'query'"}, status_code=400)
+        if not all(
+            isinstance(value, int) and not isinstance(value, bool) and value > 0
+            for value in [num_results] + [entry.get("num_results", num_results) for entry in queries]
+        ):
+            return JSONResponse({"error": "'num_results' debe ser un entero positivo"}, status_code=400)
+        
+        result = await search_batch(queries, num_results)
+        return JSONResponse(result)
+    
+    except Exception as e:
+        logger.error(f"Error en search_batch_endpoint: {str(e)}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
 async def cancel_operation_endpoint(request):
     """
-    Endpoint para cancelar una operación en curso.
+    Endpoint para cancelar los trabajos en curso de una sesión SSE (o uno concreto con "job_id").
     
     Args:
         request: Solicitud HTTP.
@@ -223,13 +424,17 @@ async def cancel_operation_endpoint(request):
     try:
         data = await request.json()
         client_id = data.get("client_id")
+        job_id = data.get("job_id")
         
         if not client_id:
             return JSONResponse({"error": "Se requiere el parámetro 'client_id'"}, status_code=400)
         
-        if client_id in cancellation_tokens:
-            cancellation_tokens[client_id] = True
-            return JSONResponse({"status": "Cancelación solicitada"})
+        remote = await event_bus.session_idle(client_id) != float("inf")
+        if client_id in sse_sessions or jobs.for_client(client_id) or remote:
+            # Los trabajos pueden estar en otros workers
+            cancelled = jobs.cancel(client_id, job_id)
+            await event_bus.publish_cancel(client_id, job_id)
+            return JSONResponse({"status": "Cancelación solicitada", "cancelled": cancelled})
         else:
             return JSONResponse({"error": "Cliente no encontrado"}, status_code=404)
     
@@ -238,166 +443,280 @@ async def cancel_operation_endpoint(request):
         return JSONResponse({"error": str(e)}, status_code=500)
 
 
-async def process_docs_request(client_id: str, query: str, library: str) -> None:
+async def get_job_endpoint(request):
+    """
+    Endpoint para consultar el estado y el resultado de un trabajo.
+    
+    Los trabajos terminados se conservan JOB_RESULT_TTL segundos.
+    
+    Args:
+        request: Solicitud HTTP.
+        
+    Returns:
+        JSONResponse: Respuesta JSON con el trabajo.
+    """
+    job_id = request.path_params["job_id"]
+    job = jobs.get(job_id)
+    if job is not None:
+        return JSONResponse(job.to_dict())
+    # Trabajo terminado en otro worker
+    shared = await event_bus.load_job(job_id)
+    if shared is None:
+        return JSONResponse({"error": "Trabajo no encontrado"}, status_code=404)
+    return JSONResponse(shared)
+
+
+def make_stream_callback(job: Job) -> Callable[..., Awaitable[None]]:
+    """
+    Crea la función callback que traduce los eventos de búsqueda a mensajes SSE.
+    
+    Args:
+        job: Trabajo al que pertenecen los eventos.
+        
+    Returns:
+        Callable: Callback compatible con stream_callback de mcp_serper.
+    """
+    async def stream_callback(data, error=False):
+        if error:
+            await jobs.emit(job, {
+                "type": "error",
+                "message": str(data)
+            })
+            return
+        
+        if "progress" in data:
+            message = {
+                "type": "progress",
+                "current": data["progress"]["current"],
+                "total": data["progress"]["total"],
+                "title": data["progress"].get("title", "")
+            }
+        
+        elif "content" in data:
+            message = {
+                "type": "content",
+                "title": data["content"].get("title", "Sin título"),
+                "source": data["content"].get("source", ""),
+                "content": data["content"].get("text", ""),
+                "rank": data["content"].get("rank")
+            }
+        
+        elif "library_results" in data:
+            message = {
+                "type": "library_results",
+                "library": data["library_results"]["library"],
+                "total": data["library_results"]["total"],
+                "results": data["library_results"]["results"]
+            }
+        
+        else:
+            return
+        
+        # Búsquedas en varias bibliotecas: indicar a cuál pertenece el evento
+        library = next(iter(data.values())).get("library")
+        if library:
+            message["library"] = library
+        
+        with span("sse.send", type=message["type"]):
+            await jobs.emit(job, message)
+    
+    return stream_callback
+
+
+async def process_docs_request(
+    job: Job,
+    query: str,
+    library: str,
+    mode: Optional[str] = None,
+    timings: bool = False
+) -> Dict[str, Any]:
     """
     Procesa una solicitud de documentación y envía resultados a través de SSE.
     
     Args:
-        client_id: ID del cliente SSE.
+        job: Trabajo que ejecuta la solicitud.
         query: Consulta de búsqueda.
         library: Biblioteca a buscar.
+        mode: Modo de búsqueda (por defecto DOCS_SEARCH_MODE).
+        timings: Si es True, envía un evento "timings" con el tiempo de cada etapa.
+        
+    Returns:
+        Dict: Resultado de la búsqueda (se conserva en el trabajo).
     """
     try:
-        await send_sse_message(client_id, {
+        await jobs.emit(job, {
             "type": "status",
             "message": f"Buscando '{query}' en la documentación de {library}..."
         })
         
-        # Inicializar contador de progreso
-        current_result = 0
-        
-        # Función callback para streaming
-        async def stream_callback(data, error=False):
-            nonlocal current_result
-            
-            # Verificar cancelación
-            if cancellation_tokens.get(client_id, False):
-                raise asyncio.CancelledError("Operación cancelada por el usuario")
-            
-            if error:
-                await send_sse_message(client_id, {
-                    "type": "error",
-                    "message": str(data)
-                })
-                return
-            
-            if "progress" in data:
-                current_result = data["progress"]["current"]
-                total_results = data["progress"]["total"]
-                title = data["progress"].get("title", "")
-                
-                await send_sse_message(client_id, {
-                    "type": "progress",
-                    "current": current_result,
-                    "total": total_results,
-                    "title": title
-                })
-            
-            elif "content" in data:
-                await send_sse_message(client_id, {
-                    "type": "content",
-                    "title": data["content"].get("title", "Sin título"),
-                    "source": data["content"].get("source", ""),
-                    "content": data["content"].get("text", "")
-                })
+        stream_callback = make_stream_callback(job)
         
         # Llamar a la función MCP con soporte para streaming
         result_data = await get_docs(
             query=query,
             library=library,
             stream_callback=stream_callback,
-            with_content=True
+            with_content=True,
+            mode=mode,
+            timings=timings
         )
         
+        if timings:
+            await jobs.emit(job, {
+                "type": "timings",
+                "timings": result_data["timings"]
+            })
+        
         # Mensaje de finalización
-        await send_sse_message(client_id, {
+        await jobs.emit(job, {
             "type": "status",
             "message": "Búsqueda completada."
         })
         
+        return result_data
+        
     except asyncio.CancelledError:
-        logger.info(f"Operación cancelada para cliente: {client_id}")
-        await send_sse_message(client_id, {
+        logger.info(f"Trabajo cancelado: {job.id}")
+        await jobs.emit(job, {
             "type": "status",
             "message": "Búsqueda cancelada por el usuario."
         })
+        raise
     except Exception as e:
         logger.error(f"Error en process_docs_request: {str(e)}")
-        await send_sse_message(client_id, {
+        await jobs.emit(job, {
             "type": "error",
             "message": f"Error: {str(e)}"
         })
+        raise
 
 
-async def process_domain_docs_request(client_id: str, query: str, domain: str) -> None:
+async def process_domain_docs_request(
+    job: Job,
+    query: str,
+    domain: str,
+    mode: Optional[str] = None,
+    timings: bool = False
+) -> Dict[str, Any]:
     """
     Procesa una solicitud de documentación desde un dominio personalizado y envía resultados a través de SSE.
     
     Args:
-        client_id: ID del cliente SSE.
+        job: Trabajo que ejecuta la solicitud.
         query: Consulta de búsqueda.
         domain: Dominio para buscar documentación.
+        mode: Modo de búsqueda (por defecto DOCS_SEARCH_MODE).
+        timings: Si es True, envía un evento "timings" con el tiempo de cada etapa.
+        
+    Returns:
+        Dict: Resultado de la búsqueda (se conserva en el trabajo).
     """
     try:
-        await send_sse_message(client_id, {
+        await jobs.emit(job, {
             "type": "status",
             "message": f"Buscando '{query}' en el dominio: {domain}..."
         })
         
-        # Inicializar contador de progreso
-        current_result = 0
-        
-        # Función callback para streaming
-        async def stream_callback(data, error=False):
-            nonlocal current_result
-            
-            # Verificar cancelación
-            if cancellation_tokens.get(client_id, False):
-                raise asyncio.CancelledError("Operación cancelada por el usuario")
-            
-            if error:
-                await send_sse_message(client_id, {
-                    "type": "error",
-                    "message": str(data)
-                })
-                return
-            
-            if "progress" in data:
-                current_result = data["progress"]["current"]
-                total_results = data["progress"]["total"]
-                title = data["progress"].get("title", "")
-                
-                await send_sse_message(client_id, {
-                    "type": "progress",
-                    "current": current_result,
-                    "total": total_results,
-                    "title": title
-                })
-            
-            elif "content" in data:
-                await send_sse_message(client_id, {
-                    "type": "content",
-                    "title": data["content"].get("title", "Sin título"),
-                    "source": data["content"].get("source", ""),
-                    "content": data["content"].get("text", "")
-                })
+        stream_callback = make_stream_callback(job)
         
         # Llamar a la función MCP con soporte para streaming
         result_data = await get_docs_from_domain(
             query=query,
             domain=domain,
             stream_callback=stream_callback,
-            with_content=True
+            with_content=True,
+            mode=mode,
+            timings=timings
         )
         
+        if timings:
+            await jobs.emit(job, {
+                "type": "timings",
+                "timings": result_data["timings"]
+            })
+        
         # Mensaje de finalización
-        await send_sse_message(client_id, {
+        await jobs.emit(job, {
             "type": "status",
             "message": "Búsqueda completada."
         })
         
+        return result_data
+        
     except asyncio.CancelledError:
-        logger.info(f"Operación cancelada para cliente: {client_id}")
-        await send_sse_message(client_id, {
+        logger.info(f"Trabajo cancelado: {job.id}")
+        await jobs.emit(job, {
             "type": "status",
             "message": "Búsqueda cancelada por el usuario."
         })
+        raise
     except Exception as e:
         logger.error(f"Error en process_domain_docs_request: {str(e)}")
-        await send_sse_message(client_id, {
+        await jobs.emit(job, {
+            "type": "error",
+            "message": f"Error: {str(e)}"
+        })
+        raise
+
+
+async def process_multi_docs_request(job: Job, query: str, libraries: List[str]) -> Dict[str, Any]:
+    """
+    Procesa una búsqueda en varias bibliotecas y envía resultados a través de SSE.
+    
+    Args:
+        job: Trabajo que ejecuta la solicitud.
+        query: Consulta de búsqueda.
+        libraries: Bibliotecas a buscar.
+        
+    Returns:
+        Dict: Resultado combinado (se conserva en el trabajo).
+    """
+    try:
+        await jobs.emit(job, {
+            "type": "status",
+            "message": f"Buscando '{query}' en: {', '.join(libraries)}..."
+        })
+        
+        stream_callback = make_stream_callback(job)
+        
+        result_data = await get_docs_multi(
+            query=query,
+            libraries=libraries,
+            stream_callback=stream_callback,
+            with_content=True
+        )
+        
+        # Resultados combinados y sin duplicados
+        await jobs.emit(job, {
+            "type": "merged_results",
+            "total": result_data["total"],
+            "results": result_data["results"],
+            "libraries": result_data["libraries"],
+            "partial": result_data["partial"]
+        })
+        
+        # Mensaje de finalización
+        await jobs.emit(job, {
+            "type": "status",
+            "message": "Búsqueda completada." if not result_data["partial"] else "Búsqueda completada con resultados parciales."
+        })
+        
+        return result_data
+        
+    except asyncio.CancelledError:
+        logger.info(f"Trabajo cancelado: {job.id}")
+        await jobs.emit(job, {
+            "type": "status",
+            "message": "Búsqueda cancelada por el usuario."
+        })
+        raise
+    except Exception as e:
+        logger.error(f"Error en process_multi_docs_request: {str(e)}")
+        await jobs.emit(job, {
             "type": "error",
             "message": f"Error: {str(e)}"
         })
+        raise
 
 
 async def health_check(request):
@@ -413,14 +732,167 @@ async def health_check(request):
     return JSONResponse({"status": "healthy"})
 
 
+async def stats_endpoint(request):
+    """
+    Endpoint con estadísticas internas del servidor.
+    
+    Args:
+        request: Solicitud HTTP.
+        
+    Returns:
+        JSONResponse: Respuesta JSON con contadores de cachés, clientes SSE, pool de
+        extracción, índice local, límite de tasa de Serper, estado de los hosts de
+        documentación y retraso del bucle de eventos.
+    """
+    return JSONResponse({
+        "sse_clients": len(sse_sessions.connected()),
+        "sse": sse_sessions.stats(),
+        "jobs": jobs.stats(),
+        "event_bus": event_bus.stats(),
+        "caches": {
+            "search": results_cache.stats(),
+            "pages": page_cache.stats()
+        },
+        "search_staleness": search_staleness_stats(),
+        "serper_rate_limit": serper_limiter.stats(),
+        "page_revalidation": page_revalidation_stats(),
+        "fetch_resilience": fetch_resilience.stats(),
+        "singleflight": {
+            "search": search_flights.stats(),
+            "pages": page_flights.stats()
+        },
+        "extraction_pool": get_extraction_pool().stats(),
+        "docs_index": docs_index.stats(),
+        "page_store": get_page_store().stats() if get_page_store() else None,
+        "event_loop_lag": loop_lag_monitor.stats(),
+        "timings": timing_stats()
+    })
+
+
+async def deliver_bus_event(client_id: str, data: Dict[str, Any]) -> None:
+    """Entrega a una sesión local un evento publicado por otro worker."""
+    session = sse_sessions.get(client_id)
+    if session is not None:
+        await session.send(data)
+
+
+async def deliver_bus_cancel(client_id: str, job_id: Optional[str]) -> None:
+    """Aplica a los trabajos locales una cancelación recibida de otro worker."""
+    jobs.cancel(client_id, job_id)
+
+
+async def release_adopted_session(client_id: str) -> None:
+    """Libera la copia local de una sesión que otro worker ha adoptado."""
+    session = sse_sessions.get(client_id)
+    if session is not None:
+        # Primero se elimina para que el cierre del stream no vuelva a registrarla
+        sse_sessions.remove(client_id)
+        session.close()
+        logger.info(f"Sesión SSE adoptada por otro worker: {client_id}")
+
+
+async def maintain_sessions() -> None:
+    """
+    Elimina las sesiones caducadas y renueva en el bus las conectadas.
+    
+    Las desconectadas ya se registraron al desconectarse y su clave caduca a la vez
+    que la sesión local; si otro worker las ha adoptado, se liberan.
+    """
+    sse_sessions.expire()
+    for client_id in sse_sessions.client_ids():
+        session = sse_sessions.get(client_id)
+        if session is None:
+            continue
+        if session.connected:
+            await register_session(client_id)
+            continue
+        owner = await event_bus.session_owner(client_id)
+        if owner is not None and owner != event_bus.worker_id:
+            await release_adopted_session(client_id)
+
+
+async def start_jobs() -> None:
+    """Conecta el bus de eventos e inicia el recolector de trabajos (arranque de la aplicación)."""
+    await event_bus.start(deliver_bus_event, deliver_bus_cancel, release_adopted_session)
+    jobs.start_reaper(maintain_sessions)
+
+
+async def stop_jobs() -> None:
+    """Cancela los trabajos en curso y desconecta el bus (apagado de la aplicación)."""
+    await jobs.shutdown()
+    await event_bus.close()
+
+
+def collect_server_metrics() -> List[MetricFamily]:
+    """Métricas leídas de los contadores de cachés, sesiones SSE, trabajos y bucle de eventos."""
+    families = cache_families({"search": results_cache, "pages": page_cache})
+    sse = sse_sessions.stats()
+    job_stats = jobs.stats()
+    lag = loop_lag_monitor.stats()
+    limiter = serper_limiter.stats()
+    resilience = fetch_resilience.stats()
+    families.extend([
+        gauge_family("mcp_serper_sse_clients", "Clientes SSE conectados", sse["connected"]),
+        gauge_family("mcp_serper_sse_sessions", "Sesiones SSE, incluidas las desconectadas en espera de reanudación", sse["sessions"]),
+        gauge_family("mcp_serper_sse_queue_depth", "Eventos pendientes en todas las colas SSE", sse["queue_depth_total"]),
+        gauge_family("mcp_serper_sse_queue_depth_max", "Eventos pendientes en la cola SSE más llena", sse["queue_depth_max"]),
+        ("mcp_serper_sse_dropped_events_total", "counter", "Eventos de progreso descartados por colas llenas", [({}, sse["dropped"])]),
+        ("mcp_serper_sse_overflows_total", "counter", "Streams cerrados por desbordamiento de la cola", [({}, sse["overflows"])]),
+        gauge_family("mcp_serper_jobs_in_flight", "Trabajos en curso", job_stats["running"]),
+        ("mcp_serper_jobs_total", "counter", "Trabajos lanzados, deduplicados, cancelados y recogidos por inactividad", [
+            ({"event": event}, job_stats[event]) for event in ("started", "deduplicated", "cancelled", "reaped")
+        ]),
+        ("mcp_serper_serper_queue_depth", "gauge", "Solicitudes a Serper en espera del limitador de tasa", [
+            ({"priority": priority}, depth) for priority, depth in limiter["queue_depth"].items()
+        ]),
+        gauge_family("mcp_serper_serper_rate_tokens", "Tokens disponibles en el limitador de tasa de Serper", limiter["tokens"]),
+        ("mcp_serper_serper_rate_limited_total", "counter", "Solicitudes a Serper rechazadas por el limitador y pausas por 429", [
+            ({"reason": "deadline"}, limiter["rejected_deadline"]),
+            ({"reason": "queue_full"}, limiter["rejected_queue_full"]),
+            ({"reason": "429"}, limiter["pauses"]),
+        ]),
+        gauge_family("mcp_serper_fetch_open_circuits", "Hosts de documentación con el circuito abierto", resilience["open_circuits"]),
+        ("mcp_serper_fetch_resilience_total", "counter", "Intentos, reintentos, solicitudes de cobertura y rechazos por circuito abierto en fetch_url", [
+            ({"event": event}, resilience[event])
+            for event in ("attempts", "retries", "hedges", "hedge_wins", "short_circuited", "circuits_opened")
+        ]),
+        gauge_family("mcp_serper_extraction_pending", "Extracciones en cola o en ejecución en el pool", get_extraction_pool().pending),
+        ("mcp_serper_event_loop_lag_seconds", "gauge", "Retraso del bucle de eventos", [
+            ({"stat": stat}, lag[f"{stat}_ms"] / 1000) for stat in ("last", "avg", "p99", "max")
+        ]),
+    ])
+    return families
+
+
+registry.register_collector(collect_server_metrics)
+
+
+async def metrics_endpoint(request):
+    """
+    Endpoint con métricas en formato de texto de Prometheus.
+    
+    Args:
+        request: Solicitud HTTP.
+        
+    Returns:
+        Response: Exposición de métricas.
+    """
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # Definir rutas
 routes = [
     Route("/", endpoint=lambda request: JSONResponse({"message": "API de MCP-Serper"})),
     Route("/health", endpoint=health_check, methods=["GET"]),
+    Route("/stats", endpoint=stats_endpoint, methods=["GET"]),
+    Route("/metrics", endpoint=metrics_endpoint, methods=["GET"]),
     Route("/sse", endpoint=sse_endpoint, methods=["GET"]),
     Route("/messages/get_docs_stream", endpoint=get_docs_stream_endpoint, methods=["POST"]),
     Route("/messages/get_docs_from_domain_stream", endpoint=get_docs_from_domain_stream_endpoint, methods=["POST"]),
+    Route("/messages/get_docs_multi_stream", endpoint=get_docs_multi_stream_endpoint, methods=["POST"]),
+    Route("/messages/search_batch", endpoint=search_batch_endpoint, methods=["POST"]),
     Route("/cancel", endpoint=cancel_operation_endpoint, methods=["POST"]),
+    Route("/jobs/{job_id}", endpoint=get_job_endpoint, methods=["GET"]),
     Mount("/demo", StaticFiles(directory="demo"), name="demo"),
 ]
 
@@ -439,8 +911,8 @@ app = Starlette(
     debug=os.environ.get("DEBUG", "false").lower() == "true",
     routes=routes,
     middleware=middleware,
-    on_startup=[],
-    on_shutdown=[],
+    on_startup=[start_http_clients, start_loop_monitor, start_jobs],
+    on_shutdown=[stop_jobs, close_http_clients, close_redis_client, close_extraction_pool, close_page_store, stop_loop_monitor],
 )
 
 
@@ -449,11 +921,14 @@ def run_server():
     Inicia el servidor Uvicorn.
     """
     port = int(os.environ.get("PORT", 8000))
+    workers = int(os.environ.get("UVICORN_WORKERS", 1))
     uvicorn.run(
-        app,
+        # Con varios workers uvicorn necesita importar la aplicación en cada proceso
+        "server:app" if workers > 1 else app,
         host="0.0.0.0",
         port=port,
         log_level="info",
+        workers=workers,
     )
 
 
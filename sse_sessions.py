@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Sesiones SSE con colas acotadas y reanudación por Last-Event-ID.
+
+Cada cliente SSE tiene una sesión con una cola de envío de tamaño fijo y un búfer
+circular con los últimos eventos enviados. Los eventos llevan un identificador
+"<client_id>:<secuencia>", de modo que un EventSource que se reconecta envía
+Last-Event-ID y el servidor reanuda la misma sesión reenviando lo que faltaba.
+
+Cuando la cola de un cliente lento se llena se aplica una política configurable:
+
+    block           el productor espera hasta SSE_SEND_TIMEOUT segundos y, si la
+                    cola sigue llena, se desconecta al cliente
+    drop_progress   se descartan los eventos de progreso; el resto espera como en block
+    disconnect      se cierra el stream; el cliente puede reconectarse y recuperar
+                    los eventos desde el búfer
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("mcp-serper-server")
+
+# Eventos pendientes de envío por cliente
+SSE_QUEUE_SIZE = int(os.environ.get("SSE_QUEUE_SIZE", 100))
+# Política cuando la cola está llena: block, drop_progress o disconnect
+SSE_OVERFLOW_POLICY = os.environ.get("SSE_OVERFLOW_POLICY", "drop_progress")
+# Segundos que un productor espera en una cola llena antes de desconectar al cliente
+SSE_SEND_TIMEOUT = float(os.environ.get("SSE_SEND_TIMEOUT", 10))
+# Eventos recientes conservados por cliente para reanudar con Last-Event-ID
+SSE_REPLAY_BUFFER = int(os.environ.get("SSE_REPLAY_BUFFER", 200))
+SSE_REPLAY_BUFFER_BYTES = int(os.environ.get("SSE_REPLAY_BUFFER_BYTES", 4 * 1024 * 1024))
+# Segundos que se conserva una sesión desconectada a la espera de una reconexión
+SSE_SESSION_TTL = float(os.environ.get("SSE_SESSION_TTL", 120))
+# Segundos sin eventos tras los que se envía un latido al cliente
+SSE_HEARTBEAT_INTERVAL = float(os.environ.get("SSE_HEARTBEAT_INTERVAL", 30))
+
+OVERFLOW_POLICIES = ("block", "drop_progress", "disconnect")
+
+# Tipos de evento que la política drop_progress puede descartar
+DROPPABLE_EVENTS = frozenset({"progress"})
+
+# Marca en la cola que indica al generador del stream que debe terminar
+_CLOSE = None
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[Tuple[str, int]]:
+    """
+    Interpreta un Last-Event-ID con formato "<client_id>:<secuencia>".
+
+    Returns:
+        Optional[Tuple]: ID del cliente y secuencia, o None si el valor no es válido.
+    """
+    if not value or ":" not in value:
+        return None
+    client_id, _, seq = value.rpartition(":")
+    try:
+        return client_id, int(seq)
+    except ValueError:
+        return None
+
+
+class SSESession:
+    """Estado de un cliente SSE: cola de envío, búfer de reanudación y contadores."""
+
+    def __init__(
+        self,
+        client_id: str,
+        queue_size: int = SSE_QUEUE_SIZE,
+        overflow_policy: str = SSE_OVERFLOW_POLICY,
+        buffer_size: int = SSE_REPLAY_BUFFER,
+        buffer_bytes: int = SSE_REPLAY_BUFFER_BYTES,
+    ):
+        """
+        Args:
+            client_id: ID del cliente SSE.
+            queue_size: Eventos pendientes máximos.
+            overflow_policy: Política con la cola llena (ver OVERFLOW_POLICIES).
+            buffer_size: Eventos conservados para reanudar.
+            buffer_bytes: Bytes máximos del búfer de reanudación.
+        """
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de desbordamiento no válida: {overflow_policy}")
+        self.client_id = client_id
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.buffer_size = buffer_size
+        self.buffer_bytes = buffer_bytes
+        self.queue: Optional["asyncio.Queue[Optional[str]]"] = None
+        self.seq = 0
+        self._buffer: Deque[Tuple[int, str]] = deque()
+        self._buffered_bytes = 0
+        self.disconnected_at: Optional[float] = time.monotonic()
+        self.dropped = 0
+        self.overflows = 0
+
+    @property
+    def connected(self) -> bool:
+        return self.queue is not None
+
+    def format_event(self, seq: int, data: Any) -> str:
+        return f"id: {self.client_id}:{seq}\ndata: {json.dumps(data)}\n\n"
+
+    def _remember(self, seq: int, event: str) -> None:
+        self._buffer.append((seq, event))
+        self._buffered_bytes += len(event)
+        while self._buffer and (
+            len(self._buffer) > self.buffer_size or self._buffered_bytes > self.buffer_bytes
+        ):
+            _, old = self._buffer.popleft()
+            self._buffered_bytes -= len(old)
+
+    def attach(self, last_seq: Optional[int] = None) -> Tuple["asyncio.Queue[Optional[str]]", List[str]]:
+        """
+        Conecta un stream a la sesión.
+
+        Si ya había otro stream conectado, se le indica que termine. Los eventos
+        posteriores a last_seq que siguen en el búfer se devuelven para reenviarlos.
+
+        Args:
+            last_seq: Última secuencia recibida por el cliente (Last-Event-ID).
+
+        Returns:
+            Tuple: Cola del nuevo stream y eventos a reenviar (con un aviso si se perdieron eventos).
+        """
+        if self.queue is not None:
+            self._close_queue(self.queue)
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.disconnected_at = None
+
+        replay: List[str] = []
+        if last_seq is not None:
+            oldest = self._buffer[0][0] if self._buffer else self.seq + 1
+            if oldest > last_seq + 1:
+                missed = oldest - last_seq - 1
+                replay.append(f"data: {json.dumps({'type': 'gap', 'missed': missed})}\n\n")
+            replay.extend(event for seq, event in self._buffer if seq > last_seq)
+        return self.queue, replay
+
+    def detach(self, queue: "asyncio.Queue[Optional[str]]") -> None:
+        """Desconecta un stream; la sesión se conserva SSE_SESSION_TTL segundos."""
+        if self.queue is queue:
+            self.queue = None
+            self.disconnected_at = time.monotonic()
+
+    def close(self) -> None:
+        """Cierra el stream conectado, si lo hay, sin conservar la cola."""
+        queue = self.queue
+        if queue is not None:
+            self._close_queue(queue)
+            self.detach(queue)
+
+    @staticmethod
+    def _close_queue(queue: "asyncio.Queue[Optional[str]]") -> None:
+        """Vacía una cola y deja la marca de cierre para que su stream termine."""
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(_CLOSE)
+
+    def _overflow(self, queue: "asyncio.Queue[Optional[str]]") -> None:
+        """Desconecta a un cliente que no consume sus eventos."""
+        self.overflows += 1
+        logger.warning(f"Cola SSE llena para cliente {self.client_id}; se cierra el stream")
+        self._close_queue(queue)
+        self.detach(queue)
+
+    async def send(self, data: Dict[str, Any]) -> None:
+        """
+        Envía un evento al cliente aplicando la política de desbordamiento.
+
+        El evento se guarda en el búfer de reanudación aunque el cliente no esté
+        conectado o el evento se descarte de la cola.
+
+        Args:
+            data: Evento a enviar (se serializa a JSON).
+        """
+        self.seq += 1
+        event = self.format_event(self.seq, data)
+        self._remember(self.seq, event)
+
+        queue = self.queue
+        if queue is None:
+            return
+        try:
+            queue.put_nowait(event)
+            return
+        except asyncio.QueueFull:
+            pass
+
+        if self.overflow_policy == "disconnect":
+            self._overflow(queue)
+            return
+        if self.overflow_policy == "drop_progress" and data.get("type") in DROPPABLE_EVENTS:
+            self.dropped += 1
+            return
+        try:
+            await asyncio.wait_for(queue.put(event), timeout=SSE_SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            if self.queue is queue:
+                self._overflow(queue)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "buffered_events": len(self._buffer),
+            "buffered_bytes": self._buffered_bytes,
+            "last_event_id": self.seq,
+            "dropped": self.dropped,
+            "overflows": self.overflows,
+        }
+
+
+class SessionRegistry:
+    """Sesiones SSE del proceso, indexadas por ID de cliente."""
+
+    def __init__(self, session_ttl: float = SSE_SESSION_TTL):
+        self.session_ttl = session_ttl
+        self._sessions: Dict[str, SSESession] = {}
+
+    def __contains__(self, client_id: str) -> bool:
+        return client_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, client_id: str) -> Optional[SSESession]:
+        return self._sessions.get(client_id)
+
+    def create(self, client_id: str) -> SSESession:
+        session = SSESession(client_id)
+        self._sessions[client_id] = session
+        return session
+
+    def idle_for(self, client_id: str) -> float:
+        """
+        Segundos que lleva desconectado un cliente.
+
+        Returns:
+            float: 0 si está conectado, infinito si la sesión ya no existe.
+        """
+        session = self._sessions.get(client_id)
+        if session is None:
+            return float("inf")
+        if session.disconnected_at is None:
+            return 0.0
+        return time.monotonic() - session.disconnected_at
+
+    def remove(self, client_id: str) -> None:
+        self._sessions.pop(client_id, None)
+
+    def expire(self) -> int:
+        """
+        Elimina las sesiones desconectadas hace más de session_ttl segundos.
+
+        Returns:
+            int: Número de sesiones eliminadas.
+        """
+        now = time.monotonic()
+        expired = [
+            client_id for client_id, session in self._sessions.items()
+            if session.disconnected_at is not None and now - session.disconnected_at > self.session_ttl
+        ]
+        for client_id in expired:
+            del self._sessions[client_id]
+        return len(expired)
+
+    def client_ids(self) -> List[str]:
+        return list(self._sessions)
+
+    def connected(self) -> List[SSESession]:
+        return [session for session in self._sessions.values() if session.connected]
+
+    def stats(self) -> Dict[str, Any]:
+        sessions = list(self._sessions.values())
+        depths = [session.queue.qsize() for session in sessions if session.queue is not None]
+        return {
+            "sessions": len(sessions),
+            "connected": len(depths),
+            "queue_depth_total": sum(depths),
+            "queue_depth_max": max(depths, default=0),
+            "buffered_bytes": sum(session._buffered_bytes for session in sessions),
+            "dropped": sum(session.dropped for session in sessions),
+            "overflows": sum(session.overflows for session in sessions),
+            "overflow_policy": SSE_OVERFLOW_POLICY,
+        }
@@ -0,0 +1,78 @@
+"""Fixtures compartidas: Serper y servidor de páginas simulados con httpx.MockTransport."""
+
+import asyncio
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import pytest
+
+
+def page_html(title: str) -> bytes:
+    return f"<html><head><title>{title}</title></head><body><main><p>{title}</p></main></body></html>".encode()
+
+
+class FakeSerper:
+    """
+    Serper y sitios de documentación simulados.
+
+    Cada consulta devuelve `num` resultados orgánicos con enlaces derivados de la
+    consulta, salvo que `results` indique otros. `status` distinto de 200 hace fallar
+    las búsquedas; `page_delay` retrasa las descargas de páginas.
+    """
+
+    def __init__(self):
+        self.status = 200
+        self.results: Dict[str, List[Dict[str, Any]]] = {}
+        self.searches: List[Any] = []
+        self.pages: List[str] = []
+        self.search_delay = 0.0
+        self.page_delay: Callable[[str], float] = lambda url: 0.0
+        self.on_search: Optional[Callable[[], Any]] = None
+
+    def organic(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        query = payload["q"]
+        results = self.results.get(query)
+        if results is None:
+            slug = query.replace("site:", "").replace(" ", "-").replace("/", "_")
+            results = [
+                {"title": f"{query} {i}", "link": f"https://docs.example.com/{slug}/{i}", "snippet": "..."}
+                for i in range(payload.get("num", 10))
+            ]
+        return {"searchParameters": {"q": query}, "organic": results}
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            body = json.loads(request.content)
+            self.searches.append(body)
+            if self.search_delay:
+                await asyncio.sleep(self.search_delay)
+            if self.status != 200:
+                return httpx.Response(self.status, text="error")
+            if isinstance(body, list):
+                return httpx.Response(200, json=[self.organic(item) for item in body])
+            return httpx.Response(200, json=self.organic(body))
+        url = str(request.url)
+        self.pages.append(url)
+        delay = self.page_delay(url)
+        if delay:
+            await asyncio.sleep(delay)
+        return httpx.Response(200, content=page_html(url), headers={"content-type": "text/html; charset=utf-8"})
+
+
+@pytest.fixture
+async def serper(monkeypatch):
+    """Conecta las herramientas de mcp_serper a un FakeSerper con cachés vacías."""
+    import mcp_serper
+
+    fake = FakeSerper()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake.handler))
+    monkeypatch.setattr(mcp_serper, "get_http_client", lambda profile: client)
+    monkeypatch.setattr(mcp_serper, "SERPER_API_KEY", "test")
+    monkeypatch.setattr(mcp_serper, "DOCS_INDEX_ENABLED", False)
+    await mcp_serper.results_cache.clear()
+    await mcp_serper.page_cache.clear()
+    yield fake
+    for task in list(mcp_serper._background_refreshes.values()):
+        task.cancel()
+    await client.aclose()
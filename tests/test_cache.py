@@ -0,0 +1,314 @@
+"""Pruebas de las cachés en memoria, sobre Redis y de dos niveles, y de SingleFlight."""
+
+import asyncio
+import json
+import zlib
+
+import fakeredis
+import pytest
+
+import cache
+from cache import LRUTTLCache, RedisCache, SingleFlight, TieredCache, build_cache
+
+
+class BrokenRedis:
+    """Cliente que falla en todas las operaciones, como un Redis caído."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def get(self, key):
+        self.calls += 1
+        raise ConnectionError("Redis no disponible")
+
+    async def set(self, key, value, ex=None):
+        self.calls += 1
+        raise ConnectionError("Redis no disponible")
+
+    async def delete(self, *keys):
+        self.calls += 1
+        raise ConnectionError("Redis no disponible")
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeAsyncRedis()
+
+
+async def test_lru_evicts_least_recently_used_entry():
+    lru = LRUTTLCache(max_entries=2)
+    await lru.set("a", 1)
+    await lru.set("b", 2)
+    await lru.get("a")
+    await lru.set("c", 3)
+
+    assert "a" in lru and "c" in lru
+    assert "b" not in lru
+    assert lru.stats()["evictions"] == 1
+
+
+async def test_lru_byte_budget_evicts_oldest_entries():
+    lru = LRUTTLCache(max_entries=0, max_bytes=250)
+    for key in ("a", "b", "c"):
+        await lru.set(key, "x" * 100)
+
+    assert "a" not in lru
+    assert "b" in lru and "c" in lru
+    assert lru.stats()["bytes"] <= 250
+
+    # Un valor mayor que todo el presupuesto no se guarda ni expulsa a los demás
+    await lru.set("big", "x" * 1000)
+    assert "big" not in lru
+    assert len(lru) == 2
+
+
+async def test_lru_replacing_a_key_updates_its_size():
+    lru = LRUTTLCache(max_bytes=1000)
+    await lru.set("a", "x" * 500)
+    await lru.set("a", "x" * 10)
+
+    assert lru.stats()["bytes"] == cache.estimate_size("x" * 10)
+
+
+async def test_lru_entries_expire_after_ttl(monkeypatch):
+    lru = LRUTTLCache(default_ttl=60)
+    await lru.set("a", 1)
+    await lru.set("b", 2, ttl=600)
+    now = cache.time.monotonic()
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now + 61)
+
+    assert await lru.get("a") is None
+    assert await lru.get("b") == 2
+    stats = lru.stats()
+    assert stats["expirations"] == 1
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_estimate_size_is_close_to_json_size():
+    value = {"title": "Título", "content": "ñ" * 300 + "a" * 1000, "truncated": False, "links": ["https://x/1", "https://x/2"]}
+    exact = len(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+    assert abs(cache.estimate_size(value) - exact) <= exact * 0.05
+
+
+async def test_round_trip_small_value_is_stored_as_json(redis_client):
+    redis = RedisCache(redis_client, prefix="t:", compress_threshold=1024)
+    value = {"title": "Docs", "results": [1, 2, 3]}
+
+    await redis.set("k", value)
+
+    raw = await redis_client.get("t:k")
+    assert raw[:1] == b"j"
+    assert json.loads(raw[1:]) == value
+    assert await redis.get("k") == value
+
+
+async def test_round_trip_large_value_is_compressed(redis_client):
+    redis = RedisCache(redis_client, prefix="t:", compress_threshold=64)
+    value = {"content": "documentación " * 200}
+
+    await redis.set("k", value)
+
+    raw = await redis_client.get("t:k")
+    assert raw[:1] == b"z"
+    assert len(raw) < len(json.dumps(value))
+    assert json.loads(zlib.decompress(raw[1:])) == value
+    assert await redis.get("k") == value
+
+
+async def test_ttl_is_propagated_to_redis(redis_client):
+    redis = RedisCache(redis_client, prefix="t:", default_ttl=600)
+
+    await redis.set("default", 1)
+    await redis.set("explicit", 2, ttl=30)
+    await redis.set("fraction", 3, ttl=0.2)
+
+    assert 590 <= await redis_client.ttl("t:default") <= 600
+    assert 20 <= await redis_client.ttl("t:explicit") <= 30
+    assert await redis_client.ttl("t:fraction") == 1
+
+
+async def test_no_ttl_stores_without_expiry(redis_client):
+    redis = RedisCache(redis_client, prefix="t:", default_ttl=None)
+
+    await redis.set("k", 1)
+
+    assert await redis_client.ttl("t:k") == -1
+
+
+async def test_corrupt_value_is_a_miss(redis_client):
+    redis = RedisCache(redis_client, prefix="t:")
+    await redis_client.set("t:k", b"z-no-es-zlib")
+
+    assert await redis.get("k") is None
+    assert redis.stats()["misses"] == 1
+    assert redis.stats()["errors"] == 0
+
+
+async def test_fails_open_and_backs_off_when_redis_errors():
+    client = BrokenRedis()
+    redis = RedisCache(client, retry_after=60)
+
+    await redis.set("k", 1)
+    assert await redis.get("k") is None
+    await redis.delete("k")
+
+    # Solo la primera operación llega a Redis; las demás se omiten durante retry_after
+    assert client.calls == 1
+    stats = redis.stats()
+    assert stats["available"] is False
+    assert stats["errors"] == 1
+    assert stats["misses"] == 1
+
+
+async def test_retries_redis_after_back_off(monkeypatch):
+    client = BrokenRedis()
+    redis = RedisCache(client, retry_after=60)
+    await redis.get("k")
+
+    now = cache.time.monotonic()
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now + 61)
+
+    assert await redis.get("k") is None
+    assert client.calls == 2
+
+
+async def test_unreachable_redis_fails_open():
+    client = fakeredis.FakeAsyncRedis(connected=False)
+    redis = RedisCache(client)
+
+    await redis.set("k", 1)
+    assert await redis.get("k") is None
+    assert redis.stats()["errors"] == 1
+
+
+async def test_tiered_cache_promotes_l2_hits_to_l1(redis_client):
+    l1 = LRUTTLCache(max_entries=10)
+    l2 = RedisCache(redis_client, prefix="t:")
+    tiered = TieredCache(l1, l2)
+    await l2.set("k", {"v": 1})
+
+    assert await tiered.get("k") == {"v": 1}
+    assert await l1.get("k") == {"v": 1}
+
+    # La segunda lectura se sirve desde L1 sin consultar L2
+    assert await tiered.get("k") == {"v": 1}
+    assert l2.stats()["hits"] == 1
+
+
+async def test_tiered_cache_writes_both_levels(redis_client):
+    l1 = LRUTTLCache(max_entries=10)
+    l2 = RedisCache(redis_client, prefix="t:")
+    tiered = TieredCache(l1, l2)
+
+    await tiered.set("k", [1, 2], ttl=120)
+
+    assert await l1.get("k") == [1, 2]
+    assert await l2.get("k") == [1, 2]
+    assert 110 <= await redis_client.ttl("t:k") <= 120
+
+    await tiered.delete("k")
+    assert await l1.get("k") is None
+    assert await l2.get("k") is None
+
+
+async def test_tiered_cache_serves_l1_when_l2_is_down():
+    l1 = LRUTTLCache(max_entries=10)
+    tiered = TieredCache(l1, RedisCache(BrokenRedis()))
+
+    await tiered.set("k", "valor")
+
+    assert await tiered.get("k") == "valor"
+    assert await tiered.get("otra") is None
+
+
+def test_build_cache_without_redis_url_is_memory_only():
+    assert isinstance(build_cache("search", 10, 0, 60), LRUTTLCache)
+
+
+def test_build_cache_with_redis_url_is_tiered(monkeypatch):
+    client = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(cache, "get_redis_client", lambda url: client)
+
+    built = build_cache("search", 10, 0, 60, redis_url="redis://localhost:6379/0")
+
+    assert isinstance(built, TieredCache)
+    assert built.l2.prefix == "mcp-serper:search:"
+    assert built.l2.default_ttl == 60
+
+
+def test_build_cache_falls_back_without_redis_package(monkeypatch):
+    monkeypatch.setattr(cache, "get_redis_client", lambda url: None)
+
+    assert isinstance(build_cache("pages", 10, 0, 60, redis_url="redis://x"), LRUTTLCache)
+
+
+class SlowCall:
+    """Operación que cuenta sus ejecuciones y espera hasta que se libera."""
+
+    def __init__(self):
+        self.calls = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return "ok"
+
+
+async def test_singleflight_shares_one_call():
+    flight, call = SingleFlight(), SlowCall()
+    waiters = [asyncio.ensure_future(flight.do("k", call)) for _ in range(3)]
+    await asyncio.sleep(0)
+    call.release.set()
+
+    assert await asyncio.gather(*waiters) == ["ok"] * 3
+    assert call.calls == 1
+    assert flight.stats()["coalesced"] == 2
+    assert "k" not in flight
+
+
+async def test_singleflight_shares_the_exception():
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise ValueError("fallo")
+
+    results = await asyncio.gather(flight.do("k", failing), flight.do("k", failing), return_exceptions=True)
+
+    assert [type(result) for result in results] == [ValueError, ValueError]
+
+
+async def test_singleflight_cancelling_one_waiter_keeps_the_call():
+    flight, call = SingleFlight(), SlowCall()
+    first = asyncio.ensure_future(flight.do("k", call))
+    second = asyncio.ensure_future(flight.do("k", call))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    call.release.set()
+
+    assert await second == "ok"
+    assert first.cancelled()
+    assert not call.cancelled
+
+
+async def test_singleflight_cancels_the_call_when_last_waiter_leaves():
+    flight, call = SingleFlight(), SlowCall()
+    waiters = [asyncio.ensure_future(flight.do("k", call)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert call.cancelled
+    assert "k" not in flight
@@ -0,0 +1,92 @@
+"""Pruebas de que cancelar un trabajo detiene el trabajo HTTP en curso."""
+
+import asyncio
+
+import httpx
+
+import mcp_serper
+from jobs import JobManager
+
+
+async def ignore(client_id, data):
+    pass
+
+
+def idle_for(seconds):
+    async def client_idle(client_id):
+        return seconds
+
+    return client_idle
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+class HangingStream(httpx.AsyncByteStream):
+    """Cuerpo que envía un fragmento y se queda esperando, como un servidor lento."""
+
+    def __init__(self):
+        self.sent_first = False
+        self.closed = False
+
+    async def __aiter__(self):
+        yield b"<html><head><title>Lenta</title></head><body>"
+        self.sent_first = True
+        await asyncio.sleep(30)
+        yield b"</body></html>"
+
+    async def aclose(self):
+        self.closed = True
+
+
+async def test_cancel_aborts_the_in_flight_serper_request(serper):
+    serper.search_delay = 30
+    manager = JobManager(ignore, idle_for(0))
+
+    job, _ = await manager.submit("a", "search", {"q": "asyncio"}, lambda job: mcp_serper.search_web("asyncio"))
+    await wait_for(lambda: serper.searches)
+
+    assert manager.cancel("a") == 1
+    await asyncio.wait_for(asyncio.gather(job.task, return_exceptions=True), 1)
+
+    assert job.status == "cancelled"
+    # La solicitud compartida se cancela al no quedar nadie esperándola
+    assert mcp_serper.search_flights.stats()["in_flight"] == 0
+
+
+async def test_cancel_closes_the_open_download_stream(serper, monkeypatch):
+    stream = HangingStream()
+
+    async def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html"}, stream=stream)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(mcp_serper, "get_http_client", lambda profile: client)
+    manager = JobManager(ignore, idle_for(0))
+
+    job, _ = await manager.submit("a", "fetch", {"url": "x"}, lambda job: mcp_serper.fetch_url("https://slow.example.com/"))
+    await wait_for(lambda: stream.sent_first)
+    manager.cancel("a")
+    await asyncio.wait_for(asyncio.gather(job.task, return_exceptions=True), 1)
+    await client.aclose()
+
+    assert job.status == "cancelled"
+    assert stream.closed
+    assert mcp_serper.page_flights.stats()["in_flight"] == 0
+
+
+async def test_reaper_cancels_jobs_of_disconnected_clients(serper):
+    serper.search_delay = 30
+    manager = JobManager(ignore, idle_for(120), idle_timeout=60)
+
+    job, _ = await manager.submit("a", "search", {"q": "asyncio"}, lambda job: mcp_serper.search_web("asyncio"))
+    await wait_for(lambda: serper.searches)
+
+    assert await manager.reap() == 1
+    await asyncio.wait_for(asyncio.gather(job.task, return_exceptions=True), 1)
+    assert job.status == "cancelled"
+    assert manager.stats()["reaped"] == 1
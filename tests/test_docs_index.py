@@ -0,0 +1,55 @@
+"""Pruebas del índice local BM25."""
+
+from docs_index import DocsIndex
+
+
+def build_index():
+    index = DocsIndex({"python": "docs.python.org/3"})
+    index.add("https://docs.python.org/3/library/asyncio-task.html", "Coroutines and Tasks",
+              "Use asyncio gather to run awaitables concurrently in Python.")
+    index.add("https://docs.python.org/3/tutorial/index.html", "Python Tutorial",
+              "Python is an easy to learn programming language. Use it for scripting.")
+    index.add("https://docs.python.org/3/library/os.html", "os module",
+              "Miscellaneous operating system interfaces for Python.")
+    return index
+
+
+def test_coverage_counts_matched_query_terms():
+    hits = build_index().search("asyncio gather python", limit=5)
+
+    coverage = {hit["link"].rsplit("/", 1)[1]: hit["coverage"] for hit in hits}
+    assert coverage["asyncio-task.html"] == 1.0
+    assert coverage["index.html"] == round(1 / 3, 4)
+    assert coverage["os.html"] == round(1 / 3, 4)
+    assert hits[0]["link"].endswith("asyncio-task.html")
+
+
+def test_search_filters_by_library():
+    hits = build_index().search("python", library="python")
+
+    assert len(hits) == 3
+    assert build_index().search("python", library="django") == []
+
+
+def test_matches_site_by_host_suffix_and_path_prefix():
+    matches = DocsIndex._matches_site
+
+    assert matches("python.org/about", "python.org")
+    assert matches("docs.python.org/3/library", "python.org")
+    assert matches("www.python.org/", "python.org")
+    assert not matches("python.org.evil.com/", "python.org")
+    assert not matches("notpython.org/", "python.org")
+    assert matches("docs.python.org/3/library/os.html", "docs.python.org/3")
+    assert matches("docs.python.org/3", "docs.python.org/3/")
+    assert not matches("docs.python.org/3.12/library", "docs.python.org/3")
+    assert not matches("docs.python.org/2/library", "docs.python.org/3")
+
+
+def test_site_filter_rejects_lookalike_hosts():
+    index = DocsIndex()
+    index.add("https://python.org.evil.com/asyncio", "asyncio", "asyncio gather")
+    index.add("https://docs.python.org/3/asyncio", "asyncio", "asyncio gather")
+
+    hits = index.search("asyncio", site="python.org")
+
+    assert [hit["link"] for hit in hits] == ["https://docs.python.org/3/asyncio"]
@@ -0,0 +1,73 @@
+"""Pruebas de get_docs_multi: combinación sin duplicados y resultados parciales."""
+
+import mcp_serper
+
+
+def set_results(serper, query, library, links):
+    """Fija los enlaces que Serper devuelve para la búsqueda de una biblioteca."""
+    _, payload, _ = mcp_serper._build_search(query, mcp_serper.docs_urls[library], 2)
+    serper.results[payload["q"]] = [
+        {"title": f"{library} {i}", "link": link, "snippet": "..."} for i, link in enumerate(links)
+    ]
+
+
+def test_merge_interleaves_by_rank_and_dedupes_urls():
+    merged = mcp_serper._merge_results({
+        "python": [{"url": "https://a/1"}, {"url": "https://a/2"}],
+        "fastapi": [{"url": "https://b/1"}, {"url": "https://A/1#intro"}, {"url": "https://b/3"}],
+    })
+
+    assert [item["url"] for item in merged] == ["https://a/1", "https://b/1", "https://a/2", "https://b/3"]
+    assert merged[0]["libraries"] == ["python", "fastapi"]
+    assert merged[1]["libraries"] == ["fastapi"]
+
+
+async def test_shared_url_is_returned_once(serper):
+    set_results(serper, "routing", "python", ["https://shared.example.com/x", "https://py.example.com/1"])
+    set_results(serper, "routing", "fastapi", ["https://fa.example.com/1", "https://shared.example.com/x"])
+
+    result = await mcp_serper.get_docs_multi("routing", ["python", "fastapi"], num_results=2)
+
+    urls = [item["url"] for item in result["results"]]
+    assert urls.count("https://shared.example.com/x") == 1
+    assert result["total"] == 3
+    assert result["partial"] is False
+    assert result["libraries"]["python"] == {"status": "ok", "total": 2}
+
+
+async def test_slow_search_is_reported_as_timeout(serper):
+    serper.search_delay = 1.0
+
+    result = await mcp_serper.get_docs_multi("routing", ["python"], num_results=2, timeout=0.05)
+
+    assert result["libraries"]["python"] == {"status": "timeout"}
+    assert result["results"] == []
+    assert result["partial"] is True
+
+
+async def test_slow_content_keeps_search_results(serper):
+    set_results(serper, "routing", "python", ["https://py.example.com/1", "https://py.example.com/2"])
+    set_results(serper, "routing", "fastapi", ["https://fa.example.com/fast", "https://fa.example.com/slow"])
+    serper.page_delay = lambda url: 1.0 if url.endswith("/slow") else 0.0
+
+    result = await mcp_serper.get_docs_multi(
+        "routing", ["python", "fastapi"], num_results=2, with_content=True, timeout=0.5
+    )
+
+    assert result["libraries"]["python"]["status"] == "ok"
+    assert result["libraries"]["fastapi"] == {"status": "partial", "total": 2, "content": "timeout"}
+    assert result["partial"] is True
+    by_url = {item["url"]: item for item in result["results"]}
+    assert len(by_url) == 4
+    # El contenido ya descargado se conserva; el pendiente se omite
+    assert "content" in by_url["https://fa.example.com/fast"]
+    assert "content" not in by_url["https://fa.example.com/slow"]
+
+
+async def test_unsupported_library_is_rejected(serper):
+    try:
+        await mcp_serper.get_docs_multi("routing", ["python", "cobol"])
+    except Exception as e:
+        assert "cobol" in str(e)
+    else:
+        raise AssertionError("se esperaba un error")
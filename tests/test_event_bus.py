@@ -0,0 +1,90 @@
+"""Pruebas del bus de eventos sobre Redis con dos workers simulados."""
+
+import asyncio
+
+import fakeredis
+import pytest
+import redis.asyncio
+
+from event_bus import RedisEventBus
+
+
+@pytest.fixture
+async def buses(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.asyncio, "from_url", lambda url, **kwargs: fakeredis.FakeAsyncRedis(server=server))
+    pair = [RedisEventBus("redis://fake", session_ttl=60), RedisEventBus("redis://fake", session_ttl=60)]
+    yield pair
+    for bus in pair:
+        await bus.close()
+
+
+async def wait_for(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+
+async def noop(*args):
+    pass
+
+
+async def test_events_are_routed_to_the_session_owner(buses):
+    first, second = buses
+    received = []
+
+    async def on_event(client_id, data):
+        received.append((client_id, data))
+
+    await first.start(on_event, noop)
+    await second.start(noop, noop)
+    await wait_for(lambda: first.stats()["listening"])
+    await asyncio.sleep(0.05)
+    await first.register_session("c1")
+
+    assert await second.publish_event("c1", {"type": "progress"})
+    await wait_for(lambda: received)
+    assert received == [("c1", {"type": "progress"})]
+
+
+async def test_adoption_moves_ownership_and_invalidates_routes(buses):
+    first, second = buses
+    released = []
+    third_party_routes = []
+
+    async def on_adopt(client_id):
+        released.append(client_id)
+        third_party_routes.append(first._routes.get(client_id))
+
+    await first.start(noop, noop, on_adopt)
+    await second.start(noop, noop)
+    await asyncio.sleep(0.05)
+
+    await first.register_session("c1", disconnected_at=0.0)
+    # El primer worker recuerda su propia ruta, como haría con una sesión remota
+    assert await first._route("c1") == first.worker_id
+
+    await second.adopt_session("c1")
+    await wait_for(lambda: released)
+
+    assert released == ["c1"]
+    assert third_party_routes == [None]
+    assert await first.session_owner("c1") == second.worker_id
+    assert await first.session_idle("c1") == 0.0
+
+
+async def test_session_owner_is_none_for_unknown_sessions(buses):
+    first, _ = buses
+
+    assert await first.session_owner("desconocida") is None
+
+
+async def test_messages_without_handlers_are_dropped(buses):
+    bus = buses[0]
+
+    await bus._handle(b'{"t": "event", "c": "c1", "d": {}}')
+    await bus._handle(b'{"t": "cancel", "c": "c1", "w": "otro"}')
+
+    assert bus.stats()["errors"] == 0
+    assert bus.stats()["delivered"] == 0
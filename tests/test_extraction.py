@@ -0,0 +1,77 @@
+"""Pruebas del pool de extracción HTML."""
+
+import asyncio
+import threading
+
+import extraction
+from extraction import ExtractionPool
+
+HTML = b"<html><head><title>Docs</title></head><body><main><p>Contenido</p></main></body></html>"
+
+
+async def test_extract_counts_completed_results():
+    pool = ExtractionPool("thread", workers=1)
+    try:
+        result = await pool.extract(HTML, "utf-8")
+    finally:
+        pool.shutdown()
+
+    assert result["title"] == "Docs"
+    assert pool.stats()["completed"] == 1
+    assert pool.stats()["pending"] == 0
+
+
+async def test_cancelled_extraction_is_not_completed(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_extract(*args):
+        started.set()
+        release.wait(5)
+        return {"title": None, "content": ""}
+
+    monkeypatch.setattr(extraction, "extract_document", slow_extract)
+    pool = ExtractionPool("thread", workers=1)
+    task = asyncio.ensure_future(pool.extract(HTML))
+    await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    release.set()
+    pool.shutdown()
+
+    stats = pool.stats()
+    assert stats["cancelled"] == 1
+    assert stats["completed"] == 0
+    assert stats["pending"] == 0
+
+
+async def test_cancelled_queued_extraction_never_runs(monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_extract(*args):
+        calls.append(args[0])
+        started.set()
+        release.wait(5)
+        return {"title": None, "content": ""}
+
+    monkeypatch.setattr(extraction, "extract_document", slow_extract)
+    pool = ExtractionPool("thread", workers=1)
+    running = asyncio.ensure_future(pool.extract(b"primera"))
+    await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+    queued = asyncio.ensure_future(pool.extract(b"segunda"))
+    await asyncio.sleep(0)
+
+    # La segunda espera a que quede libre el único hilo; cancelarla la retira del pool
+    queued.cancel()
+    await asyncio.gather(queued, return_exceptions=True)
+    release.set()
+    await running
+    pool.shutdown()
+
+    assert calls == [b"primera"]
+    assert pool.stats()["cancelled"] == 1
+    assert pool.stats()["completed"] == 1
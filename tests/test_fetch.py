@@ -0,0 +1,58 @@
+"""Pruebas de la descarga acotada de páginas."""
+
+import httpx
+
+import mcp_serper
+from extraction import decode_body
+
+
+async def read(chunks, max_bytes):
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    response = httpx.Response(200, content=stream())
+    return await mcp_serper._read_capped_body(response, max_bytes)
+
+
+async def test_body_under_cap_is_complete():
+    body, truncated = await read([b"abc", b"def"], 10)
+
+    assert (body, truncated) == (b"abcdef", False)
+
+
+async def test_body_exactly_at_cap_is_not_truncated():
+    body, truncated = await read([b"abc", b"def"], 6)
+
+    assert (body, truncated) == (b"abcdef", False)
+
+
+async def test_chunked_body_larger_than_cap_is_cut():
+    chunks = [b"x" * 1000 for _ in range(10)]
+
+    body, truncated = await read(chunks, 2500)
+
+    assert len(body) == 2500
+    assert truncated is True
+
+
+async def test_multibyte_character_split_across_chunks():
+    text = "año " * 10
+    data = text.encode("utf-8")
+    # Cada "ñ" ocupa dos bytes; cortar los trozos en mitad de uno
+    split = data.index("ñ".encode("utf-8")) + 1
+    body, truncated = await read([data[:split], data[split:]], len(data))
+
+    assert truncated is False
+    assert decode_body(body, "utf-8") == text
+
+
+async def test_cap_inside_multibyte_character_drops_partial_character():
+    data = "ñññ".encode("utf-8")
+
+    body, truncated = await read([data[:3], data[3:]], 3)
+
+    assert body == data[:3]
+    assert truncated is True
+    # El byte suelto del carácter cortado no se decodifica como basura
+    assert decode_body(body, "utf-8", truncated=True) == "ñ"
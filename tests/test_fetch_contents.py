@@ -0,0 +1,79 @@
+"""Pruebas de la descarga en paralelo del contenido de los resultados."""
+
+import asyncio
+
+import pytest
+
+import mcp_serper
+
+
+class FakeFetch:
+    """Sustituye a fetch_url: cada URL tarda lo indicado y se mide la concurrencia."""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, url):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delays.get(url, 0))
+            if url.endswith("/broken"):
+                raise ValueError("conexión rechazada")
+            return {"title": url, "content": f"contenido de {url}"}
+        finally:
+            self.active -= 1
+
+
+def make_items(*urls):
+    return [{"title": url, "url": url, "snippet": ""} for url in urls]
+
+
+@pytest.fixture
+def fake_fetch(monkeypatch):
+    def install(delays=None):
+        fake = FakeFetch(delays or {})
+        monkeypatch.setattr(mcp_serper, "fetch_url", fake)
+        return fake
+
+    return install
+
+
+async def test_results_keep_their_order_and_stream_as_they_finish(fake_fetch):
+    fake_fetch({"https://x/slow": 0.05})
+    items = make_items("https://x/slow", "https://x/fast")
+    streamed = []
+
+    async def callback(data, error=False):
+        if "content" in data:
+            streamed.append(data["content"]["source"])
+
+    await mcp_serper._fetch_contents(items, callback, max_concurrency=2)
+
+    assert streamed == ["https://x/fast", "https://x/slow"]
+    assert [item["content"] for item in items] == ["contenido de https://x/slow", "contenido de https://x/fast"]
+
+
+async def test_downloads_respect_max_concurrency(fake_fetch):
+    fake = fake_fetch({f"https://x/{i}": 0.01 for i in range(6)})
+    items = make_items(*(f"https://x/{i}" for i in range(6)))
+
+    await mcp_serper._fetch_contents(items, None, max_concurrency=2)
+
+    assert fake.max_active == 2
+    assert all("content" in item for item in items)
+
+
+async def test_failed_page_does_not_affect_the_rest(fake_fetch):
+    fake_fetch()
+    items = make_items("https://x/ok", "https://x/broken", "")
+
+    await mcp_serper._fetch_contents(items, None, max_concurrency=4)
+
+    assert items[0]["content"] == "contenido de https://x/ok"
+    assert items[1]["content"] == ""
+    assert "conexión rechazada" in items[1]["error"]
+    # Un resultado sin URL no se descarga
+    assert "content" not in items[2]
@@ -0,0 +1,128 @@
+"""Pruebas del gestor de trabajos en segundo plano."""
+
+import asyncio
+
+from jobs import Job, JobManager
+
+
+class Recorder:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, client_id, data):
+        self.sent.append((client_id, data))
+
+    def events(self, client_id):
+        return [data for cid, data in self.sent if cid == client_id]
+
+
+async def connected(client_id):
+    return 0.0
+
+
+def test_history_is_bounded_by_count():
+    job = Job("search", {}, "k", history_size=3, history_bytes=10000)
+
+    for i in range(5):
+        job.remember({"type": "progress", "n": i})
+
+    assert [event["n"] for event, _ in job.events] == [2, 3, 4]
+    assert job.events_dropped == 2
+    catch_up = job.catch_up()
+    assert catch_up[0] == {"type": "gap", "missed": 2, "job_id": job.id}
+    assert [event["n"] for event in catch_up[1:]] == [2, 3, 4]
+
+
+def test_history_is_bounded_by_bytes():
+    job = Job("search", {}, "k", history_size=100, history_bytes=250)
+
+    for i in range(3):
+        job.remember({"type": "result", "content": "x" * 100, "n": i})
+
+    assert [event["n"] for event, _ in job.events] == [2]
+    assert job.events_dropped == 2
+
+
+async def test_new_subscriber_catches_up_once():
+    recorder = Recorder()
+    manager = JobManager(recorder.send, connected)
+    release = asyncio.Event()
+
+    async def run(job):
+        await manager.emit(job, {"type": "progress", "n": 1})
+        await release.wait()
+        return "ok"
+
+    job, deduplicated = await manager.submit("a", "search", {"q": 1}, run)
+    await asyncio.sleep(0)
+    assert not deduplicated
+
+    # Otra sesión recibe el evento ya emitido; la misma sesión no lo recibe dos veces
+    assert (await manager.submit("b", "search", {"q": 1}, run)) == (job, True)
+    assert (await manager.submit("a", "search", {"q": 1}, run)) == (job, True)
+    assert [e["type"] for e in recorder.events("a")] == ["progress"]
+    assert [e["type"] for e in recorder.events("b")] == ["progress"]
+
+    release.set()
+    await job.task
+    assert [e["type"] for e in recorder.events("a")] == ["progress", "job_end"]
+    assert [e["type"] for e in recorder.events("b")] == ["progress", "job_end"]
+    assert len(job.events) == 0
+
+
+async def test_events_emitted_during_catch_up_keep_their_order():
+    recorder = Recorder()
+    manager = JobManager(recorder.send, connected)
+    emit_more = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_send(client_id, data):
+        # El primer evento de la puesta al día tarda más que los siguientes
+        if client_id == "b" and data.get("n") == 0:
+            emit_more.set()
+            await asyncio.sleep(0.01)
+        await recorder.send(client_id, data)
+
+    manager.send = slow_send
+
+    async def run(job):
+        await manager.emit(job, {"type": "progress", "n": 0})
+        await emit_more.wait()
+        for n in (1, 2):
+            await manager.emit(job, {"type": "progress", "n": n})
+        await release.wait()
+        return "ok"
+
+    job, _ = await manager.submit("a", "search", {"q": 1}, run)
+    await asyncio.sleep(0)
+    await manager.submit("b", "search", {"q": 1}, run)
+    release.set()
+    await job.task
+
+    assert [e.get("n", e["type"]) for e in recorder.events("b")] == [0, 1, 2, "job_end"]
+
+
+async def test_job_ending_during_catch_up_still_notifies_the_subscriber():
+    recorder = Recorder()
+    manager = JobManager(recorder.send, connected)
+    finish = asyncio.Event()
+
+    async def slow_send(client_id, data):
+        if client_id == "b" and data["type"] == "progress":
+            finish.set()
+            await asyncio.sleep(0.01)
+        await recorder.send(client_id, data)
+
+    manager.send = slow_send
+
+    async def run(job):
+        await manager.emit(job, {"type": "progress", "n": 0})
+        await finish.wait()
+        return "ok"
+
+    job, _ = await manager.submit("a", "search", {"q": 1}, run)
+    await asyncio.sleep(0)
+    await manager.submit("b", "search", {"q": 1}, run)
+    await job.task
+
+    assert [e["type"] for e in recorder.events("b")] == ["progress", "job_end"]
@@ -0,0 +1,73 @@
+"""Pruebas de la exposición de métricas en formato de texto de Prometheus."""
+
+import pytest
+
+from metrics import Counter, Histogram, Registry, gauge_family
+
+
+def test_counter_exposition():
+    registry = Registry()
+    requests = registry.register(Counter("app_requests", "Solicitudes", ("method", "status")))
+    requests.labels("GET", 200).inc()
+    requests.labels("GET", 200).inc(2)
+    requests.labels("POST", 500).inc()
+
+    assert registry.render() == (
+        "# HELP app_requests Solicitudes\n"
+        "# TYPE app_requests counter\n"
+        'app_requests_total{method="GET",status="200"} 3\n'
+        'app_requests_total{method="POST",status="500"} 1\n'
+    )
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    errors = registry.register(Counter("app_errors", "Errores", ("message",)))
+    errors.labels('a "b"\\\nc').inc()
+
+    assert 'app_errors_total{message="a \\"b\\"\\\\\\nc"} 1' in registry.render()
+
+
+def test_wrong_number_of_labels_is_rejected():
+    requests = Counter("app_requests", "Solicitudes", ("method",))
+
+    with pytest.raises(ValueError):
+        requests.labels("GET", 200)
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    registry = Registry()
+    latency = registry.register(Histogram("app_seconds", "Latencia", buckets=(0.1, 1.0, 0.5)))
+    for value in (0.05, 0.1, 0.3, 2.0):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()
+
+    assert lines[1] == "# TYPE app_seconds histogram"
+    # Los límites se ordenan y cada uno incluye las observaciones iguales a él
+    assert lines[2:] == [
+        'app_seconds_bucket{le="0.1"} 2',
+        'app_seconds_bucket{le="0.5"} 3',
+        'app_seconds_bucket{le="1"} 3',
+        'app_seconds_bucket{le="+Inf"} 4',
+        "app_seconds_sum 2.45",
+        "app_seconds_count 4",
+    ]
+
+
+def test_histogram_labels_come_before_le():
+    registry = Registry()
+    latency = registry.register(Histogram("app_seconds", "Latencia", ("endpoint",), buckets=(1.0,)))
+    latency.labels("search").observe(0.5)
+
+    assert 'app_seconds_bucket{endpoint="search",le="1"} 1' in registry.render()
+
+
+def test_collectors_are_rendered_on_each_call():
+    registry = Registry()
+    value = [1]
+    registry.register_collector(lambda: [gauge_family("app_sessions", "Sesiones", value[0], {"worker": "w1"})])
+
+    assert 'app_sessions{worker="w1"} 1' in registry.render()
+    value[0] = 5
+    assert registry.render().endswith('# TYPE app_sessions gauge\napp_sessions{worker="w1"} 5\n')
@@ -0,0 +1,107 @@
+"""Pruebas del almacén persistente de páginas."""
+
+import pytest
+
+from page_store import PageStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    page_store = PageStore(str(tmp_path / "pages.sqlite3"))
+    yield page_store
+    page_store.close_sync()
+
+
+def page(content="Contenido de la página", truncated=False):
+    return {"title": "Docs", "content": content, "url": "https://docs.example.com/a", "truncated": truncated}
+
+
+def test_round_trip_keeps_page_and_headers(store):
+    store.put_sync("docs.example.com/a", page(), etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+
+    stored = store.get_sync("docs.example.com/a")
+
+    assert stored.page == page()
+    assert stored.etag == '"v1"'
+    assert stored.last_modified == "Mon, 01 Jan 2024 00:00:00 GMT"
+    assert stored.limit is None
+
+
+def test_truncated_page_keeps_its_byte_limit(store):
+    store.put_sync("docs.example.com/a", page(truncated=True), limit=1000)
+
+    stored = store.get_sync("docs.example.com/a")
+
+    assert stored.page["truncated"] is True
+    assert stored.limit == 1000
+
+
+def test_missing_page_is_none(store):
+    assert store.get_sync("docs.example.com/none") is None
+
+
+def accessed_at(store, url):
+    return store._connect().execute("SELECT accessed_at FROM pages WHERE url = ?", (url,)).fetchone()[0]
+
+
+def test_reads_buffer_access_times_until_flush(store):
+    store.put_sync("docs.example.com/a", page())
+    written = accessed_at(store, "docs.example.com/a")
+
+    store.get_sync("docs.example.com/a")
+
+    assert accessed_at(store, "docs.example.com/a") == written
+    assert store.flush_accessed_sync() == 1
+    assert accessed_at(store, "docs.example.com/a") > written
+    assert store.flush_accessed_sync() == 0
+
+
+def test_gc_evicts_by_buffered_access_times(tmp_path):
+    store = PageStore(str(tmp_path / "pages.sqlite3"), access_flush=3600)
+    for name in ("a", "b"):
+        store.put_sync(f"docs.example.com/{name}", page(content=name * 1000))
+    # "a" se escribió antes pero se ha leído después que "b"
+    store.get_sync("docs.example.com/a")
+
+    result = store.gc_sync(max_bytes=store._bytes - 1)
+
+    assert result["removed"] == 1
+    assert store.get_sync("docs.example.com/a") is not None
+    assert store.get_sync("docs.example.com/b") is None
+    store.close_sync()
+
+
+def test_complete_page_has_no_byte_cap(store):
+    store.put_sync("docs.example.com/a", page(), limit=1000)
+
+    row = store._connect().execute("SELECT truncated, byte_cap FROM pages").fetchone()
+
+    assert row == (0, None)
+    assert store.get_sync("docs.example.com/a").limit is None
+
+
+def test_truncated_flag_and_byte_cap_are_separate_columns(store):
+    store.put_sync("docs.example.com/a", page(truncated=True), limit=500000)
+
+    row = store._connect().execute("SELECT truncated, byte_cap FROM pages").fetchone()
+
+    assert row == (1, 500000)
+
+
+def test_adds_byte_cap_column_to_older_files(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "old.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE pages (url TEXT PRIMARY KEY, final_url TEXT NOT NULL, title TEXT, body BLOB NOT NULL, "
+        "truncated INTEGER NOT NULL DEFAULT 0, etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL, "
+        "accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+    )
+    conn.close()
+    old = PageStore(path)
+
+    old.put_sync("docs.example.com/a", page(truncated=True), limit=1000)
+
+    assert old.get_sync("docs.example.com/a").limit == 1000
+    old.close_sync()
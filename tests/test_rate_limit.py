@@ -0,0 +1,113 @@
+"""Pruebas del limitador de tasa con prioridades."""
+
+import asyncio
+
+import pytest
+
+from rate_limit import RateLimiter, current_priority, request_priority
+
+
+async def drain(limiter):
+    """Consume el token inicial para que las siguientes solicitudes esperen."""
+    assert await limiter.acquire() == 0.0
+
+
+async def test_grants_immediately_with_tokens():
+    limiter = RateLimiter(rate=10, burst=2)
+
+    assert await limiter.acquire() == 0.0
+    assert await limiter.acquire() == 0.0
+    assert limiter.stats()["granted"] == 2
+
+
+async def test_serves_by_priority_then_arrival():
+    limiter = RateLimiter(rate=50, burst=1)
+    await drain(limiter)
+    order = []
+
+    async def request(name, priority):
+        await limiter.acquire(priority=priority)
+        order.append(name)
+
+    tasks = [
+        asyncio.ensure_future(request("background", "background")),
+        asyncio.ensure_future(request("batch", "batch")),
+        asyncio.ensure_future(request("interactive-1", "interactive")),
+        asyncio.ensure_future(request("interactive-2", "interactive")),
+    ]
+    await asyncio.gather(*tasks)
+
+    assert order == ["interactive-1", "interactive-2", "batch", "background"]
+
+
+async def test_rejects_when_estimated_wait_exceeds_deadline():
+    limiter = RateLimiter(rate=1, burst=1)
+    await drain(limiter)
+
+    with pytest.raises(Exception, match="espera estimada"):
+        await limiter.acquire(timeout=0.1)
+    assert limiter.stats()["rejected_deadline"] == 1
+    assert limiter.estimate_wait() == pytest.approx(1.0, abs=0.05)
+
+
+async def test_rejects_when_queue_is_full():
+    limiter = RateLimiter(rate=1, burst=1, max_queue=1)
+    await drain(limiter)
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(Exception, match="cola llena"):
+        await limiter.acquire()
+    waiter.cancel()
+
+
+async def test_cancelled_waiters_free_queue_and_estimates():
+    limiter = RateLimiter(rate=1, burst=1, max_queue=3)
+    await drain(limiter)
+    waiters = [asyncio.ensure_future(limiter.acquire(priority="background")) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert limiter.estimate_wait(priority="background") == pytest.approx(4.0, abs=0.05)
+
+    # Se cancelan las dos últimas: siguen en el fondo del heap, no en la cima
+    for waiter in waiters[1:]:
+        waiter.cancel()
+    await asyncio.gather(*waiters[1:], return_exceptions=True)
+
+    assert limiter._queued_cost[2] == 1.0
+    assert limiter.estimate_wait(priority="background") == pytest.approx(2.0, abs=0.05)
+    assert limiter.stats()["queue_depth"]["background"] == 1
+    extra = asyncio.ensure_future(limiter.acquire(priority="background"))
+    await asyncio.sleep(0)
+    assert not extra.done()
+    for task in (waiters[0], extra):
+        task.cancel()
+    await asyncio.gather(waiters[0], extra, return_exceptions=True)
+    assert limiter._queued_cost[2] == 0.0
+    assert limiter._waiters == []
+
+
+async def test_pause_after_429_delays_requests():
+    limiter = RateLimiter(rate=0, burst=1)
+    assert not limiter.limited
+
+    limiter.pause(0.2)
+    assert limiter.estimate_wait() == pytest.approx(0.2, abs=0.05)
+    with pytest.raises(Exception, match="espera estimada"):
+        await limiter.acquire(timeout=0.05)
+
+    waited = await limiter.acquire(timeout=1)
+    assert waited >= 0.15
+    assert limiter.stats()["pauses"] == 1
+
+
+async def test_priority_propagates_to_child_tasks():
+    async def child():
+        return current_priority()
+
+    with request_priority("background"):
+        task = asyncio.ensure_future(child())
+    assert await task == "background"
+    assert current_priority() == "interactive"
+    with pytest.raises(ValueError):
+        with request_priority("urgente"):
+            pass
@@ -0,0 +1,190 @@
+"""Pruebas del circuit breaker, los reintentos y el hedging por host."""
+
+import asyncio
+
+import pytest
+
+import resilience
+from resilience import HostResilience
+
+
+class Clock:
+    """Reloj monotónico controlado por la prueba."""
+
+    def __init__(self, monkeypatch):
+        self.now = 1000.0
+        monkeypatch.setattr(resilience.time, "monotonic", lambda: self.now)
+
+
+def failing(calls):
+    async def attempt(remaining):
+        calls.append(remaining)
+        raise ConnectionError("sin conexión")
+    return attempt
+
+
+def returning(value, calls=None):
+    async def attempt(remaining):
+        if calls is not None:
+            calls.append(remaining)
+        return value
+    return attempt
+
+
+def is_failure(status):
+    return status >= 500
+
+
+async def no_sleep(delay):
+    pass
+
+
+async def test_circuit_opens_and_fails_fast(monkeypatch):
+    clock = Clock(monkeypatch)
+    breaker = HostResilience(retries=0, threshold=2, cooldown=30)
+    calls = []
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await breaker.call("h", failing(calls), 10, is_failure)
+    assert breaker.stats()["unhealthy"]["h"]["state"] == "open"
+
+    clock.now += 10
+    with pytest.raises(Exception, match="Circuito abierto"):
+        await breaker.call("h", failing(calls), 10, is_failure)
+    assert len(calls) == 2
+    assert breaker.stats()["short_circuited"] == 1
+
+
+async def test_half_open_probe_success_closes_circuit(monkeypatch):
+    clock = Clock(monkeypatch)
+    breaker = HostResilience(retries=0, threshold=1, cooldown=30)
+    with pytest.raises(ConnectionError):
+        await breaker.call("h", failing([]), 10, is_failure)
+
+    clock.now += 31
+    assert await breaker.call("h", returning(200), 10, is_failure) == 200
+
+    assert breaker.stats()["unhealthy"] == {}
+    assert await breaker.call("h", returning(200), 10, is_failure) == 200
+
+
+async def test_half_open_allows_a_single_probe(monkeypatch):
+    clock = Clock(monkeypatch)
+    breaker = HostResilience(retries=0, threshold=1, cooldown=30)
+    with pytest.raises(ConnectionError):
+        await breaker.call("h", failing([]), 10, is_failure)
+    clock.now += 31
+
+    breaker.check("h")
+    with pytest.raises(Exception, match="Circuito abierto"):
+        breaker.check("h")
+
+
+async def test_half_open_probe_failure_reopens_circuit(monkeypatch):
+    clock = Clock(monkeypatch)
+    breaker = HostResilience(retries=3, threshold=1, cooldown=30)
+    with pytest.raises(ConnectionError):
+        await breaker.call("h", failing([]), 10, is_failure)
+    clock.now += 31
+
+    calls = []
+    # La prueba falla con un 503: sin reintentos, el circuito vuelve a abrirse
+    assert await breaker.call("h", returning(503, calls), 10, is_failure) == 503
+    assert len(calls) == 1
+    assert breaker.stats()["unhealthy"]["h"] == {"state": "open", "failures": 2, "retry_in": 30.0}
+    assert breaker.stats()["circuits_opened"] == 2
+
+
+async def test_retries_up_to_limit_with_bounded_backoff(monkeypatch):
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(resilience.asyncio, "sleep", sleep)
+    breaker = HostResilience(retries=3, backoff=0.1, backoff_max=0.25, threshold=0)
+    calls = []
+
+    with pytest.raises(ConnectionError):
+        await breaker.call("h", failing(calls), 10, is_failure)
+
+    assert len(calls) == 4
+    assert breaker.stats()["retries"] == 3
+    for retry, delay in enumerate(delays):
+        assert 0 <= delay <= min(0.25, 0.1 * 2 ** retry)
+
+
+def test_backoff_delay_uses_full_jitter(monkeypatch):
+    breaker = HostResilience(backoff=0.1, backoff_max=1.0)
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: high)
+
+    assert [breaker.backoff_delay(retry) for retry in range(5)] == pytest.approx([0.1, 0.2, 0.4, 0.8, 1.0])
+
+
+async def test_retryable_status_is_retried_then_succeeds(monkeypatch):
+    monkeypatch.setattr(resilience.asyncio, "sleep", no_sleep)
+    breaker = HostResilience(retries=2, threshold=0)
+    responses = iter([502, 503, 200])
+
+    async def attempt(remaining):
+        return next(responses)
+
+    assert await breaker.call("h", attempt, 10, is_failure) == 200
+    assert breaker.stats()["retries"] == 2
+
+
+async def test_other_exceptions_are_not_retried():
+    breaker = HostResilience(retries=3, threshold=1)
+
+    async def attempt(remaining):
+        raise ValueError("error del llamador")
+
+    with pytest.raises(ValueError):
+        await breaker.call("h", attempt, 10, is_failure, retry_on=(ConnectionError,))
+    assert breaker.stats()["attempts"] == 1
+    assert breaker.stats()["unhealthy"] == {}
+
+
+def warm_up(breaker, host, latency):
+    for _ in range(20):
+        breaker.record(host, True, latency)
+
+
+async def test_hedge_fires_only_after_p95_delay():
+    breaker = HostResilience(retries=0, hedge=True)
+    warm_up(breaker, "h", 0.05)
+    assert breaker.hedge_delay("h") == pytest.approx(0.05)
+    started = []
+
+    async def attempt(remaining):
+        started.append(asyncio.get_running_loop().time())
+        await asyncio.sleep(0.2 if len(started) == 1 else 0.01)
+        return len(started)
+
+    begin = asyncio.get_running_loop().time()
+    result = await breaker.call("h", attempt, 5, is_failure)
+
+    assert len(started) == 2
+    assert started[1] - begin >= 0.045
+    assert result == 2
+    assert breaker.stats()["hedges"] == 1
+    assert breaker.stats()["hedge_wins"] == 1
+
+
+async def test_no_hedge_when_first_answers_before_p95():
+    breaker = HostResilience(retries=0, hedge=True)
+    warm_up(breaker, "h", 0.2)
+    calls = []
+
+    assert await breaker.call("h", returning(200, calls), 5, is_failure) == 200
+
+    assert len(calls) == 1
+    assert breaker.stats()["hedges"] == 0
+
+
+def test_hedge_disabled_or_unhealthy_host():
+    assert HostResilience(hedge=False).hedge_delay("h") is None
+    breaker = HostResilience(hedge=True, threshold=1)
+    breaker.record("h", False)
+    assert breaker.hedge_delay("h") is None
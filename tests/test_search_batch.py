@@ -0,0 +1,52 @@
+"""Pruebas de search_batch: validación, consultas repetidas, caché y lotes."""
+
+import pytest
+
+import mcp_serper
+
+
+async def test_invalid_entry_rejects_the_whole_batch_before_logging(serper, monkeypatch):
+    recorded = []
+    monkeypatch.setattr(mcp_serper, "_record_query", lambda *args: recorded.append(args))
+
+    for bad in ("asyncio", {"site": "docs.python.org"}, {"query": "x", "num_results": "5"}):
+        with pytest.raises(Exception):
+            await mcp_serper.search_batch([{"query": "asyncio"}, bad])
+
+    assert recorded == []
+    assert serper.searches == []
+
+
+async def test_equivalent_queries_are_sent_once(serper):
+    result = await mcp_serper.search_batch([
+        {"query": "asyncio", "site": "docs.python.org", "num_results": 3},
+        {"query": "  asyncio ", "site": "docs.python.org", "num_results": 5},
+        {"query": "site:docs.python.org asyncio"},
+    ])
+
+    assert result["upstream_requests"] == 1
+    assert len(serper.searches[0]) == 1
+    assert [len(entry["result"]["organic"]) for entry in result["results"]] == [3, 5, 10]
+    assert result["total"] == 3
+    assert result["cached"] == 0
+
+
+async def test_cached_queries_are_not_sent_and_are_counted(serper):
+    await mcp_serper.search_batch([{"query": "asyncio"}])
+
+    result = await mcp_serper.search_batch([{"query": "asyncio"}, {"query": "asyncio"}, {"query": "httpx"}])
+
+    assert result["cached"] == 2
+    assert result["upstream_requests"] == 1
+    assert [body["q"] for body in serper.searches[1]] == ["httpx"]
+    assert [entry["cached"] for entry in result["results"]] == [True, True, False]
+
+
+async def test_pending_queries_are_split_in_chunks(serper, monkeypatch):
+    monkeypatch.setattr(mcp_serper, "SERPER_BATCH_SIZE", 2)
+
+    result = await mcp_serper.search_batch([{"query": f"q{i}"} for i in range(5)])
+
+    assert result["upstream_requests"] == 3
+    assert sorted(len(body) for body in serper.searches) == [1, 2, 2]
+    assert all("result" in entry for entry in result["results"])
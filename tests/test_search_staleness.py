@@ -0,0 +1,72 @@
+"""Pruebas de stale-while-revalidate y stale-if-error en search_web."""
+
+import asyncio
+import time
+
+import pytest
+
+import mcp_serper
+
+
+async def store_result(query, site, age, title="antiguo"):
+    """Guarda en caché un resultado obtenido hace `age` segundos."""
+    _, payload, cache_key = mcp_serper._build_search(query, site, 10)
+    entry = mcp_serper._search_entry({"organic": [{"title": title, "link": "https://x/1"}]}, payload["num"])
+    entry["fetched_at"] = time.time() - age
+    await mcp_serper.results_cache.set(cache_key, entry)
+    return cache_key
+
+
+async def test_fresh_hit_does_not_call_serper(serper):
+    await store_result("asyncio", "docs.python.org", age=10)
+
+    result = await mcp_serper.search_web("asyncio", "docs.python.org")
+
+    assert result["organic"][0]["title"] == "antiguo"
+    assert serper.searches == []
+
+
+async def test_stale_hit_returns_at_once_and_refreshes_once(serper, monkeypatch):
+    monkeypatch.setattr(mcp_serper, "SEARCH_STALE_WHILE_REVALIDATE", 600)
+    age = mcp_serper.SEARCH_CACHE_TTL + 60
+    cache_key = await store_result("asyncio", "docs.python.org", age=age)
+    serper.search_delay = 0.05
+    refreshes = mcp_serper.search_staleness["refreshes"]
+
+    first = await mcp_serper.search_web("asyncio", "docs.python.org")
+    second = await mcp_serper.search_web("asyncio", "docs.python.org")
+
+    # Ambas se sirven de la copia caducada sin esperar a Serper
+    assert first["organic"][0]["title"] == "antiguo"
+    assert second["organic"][0]["title"] == "antiguo"
+    assert mcp_serper.search_staleness["refreshes"] == refreshes + 1
+
+    await asyncio.gather(*mcp_serper._background_refreshes.values())
+    assert len(serper.searches) == 1
+    entry = await mcp_serper.results_cache.get(cache_key)
+    assert time.time() - entry["fetched_at"] < 5
+    assert (await mcp_serper.search_web("asyncio", "docs.python.org"))["organic"][0]["title"] != "antiguo"
+
+
+async def test_error_inside_stale_if_error_window_serves_last_result(serper, monkeypatch):
+    monkeypatch.setattr(mcp_serper, "SEARCH_STALE_WHILE_REVALIDATE", 0)
+    monkeypatch.setattr(mcp_serper, "SEARCH_STALE_IF_ERROR", 3600)
+    await store_result("asyncio", "docs.python.org", age=mcp_serper.SEARCH_CACHE_TTL + 60)
+    serper.status = 503
+    served = mcp_serper.search_staleness["stale_if_error"]
+
+    result = await mcp_serper.search_web("asyncio", "docs.python.org")
+
+    assert result["organic"][0]["title"] == "antiguo"
+    assert len(serper.searches) == 1
+    assert mcp_serper.search_staleness["stale_if_error"] == served + 1
+
+
+async def test_error_past_stale_if_error_window_raises(serper, monkeypatch):
+    monkeypatch.setattr(mcp_serper, "SEARCH_STALE_WHILE_REVALIDATE", 0)
+    monkeypatch.setattr(mcp_serper, "SEARCH_STALE_IF_ERROR", 60)
+    await store_result("asyncio", "docs.python.org", age=mcp_serper.SEARCH_CACHE_TTL + 120)
+    serper.status = 503
+
+    with pytest.raises(Exception, match="503"):
+        await mcp_serper.search_web("asyncio", "docs.python.org")
@@ -0,0 +1,175 @@
+"""Pruebas de las sesiones SSE: políticas de desbordamiento y reanudación."""
+
+import asyncio
+import json
+
+import pytest
+
+import sse_sessions
+from sse_sessions import SSESession, SessionRegistry, parse_last_event_id
+
+
+def payload(event):
+    """Datos JSON de un evento SSE formateado."""
+    return json.loads(event.split("data: ", 1)[1])
+
+
+def drain(queue):
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+def test_parse_last_event_id():
+    assert parse_last_event_id("abc:12") == ("abc", 12)
+    assert parse_last_event_id("a:b:3") == ("a:b", 3)
+    assert parse_last_event_id("abc") is None
+    assert parse_last_event_id("abc:x") is None
+    assert parse_last_event_id(None) is None
+
+
+async def test_events_carry_client_and_sequence():
+    session = SSESession("c1")
+    queue, replay = session.attach()
+
+    await session.send({"type": "result", "n": 1})
+
+    (event,) = drain(queue)
+    assert event.startswith("id: c1:1\n")
+    assert payload(event) == {"type": "result", "n": 1}
+    assert replay == []
+
+
+async def test_drop_progress_discards_progress_when_full():
+    session = SSESession("c1", queue_size=2, overflow_policy="drop_progress")
+    queue, _ = session.attach()
+    await session.send({"type": "result", "n": 1})
+    await session.send({"type": "result", "n": 2})
+
+    await session.send({"type": "progress", "n": 3})
+
+    assert session.dropped == 1
+    assert session.connected
+    assert [payload(event)["n"] for event in drain(queue)] == [1, 2]
+    # El evento descartado de la cola sigue en el búfer de reanudación
+    assert session.stats()["buffered_events"] == 3
+
+
+async def test_drop_progress_blocks_other_events_until_consumed():
+    session = SSESession("c1", queue_size=1, overflow_policy="drop_progress")
+    queue, _ = session.attach()
+    await session.send({"type": "result", "n": 1})
+
+    sender = asyncio.ensure_future(session.send({"type": "result", "n": 2}))
+    await asyncio.sleep(0.01)
+    assert not sender.done()
+
+    assert payload(queue.get_nowait())["n"] == 1
+    await sender
+    assert payload(queue.get_nowait())["n"] == 2
+
+
+async def test_block_disconnects_after_send_timeout(monkeypatch):
+    monkeypatch.setattr(sse_sessions, "SSE_SEND_TIMEOUT", 0.01)
+    session = SSESession("c1", queue_size=1, overflow_policy="block")
+    queue, _ = session.attach()
+    await session.send({"type": "progress", "n": 1})
+
+    await session.send({"type": "progress", "n": 2})
+
+    assert session.overflows == 1
+    assert not session.connected
+    # La cola queda vacía salvo la marca de cierre para el stream
+    assert drain(queue) == [None]
+
+
+async def test_disconnect_policy_closes_stream_at_once():
+    session = SSESession("c1", queue_size=1, overflow_policy="disconnect")
+    queue, _ = session.attach()
+    await session.send({"type": "result", "n": 1})
+
+    await session.send({"type": "result", "n": 2})
+
+    assert session.overflows == 1
+    assert not session.connected
+    assert drain(queue) == [None]
+
+
+def test_invalid_policy_is_rejected():
+    with pytest.raises(ValueError):
+        SSESession("c1", overflow_policy="ignore")
+
+
+async def test_replay_buffer_is_bounded_by_count_and_bytes():
+    by_count = SSESession("c1", buffer_size=3)
+    for n in range(5):
+        await by_count.send({"n": n})
+    assert by_count.stats()["buffered_events"] == 3
+
+    by_bytes = SSESession("c2", buffer_size=100, buffer_bytes=200)
+    for n in range(5):
+        await by_bytes.send({"content": "x" * 60, "n": n})
+    stats = by_bytes.stats()
+    assert stats["buffered_bytes"] <= 200
+    assert stats["buffered_events"] == 2
+
+
+async def test_resume_inside_buffer_replays_missing_events():
+    session = SSESession("c1", buffer_size=10)
+    queue, _ = session.attach()
+    for n in range(1, 6):
+        await session.send({"n": n})
+    session.detach(queue)
+
+    _, replay = session.attach(last_seq=3)
+
+    assert [payload(event)["n"] for event in replay] == [4, 5]
+    assert replay[0].startswith("id: c1:4\n")
+
+
+async def test_resume_outside_buffer_sends_gap_notice():
+    session = SSESession("c1", buffer_size=2)
+    for n in range(1, 7):
+        await session.send({"n": n})
+
+    _, replay = session.attach(last_seq=1)
+
+    assert payload(replay[0]) == {"type": "gap", "missed": 3}
+    assert [payload(event)["n"] for event in replay[1:]] == [5, 6]
+
+
+async def test_resume_up_to_date_replays_nothing():
+    session = SSESession("c1", buffer_size=2)
+    for n in range(1, 4):
+        await session.send({"n": n})
+
+    _, replay = session.attach(last_seq=3)
+
+    assert replay == []
+
+
+async def test_reattach_closes_previous_stream():
+    session = SSESession("c1")
+    first, _ = session.attach()
+    await session.send({"n": 1})
+
+    second, _ = session.attach(last_seq=0)
+
+    assert drain(first) == [None]
+    assert session.queue is second
+
+
+async def test_registry_expires_disconnected_sessions(monkeypatch):
+    registry = SessionRegistry(session_ttl=60)
+    connected = registry.create("a")
+    connected.attach()
+    registry.create("b")
+    assert registry.idle_for("a") == 0.0
+    assert registry.idle_for("missing") == float("inf")
+
+    now = sse_sessions.time.monotonic()
+    monkeypatch.setattr(sse_sessions.time, "monotonic", lambda: now + 61)
+
+    assert registry.expire() == 1
+    assert registry.client_ids() == ["a"]
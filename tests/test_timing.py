@@ -0,0 +1,91 @@
+"""Pruebas de los spans por etapa con el exportador en memoria."""
+
+import httpx
+import pytest
+
+import mcp_serper
+from timing import MemoryExporter, tracer
+
+PAGE = b"<html><head><title>asyncio</title></head><body><main><p>asyncio.gather ejecuta corrutinas.</p></main></body></html>"
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    if request.method == "POST":
+        return httpx.Response(200, json={"organic": [
+            {"title": "asyncio", "link": "https://docs.python.org/3/library/asyncio.html", "snippet": "..."},
+        ]})
+    return httpx.Response(200, content=PAGE, headers={"content-type": "text/html; charset=utf-8"})
+
+
+@pytest.fixture
+async def exporter(monkeypatch):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(mcp_serper, "get_http_client", lambda profile: client)
+    monkeypatch.setattr(mcp_serper, "SERPER_API_KEY", "test")
+    monkeypatch.setattr(mcp_serper, "DOCS_INDEX_ENABLED", False)
+    await mcp_serper.results_cache.clear()
+    await mcp_serper.page_cache.clear()
+
+    memory = MemoryExporter()
+    previous = tracer.exporters
+    tracer.set_exporters([memory])
+    monkeypatch.setattr(tracer, "sample_rate", 1.0)
+    yield memory
+    tracer.set_exporters(previous)
+    await client.aclose()
+
+
+def span_names(trace):
+    return [span.name for span in trace.spans]
+
+
+async def test_search_web_spans(exporter):
+    await mcp_serper.search_web("asyncio gather", "docs.python.org")
+
+    (trace,) = exporter.traces
+    assert trace.name == "search_web"
+    assert trace.error is None
+    names = span_names(trace)
+    for stage in ("search.cache", "search.serper", "serper.queue", "serper.post"):
+        assert stage in names
+    # serper.post cuelga de search.serper
+    post = trace.spans[names.index("serper.post")]
+    assert trace.spans[post.parent].name == "search.serper"
+    assert all(span.end is not None for span in trace.spans)
+
+
+async def test_fetch_url_spans_miss_then_hit(exporter):
+    page = await mcp_serper.fetch_url("https://docs.python.org/3/library/asyncio.html")
+    await mcp_serper.fetch_url("https://docs.python.org/3/library/asyncio.html")
+
+    assert page["title"] == "asyncio"
+    miss, hit = exporter.traces
+    for stage in ("page.cache", "page.load", "page.download", "page.parse", "page.cache_store"):
+        assert stage in span_names(miss)
+    assert miss.spans[0].attrs["hit"] is False
+    assert span_names(hit) == ["page.cache"]
+    assert hit.spans[0].attrs["hit"] is True
+
+
+async def test_get_docs_nests_search_and_fetch_in_one_trace(exporter):
+    result = await mcp_serper.get_docs("asyncio gather", "python", num_results=1, with_content=True)
+
+    assert result["results"]
+    (trace,) = exporter.traces
+    assert trace.name == "get_docs"
+    names = span_names(trace)
+    for stage in ("docs.search", "search_web", "serper.post", "docs.results", "fetch_url", "page.download"):
+        assert stage in names
+    # Las llamadas anidadas son spans de la traza exterior
+    search = trace.spans[names.index("search_web")]
+    assert trace.spans[search.parent].name == "docs.search"
+
+
+async def test_timings_block_is_added_on_request(exporter, monkeypatch):
+    monkeypatch.setattr(tracer, "sample_rate", 0.0)
+
+    result = await mcp_serper.search_web("asyncio gather", "docs.python.org", timings=True)
+
+    assert result["timings"]["name"] == "search_web"
+    assert "serper.post" in result["timings"]["stages"]
+    assert len(exporter.traces) == 1
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Medición de tiempos por etapa (spans) para las herramientas de MCP-Serper.
+
+Una llamada a search_web, fetch_url, get_docs o get_docs_from_domain abre una traza
+y cada etapa del pipeline (caché, solicitud a Serper, descarga, extracción, envío
+SSE...) abre un span dentro de ella. Las llamadas anidadas (get_docs -> search_web)
+no abren una traza nueva: son un span más de la traza exterior. La traza actual se
+propaga con contextvars, por lo que los spans de las descargas en paralelo (tareas
+creadas dentro de la traza) quedan en la misma traza con su span padre correcto.
+
+Solo se mide una fracción TIMING_SAMPLE_RATE de las llamadas, además de las que
+piden el bloque "timings" en su resultado. Fuera de una traza muestreada, span()
+se reduce a leer una variable de contexto y devolver un objeto vacío, de modo que
+la medición puede quedarse activada en producción.
+
+Cada traza terminada se entrega a los exportadores de TIMING_EXPORTER (separados
+por comas):
+
+    log     una línea de log con el total y el tiempo acumulado por etapa
+    otel    spans de OpenTelemetry con los tiempos originales (requiere opentelemetry-api)
+    memory  las últimas TIMING_MEMORY_TRACES trazas en memoria (pruebas y depuración)
+    none    no se exporta nada
+"""
+
+import os
+import time
+import uuid
+import random
+import logging
+import functools
+from collections import deque
+from contextvars import ContextVar, Token
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, TypeVar, cast
+
+logger = logging.getLogger("mcp-serper")
+
+ResultT = TypeVar("ResultT")
+
+# Fracción de llamadas medidas (0 = solo las que piden "timings", 1 = todas)
+TIMING_SAMPLE_RATE = float(os.environ.get("TIMING_SAMPLE_RATE", 0))
+# Exportadores de las trazas medidas: log, otel, memory o none
+TIMING_EXPORTER = os.environ.get("TIMING_EXPORTER", "log")
+# Trazas conservadas por el exportador en memoria
+TIMING_MEMORY_TRACES = int(os.environ.get("TIMING_MEMORY_TRACES", 100))
+
+
+class Span:
+    """Etapa medida dentro de una traza."""
+
+    __slots__ = ("name", "parent", "start", "end", "attrs")
+
+    def __init__(self, name: str, parent: Optional[int], attrs: Dict[str, Any]):
+        self.name = name
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attrs = attrs
+
+
+class Trace:
+    """Spans de una llamada a una herramienta."""
+
+    def __init__(self, name: str, forced: bool = False):
+        """
+        Args:
+            name: Herramienta que abre la traza.
+            forced: Si se mide porque el llamador pidió el bloque "timings".
+        """
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.forced = forced
+        # Hora de inicio para los exportadores que necesitan tiempos absolutos
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+        self.spans: List[Span] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.end is not None
+
+    def total_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def stages(self) -> Dict[str, float]:
+        """Tiempo acumulado por nombre de etapa en milisegundos."""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            if span.end is not None:
+                totals[span.name] = totals.get(span.name, 0.0) + (span.end - span.start) * 1000
+        return {name: round(ms, 2) for name, ms in totals.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Bloque "timings" de los resultados y eventos SSE.
+
+        Returns:
+            Dict: Total, tiempo por etapa y lista de spans (inicio relativo, duración
+            e índice del span padre).
+        """
+        spans = []
+        for span in self.spans:
+            item = {
+                "name": span.name,
+                "start_ms": round((span.start - self.start) * 1000, 2),
+                "duration_ms": round((span.end - span.start) * 1000, 2) if span.end is not None else None,
+                "parent": span.parent,
+            }
+            if span.attrs:
+                item["attrs"] = span.attrs
+            spans.append(item)
+        data = {
+            "trace_id": self.id,
+            "name": self.name,
+            "total_ms": round(self.total_ms(), 2),
+            "stages": self.stages(),
+            "spans": spans,
+        }
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+# Traza y span padre actuales. False marca una llamada no muestreada, para que las
+# llamadas anidadas no abran su propia traza.
+_current: ContextVar[Any] = ContextVar("mcp_serper_trace", default=None)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _SpanContext:
+    __slots__ = ("trace", "parent", "name", "attrs", "span", "token")
+
+    def __init__(self, trace: Trace, parent: Optional[int], name: str, attrs: Dict[str, Any]):
+        self.trace = trace
+        self.parent = parent
+        self.name = name
+        self.attrs = attrs
+        self.span: Optional[Span] = None
+        self.token: Optional[Token[Any]] = None
+
+    def __enter__(self) -> "_SpanContext":
+        # Las tareas que sobreviven a la traza (refrescos en segundo plano) no la modifican
+        if not self.trace.finished:
+            self.span = Span(self.name, self.parent, self.attrs)
+            self.trace.spans.append(self.span)
+            self.token = _current.set((self.trace, len(self.trace.spans) - 1))
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if self.span is None or self.token is None:
+            return
+        self.span.end = time.perf_counter()
+        if exc_type is not None:
+            self.span.attrs["error"] = exc_type.__name__
+        _current.reset(self.token)
+
+    def set(self, **attrs: Any) -> None:
+        """Añade atributos al span (por ejemplo, el resultado de una consulta a caché)."""
+        if self.span is not None:
+            self.span.attrs.update(attrs)
+
+
+def span(name: str, **attrs: Any) -> Any:
+    """
+    Mide una etapa dentro de la traza actual.
+
+    Se usa como context manager (también alrededor de un await). Fuera de una traza
+    muestreada no mide nada.
+
+    Args:
+        name: Nombre de la etapa (por ejemplo, "serper.post").
+        **attrs: Atributos del span.
+
+    Returns:
+        Any: Context manager con set(**attrs) para añadir atributos.
+    """
+    current = _current.get()
+    if not current:
+        return _NOOP
+    return _SpanContext(current[0], current[1], name, attrs)
+
+
+def current_trace() -> Optional[Trace]:
+    """Traza muestreada en curso, si la hay."""
+    current = _current.get()
+    return current[0] if current else None
+
+
+class Exporter:
+    """Destino de las trazas terminadas."""
+
+    name = "none"
+
+    def export(self, trace: Trace) -> None:
+        pass
+
+
+class LogExporter(Exporter):
+    """Escribe una línea de log por traza con el tiempo de cada etapa."""
+
+    name = "log"
+
+    def export(self, trace: Trace) -> None:
+        stages = ", ".join(f"{name}={ms:.1f}ms" for name, ms in trace.stages().items())
+        error = f" (error: {trace.error})" if trace.error else ""
+        logger.info(f"Tiempos de {trace.name} [{trace.id[:8]}]{error}: total={trace.total_ms():.1f}ms; {stages}")
+
+
+class MemoryExporter(Exporter):
+    """Conserva las últimas trazas en memoria."""
+
+    name = "memory"
+
+    def __init__(self, max_traces: int = TIMING_MEMORY_TRACES):
+        self.traces: Deque[Trace] = deque(maxlen=max_traces)
+
+    def export(self, trace: Trace) -> None:
+        self.traces.append(trace)
+
+    def clear(self) -> None:
+        self.traces.clear()
+
+
+class OpenTelemetryExporter(Exporter):
+    """
+    Reproduce cada traza como spans de OpenTelemetry con sus tiempos originales.
+
+    Los spans se crean al terminar la traza, de modo que el camino crítico no depende
+    del SDK configurado. El proveedor y el exportador (OTLP, consola...) se
+    configuran con el SDK de OpenTelemetry como en cualquier otra aplicación.
+    """
+
+    name = "otel"
+
+    def __init__(self) -> None:
+        """
+        Raises:
+            ImportError: Si el paquete opentelemetry-api no está instalado.
+        """
+        from opentelemetry import trace as otel_trace
+
+        self._otel = otel_trace
+        self._tracer = otel_trace.get_tracer("mcp-serper")
+
+    def export(self, trace: Trace) -> None:
+        base_ns = int(trace.started_at * 1e9)
+        # Las trazas se exportan al terminar, por lo que siempre tienen fin
+        trace_end = trace.end if trace.end is not None else time.perf_counter()
+
+        def at(instant: float) -> int:
+            return base_ns + int((instant - trace.start) * 1e9)
+
+        attributes = {"mcp.trace_id": trace.id}
+        if trace.error:
+            attributes["error.type"] = trace.error
+        root = self._tracer.start_span(trace.name, start_time=base_ns, attributes=attributes)
+        created: List[Any] = []
+        for item in trace.spans:
+            parent = created[item.parent] if item.parent is not None else root
+            otel_span = self._tracer.start_span(
+                item.name,
+                context=self._otel.set_span_in_context(parent),
+                start_time=at(item.start),
+                attributes={key: value for key, value in item.attrs.items() if isinstance(value, (str, bool, int, float))},
+            )
+            created.append(otel_span)
+        # Cerrar primero los hijos para que el SDK los exporte antes que sus padres
+        for item, otel_span in reversed(list(zip(trace.spans, created))):
+            otel_span.end(end_time=at(item.end if item.end is not None else trace_end))
+        root.end(end_time=at(trace_end))
+
+
+EXPORTERS = ("log", "otel", "memory", "none")
+
+
+def build_exporters(names: str = TIMING_EXPORTER) -> List[Exporter]:
+    """
+    Crea los exportadores configurados.
+
+    Args:
+        names: Nombres separados por comas (ver EXPORTERS).
+
+    Returns:
+        List: Exportadores; otel se sustituye por log si OpenTelemetry no está instalado.
+    """
+    exporters: List[Exporter] = []
+    for name in (part.strip() for part in names.split(",")):
+        if not name or name == "none":
+            continue
+        if name == "log":
+            exporters.append(LogExporter())
+        elif name == "memory":
+            exporters.append(MemoryExporter())
+        elif name == "otel":
+            try:
+                exporters.append(OpenTelemetryExporter())
+            except ImportError:
+                logger.warning("El paquete 'opentelemetry-api' no está instalado. Se usará el exportador de log.")
+                exporters.append(LogExporter())
+        else:
+            logger.warning(f"Exportador de tiempos no soportado: {name}")
+    return exporters
+
+
+class Tracer:
+    """Muestreo de llamadas y entrega de las trazas a los exportadores."""
+
+    def __init__(self, sample_rate: float = TIMING_SAMPLE_RATE, exporters: Optional[List[Exporter]] = None):
+        """
+        Args:
+            sample_rate: Fracción de llamadas medidas sin que se pida "timings".
+            exporters: Destinos de las trazas (por defecto los de TIMING_EXPORTER).
+        """
+        self.sample_rate = sample_rate
+        self.exporters = build_exporters() if exporters is None else exporters
+        self.calls = 0
+        self.sampled = 0
+        self.forced = 0
+        self.export_errors = 0
+
+    def set_exporters(self, exporters: List[Exporter]) -> None:
+        """Sustituye los exportadores (por ejemplo, por un MemoryExporter en pruebas)."""
+        self.exporters = list(exporters)
+
+    def begin(self, name: str, forced: bool = False) -> Optional[Trace]:
+        """Abre una traza si la llamada se mide."""
+        self.calls += 1
+        if forced:
+            self.forced += 1
+        elif not (self.sample_rate > 0 and random.random() < self.sample_rate):
+            return None
+        self.sampled += 1
+        return Trace(name, forced)
+
+    def finish(self, trace: Trace) -> None:
+        trace.end = time.perf_counter()
+        for exporter in self.exporters:
+            try:
+                exporter.export(trace)
+            except Exception as e:
+                self.export_errors += 1
+                logger.warning(f"Error al exportar los tiempos de {trace.name} ({exporter.name}): {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "exporters": [exporter.name for exporter in self.exporters],
+            "calls": self.calls,
+            "sampled": self.sampled,
+            "forced": self.forced,
+            "export_errors": self.export_errors,
+        }
+
+
+# Trazador del proceso
+tracer = Tracer()
+
+
+def traced(name: str) -> Callable[[Callable[..., Awaitable[ResultT]]], Callable[..., Awaitable[ResultT]]]:
+    """
+    Mide una herramienta asíncrona como traza (o como span de la traza exterior).
+
+    La función decorada acepta el argumento adicional timings=True, que fuerza la
+    medición y añade el bloque "timings" a su resultado (un diccionario).
+
+    Args:
+        name: Nombre de la traza o del span.
+
+    Returns:
+        Callable: Decorador.
+    """
+    def decorator(fn: Callable[..., Awaitable[ResultT]]) -> Callable[..., Awaitable[ResultT]]:
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, timings: bool = False, **kwargs: Any) -> ResultT:
+            current = _current.get()
+            # Llamada anidada en una traza muestreada: un span más
+            if current and not timings:
+                with _SpanContext(current[0], current[1], name, {}):
+                    return await fn(*args, **kwargs)
+            # Llamada anidada en una traza no muestreada: nada que medir
+            if current is False and not timings:
+                return await fn(*args, **kwargs)
+
+            trace = tracer.begin(name, forced=timings)
+            token = _current.set((trace, None) if trace is not None else False)
+            try:
+                result = await fn(*args, **kwargs)
+            except BaseException as e:
+                if trace is not None:
+                    trace.error = type(e).__name__
+                raise
+            finally:
+                _current.reset(token)
+                if trace is not None:
+                    tracer.finish(trace)
+            if timings and trace is not None and isinstance(result, dict):
+                # Copia: el resultado puede ser el mismo objeto que está en caché
+                return cast(ResultT, dict(result, timings=trace.to_dict()))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def timing_stats() -> Dict[str, Any]:
+    """Contadores del muestreo y exportadores activos."""
+    return tracer.stats()